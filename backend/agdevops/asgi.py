@@ -12,9 +12,17 @@ os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'agdevops.settings')
 django_asgi_app = get_asgi_application()
 
 from channels.routing import ProtocolTypeRouter, URLRouter
+from django.conf import settings
+from ops.loki_client import serve_on_loop
 from ops.routing import websocket_urlpatterns
 
-application = ProtocolTypeRouter({
+# 随 ASGI 进程启动周期采集（多 worker 部署时请改用 manage.py run_collector 单独运行）
+if getattr(settings, 'COLLECTOR_AUTOSTART', False):
+    from ops import scheduler
+    scheduler.start_in_process()
+
+# 运行应用的事件循环共用 Loki 长连接池（见 ops/loki_client.py）
+application = serve_on_loop(ProtocolTypeRouter({
     'http': django_asgi_app,
     'websocket': URLRouter(websocket_urlpatterns),
-})
+}))
@@ -50,6 +50,8 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'ops.db_router.ReplicaRoutingMiddleware',
+    'ops.middleware.ResponseCompressionMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -89,6 +91,21 @@ DATABASES = {
     }
 }
 
+# 读写分离（ops.db_router）：安全的读请求走 DATABASE_REPLICAS 中的副本，写与写后 DATABASE_STICKY_SECONDS 秒内的读走主库
+# 本地用两个 SQLite 文件验证时，在 DATABASES 中加入副本并执行 python manage.py sync_replicas 从主库复制:
+#     DATABASES['replica'] = {
+#         'ENGINE': 'django.db.backends.sqlite3',
+#         'NAME': BASE_DIR / 'db.replica.sqlite3',
+#         'TEST': {'MIRROR': 'default'},
+#     }
+#     DATABASE_REPLICAS = ['replica']
+DATABASE_ROUTERS = ['ops.db_router.ReplicaRouter']
+DATABASE_REPLICAS = []
+DATABASE_STICKY_SECONDS = 5
+DATABASE_REPLICA_CHECK_INTERVAL = 10
+DATABASE_REPLICA_RETRY_INTERVAL = 30
+DATABASE_REPLICA_MAX_LAG = 30
+
 
 # Password validation
 # https://docs.djangoproject.com/en/6.0/ref/settings/#auth-password-validators
@@ -136,10 +153,55 @@ CORS_ALLOW_ALL_ORIGINS = True
 REST_FRAMEWORK = {
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 20,
+    # orjson 渲染 / 解析（未安装 orjson 时自动退回标准 json），见 ops/renderers.py
+    'DEFAULT_RENDERER_CLASSES': [
+        'ops.renderers.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'ops.parsers.ORJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
+    # 响应压缩（ops.middleware.ResponseCompressionMiddleware），超过 MIN_SIZE 字节时按 Accept-Encoding 协商 br / gzip
+    'RESPONSE_COMPRESSION': {
+        'ENABLED': True,
+        'MIN_SIZE': 1024,
+        'ENCODINGS': ['br', 'gzip'],
+        'GZIP_LEVEL': 6,
+        'BROTLI_QUALITY': 5,
+    },
 }
 
 # Loki
 LOKI_URL = 'http://47.95.15.209:33100'
+# Loki 客户端长连接池（ops.loki_client），异步视图使用 httpx，未安装时退回线程池
+LOKI_TIMEOUT = 30
+LOKI_CONNECT_TIMEOUT = 3
+LOKI_POOL_SIZE = 20
+LOKI_MAX_CONNECTIONS = 100
+LOKI_KEEPALIVE_EXPIRY = 30
+# query_range 结果缓存（ops.loki_cache）：早于 now - LOKI_CACHE_FRESHNESS 的整桶结果缓存在进程内，按总字节数 LRU 淘汰
+LOKI_CACHE_ENABLED = True
+LOKI_CACHE_BUCKET = 900
+LOKI_CACHE_FRESHNESS = 600
+LOKI_CACHE_MAX_BYTES = 64 * 1024 * 1024
+LOKI_CACHE_MAX_BUCKETS = 32
+# 长区间 query_range 按 LOKI_SPLIT_INTERVAL 秒拆分，单个查询最多 LOKI_SPLIT_CONCURRENCY 个请求并发（ops.loki_split）
+LOKI_SPLIT_INTERVAL = 3600
+LOKI_SPLIT_CONCURRENCY = 8
+LOKI_SPLIT_MAX_SEGMENTS = 32
+# 直通转发（ops.loki_views）：不需合并的响应按块原样转发；响应（含合并后的结果）不超过 LOKI_MAX_RESPONSE_BYTES
+LOKI_STREAM_PASSTHROUGH = True
+LOKI_STREAM_CHUNK_SIZE = 64 * 1024
+LOKI_MAX_RESPONSE_BYTES = 32 * 1024 * 1024
+# 实时日志（ops.loki_tail，ws/loki/tail/）：同一查询共用上游 tail，未安装 websockets 时每 LOKI_TAIL_POLL_INTERVAL 秒增量查询
+LOKI_TAIL_POLL_INTERVAL = 2.0
+LOKI_TAIL_POLL_LIMIT = 1000
+LOKI_TAIL_BATCH_SIZE = 500        # 每帧最多行数
+LOKI_TAIL_BATCH_INTERVAL = 0.2    # 合并零散日志为一帧的等待时间（秒）
+LOKI_TAIL_ACK_WINDOW = 4          # 未确认帧达到此数时暂停向该客户端发送
+LOKI_TAIL_BUFFER = 5000           # 每个客户端缓冲的最多行数，超出丢弃最旧的日志
 
 # ASGI / Channels
 ASGI_APPLICATION = 'agdevops.asgi.application'
@@ -148,3 +210,42 @@ CHANNEL_LAYERS = {
         'BACKEND': 'channels.layers.InMemoryChannelLayer',
     },
 }
+
+# 主机指标周期采集（ops.scheduler）
+COLLECTOR_AUTOSTART = False
+COLLECTOR_INTERVAL = 60
+COLLECTOR_JITTER = 0.1
+COLLECTOR_MAX_BACKOFF = 1800
+COLLECTOR_CONCURRENCY = 32
+COLLECTOR_SUBNET_CONCURRENCY = 8
+
+# 仪表盘计数器（ops.dashboard）
+DASHBOARD_RECONCILE_INTERVAL = 300
+DASHBOARD_RECENT_TTL = 10
+
+# 列表分页总数缓存（ops.pagination，?count=cached / approx）
+PAGINATION_COUNT_CACHE_TTL = 60
+
+# 日志保留与归档（ops.retention），按服务 / 级别的策略见 LogRetentionPolicy
+LOG_RETENTION_DAYS = 30
+LOG_RETENTION_ARCHIVE = True
+LOG_RETENTION_INTERVAL = 3600
+LOG_ARCHIVE_DIR = BASE_DIR / 'archive' / 'logs'
+LOG_PRUNE_CHUNK = 2000
+LOG_PRUNE_PAUSE = 0.05
+
+# 阈值告警规则（ops.rules）
+RULES_EVAL_INTERVAL = 30
+RULES_REPEAT_INTERVAL = 300
+
+# 实时推送（ops.live，ws/live/）；跨进程推送（独立运行 run_collector）需将 CHANNEL_LAYERS 换成 Redis 等共享实现
+LIVE_COALESCE_INTERVAL = 1.0
+LIVE_DASHBOARD_INTERVAL = 5.0
+LIVE_MAX_DIFF_ROWS = 500
+
+# 流式导出（ops.export，/api/logs|alerts|deployments/export/）
+EXPORT_CHUNK_SIZE = 2000
+EXPORT_BLOCK_SIZE = 64 * 1024
+
+# 列表接口使用 values() 快速序列化（ops.fast_serializers），输出与 ModelSerializer 一致
+FAST_LIST_SERIALIZATION = True
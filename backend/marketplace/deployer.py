@@ -1,10 +1,11 @@
 """
 SSH 部署执行器
-通过 paramiko 连接远程主机，上传 docker-compose.yml 并执行部署/管理命令
+通过 SSH 连接池连接远程主机，上传 docker-compose.yml 并执行部署/管理命令
 """
 import logging
 import re
-import paramiko
+
+from ops import ssh_pool
 
 logger = logging.getLogger(__name__)
 
@@ -22,17 +23,8 @@ def _render_template(template_str, context):
 
 
 def _get_ssh_client(host):
-    """建立 SSH 连接"""
-    client = paramiko.SSHClient()
-    client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
-    client.connect(
-        hostname=host.ip_address,
-        port=getattr(host, 'ssh_port', 22) or 22,
-        username=getattr(host, 'ssh_user', 'root') or 'root',
-        password=getattr(host, 'ssh_password', '') or None,
-        timeout=15,
-    )
-    return client
+    """从连接池借出 SSH 连接，with 块结束（或 close()）时归还"""
+    return ssh_pool.acquire(host, connect_timeout=15)
 
 
 def _ssh_exec(client, cmd):
@@ -67,37 +59,35 @@ def deploy_service(deployment):
 
     log_lines = []
     try:
-        client = _get_ssh_client(host)
-        log_lines.append(f'[✓] SSH 连接成功: {host.ip_address}:{getattr(host, "ssh_port", 22)}')
-
-        # 创建目录
-        code, out, err = _ssh_exec(client, f'mkdir -p {service_dir}')
-        log_lines.append(f'[✓] 创建目录: {service_dir}')
-
-        # 上传 docker-compose.yml
-        sftp = client.open_sftp()
-        compose_path = f'{service_dir}/docker-compose.yml'
-        with sftp.file(compose_path, 'w') as f:
-            f.write(compose_content)
-        sftp.close()
-        log_lines.append(f'[✓] 上传 docker-compose.yml')
-
-        # 执行 docker-compose up -d
-        code, out, err = _ssh_exec(client, f'cd {service_dir} && docker-compose up -d 2>&1 || docker compose up -d 2>&1')
-        log_lines.append(f'[CMD] docker-compose up -d')
-        if out.strip():
-            log_lines.append(out.strip())
-        if err.strip():
-            log_lines.append(err.strip())
-
-        if code == 0:
-            deployment.status = 'running'
-            log_lines.append('[✓] 部署成功！')
-        else:
-            deployment.status = 'failed'
-            log_lines.append(f'[✗] 部署失败，退出码: {code}')
-
-        client.close()
+        with _get_ssh_client(host) as client:
+            log_lines.append(f'[✓] SSH 连接成功: {host.ip_address}:{getattr(host, "ssh_port", 22)}')
+
+            # 创建目录
+            code, out, err = _ssh_exec(client, f'mkdir -p {service_dir}')
+            log_lines.append(f'[✓] 创建目录: {service_dir}')
+
+            # 上传 docker-compose.yml
+            sftp = client.open_sftp()
+            compose_path = f'{service_dir}/docker-compose.yml'
+            with sftp.file(compose_path, 'w') as f:
+                f.write(compose_content)
+            sftp.close()
+            log_lines.append(f'[✓] 上传 docker-compose.yml')
+
+            # 执行 docker-compose up -d
+            code, out, err = _ssh_exec(client, f'cd {service_dir} && docker-compose up -d 2>&1 || docker compose up -d 2>&1')
+            log_lines.append(f'[CMD] docker-compose up -d')
+            if out.strip():
+                log_lines.append(out.strip())
+            if err.strip():
+                log_lines.append(err.strip())
+
+            if code == 0:
+                deployment.status = 'running'
+                log_lines.append('[✓] 部署成功！')
+            else:
+                deployment.status = 'failed'
+                log_lines.append(f'[✗] 部署失败，退出码: {code}')
 
     except Exception as e:
         deployment.status = 'failed'
@@ -119,11 +109,10 @@ def stop_service(deployment):
         return deployment
 
     try:
-        client = _get_ssh_client(host)
-        code, out, err = _ssh_exec(client, f'cd {service_dir} && docker-compose stop 2>&1 || docker compose stop 2>&1')
-        deployment.status = 'stopped'
-        deployment.deploy_log += f'\n[✓] 服务已停止\n{out}{err}'
-        client.close()
+        with _get_ssh_client(host) as client:
+            code, out, err = _ssh_exec(client, f'cd {service_dir} && docker-compose stop 2>&1 || docker compose stop 2>&1')
+            deployment.status = 'stopped'
+            deployment.deploy_log += f'\n[✓] 服务已停止\n{out}{err}'
     except Exception as e:
         deployment.deploy_log += f'\n[✗] 停止失败: {str(e)}'
 
@@ -137,11 +126,10 @@ def start_service(deployment):
     service_dir = deployment.deploy_dir
 
     try:
-        client = _get_ssh_client(host)
-        code, out, err = _ssh_exec(client, f'cd {service_dir} && docker-compose start 2>&1 || docker compose start 2>&1')
-        deployment.status = 'running'
-        deployment.deploy_log += f'\n[✓] 服务已启动\n{out}{err}'
-        client.close()
+        with _get_ssh_client(host) as client:
+            code, out, err = _ssh_exec(client, f'cd {service_dir} && docker-compose start 2>&1 || docker compose start 2>&1')
+            deployment.status = 'running'
+            deployment.deploy_log += f'\n[✓] 服务已启动\n{out}{err}'
     except Exception as e:
         deployment.deploy_log += f'\n[✗] 启动失败: {str(e)}'
 
@@ -155,11 +143,10 @@ def remove_service(deployment):
     service_dir = deployment.deploy_dir
 
     try:
-        client = _get_ssh_client(host)
-        code, out, err = _ssh_exec(client, f'cd {service_dir} && docker-compose down -v 2>&1 || docker compose down -v 2>&1')
-        code2, out2, err2 = _ssh_exec(client, f'rm -rf {service_dir}')
-        deployment.deploy_log += f'\n[✓] 服务已卸载并清理\n{out}{err}'
-        client.close()
+        with _get_ssh_client(host) as client:
+            code, out, err = _ssh_exec(client, f'cd {service_dir} && docker-compose down -v 2>&1 || docker compose down -v 2>&1')
+            code2, out2, err2 = _ssh_exec(client, f'rm -rf {service_dir}')
+            deployment.deploy_log += f'\n[✓] 服务已卸载并清理\n{out}{err}'
     except Exception as e:
         deployment.deploy_log += f'\n[✗] 卸载失败: {str(e)}'
         deployment.save(update_fields=['deploy_log'])
@@ -176,9 +163,8 @@ def get_service_logs(deployment, tail=100):
     service_dir = deployment.deploy_dir
 
     try:
-        client = _get_ssh_client(host)
-        code, out, err = _ssh_exec(client, f'cd {service_dir} && docker-compose logs --tail={tail} 2>&1 || docker compose logs --tail={tail} 2>&1')
-        client.close()
+        with _get_ssh_client(host) as client:
+            code, out, err = _ssh_exec(client, f'cd {service_dir} && docker-compose logs --tail={tail} 2>&1 || docker compose logs --tail={tail} 2>&1')
         return out or err
     except Exception as e:
         return f'获取日志失败: {str(e)}'
@@ -3,6 +3,8 @@ from rest_framework import viewsets, status
 from rest_framework.decorators import action, api_view
 from rest_framework.response import Response
 
+from ops.fieldsets import SparseFieldsetMixin
+
 from .models import ServiceTemplate, ServiceDeployment
 from .serializers import (
     ServiceTemplateSerializer,
@@ -12,14 +14,14 @@ from .serializers import (
 from . import deployer
 
 
-class ServiceTemplateViewSet(viewsets.ReadOnlyModelViewSet):
+class ServiceTemplateViewSet(SparseFieldsetMixin, viewsets.ReadOnlyModelViewSet):
     """服务模板 — 只读列表 + 详情"""
     queryset = ServiceTemplate.objects.filter(is_active=True)
     serializer_class = ServiceTemplateSerializer
     pagination_class = None  # 模板数量少，不分页
 
 
-class ServiceDeploymentViewSet(viewsets.ModelViewSet):
+class ServiceDeploymentViewSet(SparseFieldsetMixin, viewsets.ModelViewSet):
     """服务部署实例"""
     queryset = ServiceDeployment.objects.select_related('template', 'host')
     serializer_class = ServiceDeploymentSerializer
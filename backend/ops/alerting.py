@@ -0,0 +1,203 @@
+"""
+告警触发与去重
+告警按 (source, host, title, level) 计算指纹。同一指纹存在未确认告警时，重复触发只累加 count、
+刷新 last_seen 与 message；告警被确认后再次触发才会新建一条。
+
+SQLite / PostgreSQL 下整批事件只执行一条
+    INSERT ... ON CONFLICT (fingerprint) WHERE NOT is_acknowledged DO UPDATE ... RETURNING
+冲突目标即部分唯一索引 uniq_open_alert_fingerprint，告警风暴时不产生逐条的查询-再写入竞争；
+其它数据库退回逐条 select_for_update。
+
+批量确认 / 删除（acknowledge / delete）按过滤条件执行单条 UPDATE / DELETE，并按受影响行修正仪表盘计数器，
+实时推送端收到整体刷新通知。
+"""
+from django.db import connection, models, transaction
+from django.utils import timezone
+
+from . import dashboard, live
+from .models import Alert
+
+UPSERT_BATCH = 500
+
+
+def _normalize(event, now):
+    host = event.get('host')
+    host_id = event.get('host_id', getattr(host, 'pk', host))
+    level = event.get('level') or 'info'
+    title = event['title']
+    source = event.get('source') or ''
+    return {
+        'fingerprint': Alert.make_fingerprint(source, host_id, title, level),
+        'title': title,
+        'level': level,
+        'source': source,
+        'message': event.get('message') or '',
+        'host_id': host_id,
+        'count': int(event.get('count') or 1),
+        'last_seen': event.get('timestamp') or now,
+    }
+
+
+def _merge(events, now):
+    """同一批内相同指纹的事件先合并，避免一条语句多次更新同一行"""
+    merged = {}
+    for event in events:
+        row = _normalize(event, now)
+        current = merged.get(row['fingerprint'])
+        if current is None:
+            merged[row['fingerprint']] = row
+            continue
+        current['count'] += row['count']
+        if row['last_seen'] >= current['last_seen']:
+            current['last_seen'] = row['last_seen']
+            current['message'] = row['message']
+    return list(merged.values())
+
+
+def _upsert_sql(n):
+    table = connection.ops.quote_name(Alert._meta.db_table)
+    greatest = 'GREATEST' if connection.vendor == 'postgresql' else 'MAX'
+    placeholders = ', '.join(['(%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)'] * n)
+    return (
+        f'INSERT INTO {table} (fingerprint, title, level, source, message, host_id, count, last_seen, '
+        f'created_at, is_acknowledged) '
+        f'VALUES {placeholders} '
+        f'ON CONFLICT (fingerprint) WHERE NOT is_acknowledged DO UPDATE SET '
+        f'count = {table}.count + excluded.count, '
+        f'last_seen = {greatest}({table}.last_seen, excluded.last_seen), '
+        f'message = CASE WHEN excluded.last_seen >= {table}.last_seen '
+        f'THEN excluded.message ELSE {table}.message END '
+        f'RETURNING id, fingerprint, count'
+    )
+
+
+def _fire_upsert(rows, now):
+    results = {}
+    adapt = connection.ops.adapt_datetimefield_value
+    created_at = adapt(now)
+    with transaction.atomic(), connection.cursor() as cursor:
+        for i in range(0, len(rows), UPSERT_BATCH):
+            batch = rows[i:i + UPSERT_BATCH]
+            params = []
+            for row in batch:
+                params.extend([
+                    row['fingerprint'], row['title'], row['level'], row['source'], row['message'],
+                    row['host_id'], row['count'], adapt(row['last_seen']), created_at, False,
+                ])
+            cursor.execute(_upsert_sql(len(batch)), params)
+            for alert_id, fingerprint, count in cursor.fetchall():
+                results[fingerprint] = (alert_id, count)
+    return results
+
+
+def _fire_fallback(rows, now):
+    results = {}
+    with transaction.atomic():
+        for row in rows:
+            alert = (Alert.objects.select_for_update()
+                     .filter(fingerprint=row['fingerprint'], is_acknowledged=False).first())
+            if alert is None:
+                alert = Alert.objects.create(
+                    title=row['title'], level=row['level'], source=row['source'], message=row['message'],
+                    host_id=row['host_id'], count=row['count'], last_seen=row['last_seen'],
+                )
+            else:
+                alert.count += row['count']
+                if row['last_seen'] >= alert.last_seen:
+                    alert.last_seen = row['last_seen']
+                    alert.message = row['message']
+                Alert.objects.filter(pk=alert.pk).update(
+                    count=alert.count, last_seen=alert.last_seen, message=alert.message,
+                )
+            results[row['fingerprint']] = (alert.pk, alert.count)
+    return results
+
+
+def fire_alerts(events):
+    """
+    批量触发告警
+    events: [{'title', 'level', 'source', 'message', 'host' | 'host_id', 'timestamp'?, 'count'?}, ...]
+    返回 {'created': [新建告警 id], 'updated': [累加计数的告警 id]}
+    """
+    now = timezone.now()
+    rows = _merge(events, now)
+    if not rows:
+        return {'created': [], 'updated': []}
+
+    if connection.vendor in ('sqlite', 'postgresql'):
+        results = _fire_upsert(rows, now)
+        # 原生 SQL 不触发模型信号，新建的告警在这里计入仪表盘计数器
+        created = []
+        deltas = {}
+        for row in rows:
+            alert_id, count = results[row['fingerprint']]
+            if count == row['count']:
+                created.append(alert_id)
+                for key, value in dashboard.alert_contribution(row['level'], False).items():
+                    deltas[key] = deltas.get(key, 0) + value
+        dashboard.apply_deltas(deltas)
+        dashboard.invalidate_recent()
+    else:
+        before = set(Alert.objects.filter(fingerprint__in=[r['fingerprint'] for r in rows], is_acknowledged=False)
+                     .values_list('fingerprint', flat=True))
+        results = _fire_fallback(rows, now)
+        created = [results[r['fingerprint']][0] for r in rows if r['fingerprint'] not in before]
+
+    created_set = set(created)
+    updated = [alert_id for alert_id, _ in results.values() if alert_id not in created_set]
+    live.notify('alerts', created + updated)
+    return {'created': created, 'updated': updated}
+
+
+def fire_alert(title, level='info', source='', message='', host=None, timestamp=None):
+    """触发单条告警，返回 (Alert, 是否新建)"""
+    result = fire_alerts([{
+        'title': title, 'level': level, 'source': source, 'message': message,
+        'host': host, 'timestamp': timestamp,
+    }])
+    alert_id = (result['created'] or result['updated'])[0]
+    return Alert.objects.select_related('host').get(pk=alert_id), bool(result['created'])
+
+
+def acknowledge(queryset):
+    """把 queryset 中未确认的告警一次性标记为已确认，返回确认条数"""
+    with transaction.atomic():
+        acknowledged = queryset.filter(is_acknowledged=False).update(is_acknowledged=True)
+        dashboard.apply_deltas({'alerts.unacknowledged': -acknowledged})
+    if acknowledged:
+        dashboard.invalidate_recent()
+        live.notify('alerts', live.RELOAD)
+    return acknowledged
+
+
+def delete(queryset):
+    """
+    以单条 DELETE 删除 queryset 中的告警（不逐行加载、不逐行发送信号），返回 {'deleted', 'by_level'}
+    SQLite / PostgreSQL 通过 RETURNING 取得被删行的级别与确认状态，其它数据库先在同一事务内分组计数
+    """
+    qn = connection.ops.quote_name
+    table = qn(Alert._meta.db_table)
+    # 外包一层派生表，兼容 MySQL 不允许在子查询中引用被删除表的限制
+    sql, params = queryset.order_by().values('id').query.sql_with_params()
+    where = f'{qn("id")} IN (SELECT {qn("id")} FROM ({sql}) AS sub)'
+    with transaction.atomic(), connection.cursor() as cursor:
+        if connection.vendor in ('sqlite', 'postgresql'):
+            cursor.execute(f'DELETE FROM {table} WHERE {where} RETURNING level, is_acknowledged', params)
+            rows = [(level, bool(acked), 1) for level, acked in cursor.fetchall()]
+        else:
+            rows = list(queryset.select_for_update().order_by().values_list('level', 'is_acknowledged')
+                        .annotate(n=models.Count('id')).values_list('level', 'is_acknowledged', 'n'))
+            cursor.execute(f'DELETE FROM {table} WHERE {where}', params)
+
+        deltas = {}
+        by_level = {}
+        for level, acked, n in rows:
+            by_level[level] = by_level.get(level, 0) + n
+            for key, value in dashboard.alert_contribution(level, acked).items():
+                deltas[key] = deltas.get(key, 0) - value * n
+        dashboard.apply_deltas(deltas)
+    deleted = sum(by_level.values())
+    if deleted:
+        dashboard.invalidate_recent()
+        live.notify('alerts', live.RELOAD)
+    return {'deleted': deleted, 'by_level': by_level}
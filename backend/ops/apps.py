@@ -3,3 +3,10 @@ from django.apps import AppConfig
 
 class OpsConfig(AppConfig):
     name = 'ops'
+
+    def ready(self):
+        from django.db.models.signals import post_migrate
+
+        from . import signals
+
+        post_migrate.connect(signals.ensure_search_index, sender=self)
@@ -0,0 +1,270 @@
+"""
+主机指标采集器
+通过 SSH 连接池在远端执行 host_probe 探针（读取 /proc 与 statvfs），一次往返取回全部指标，
+支持多主机并发采集与批量回写
+"""
+import json
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from pathlib import Path
+
+from django.conf import settings
+from django.db import connection, transaction
+
+from . import dashboard, live, ssh_pool, timeseries
+from .models import Host
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CONCURRENCY = 32
+DEFAULT_TIMEOUT = 15
+METRIC_FIELDS = ['cpu_usage', 'memory_usage', 'disk_usage', 'status']
+
+PROBE_SOURCE = Path(__file__).with_name('host_probe.py').read_text(encoding='utf-8')
+PROBE_COMMAND = (
+    "sh -c 'if command -v python3 >/dev/null 2>&1; then exec python3 - {interval}; "
+    "elif command -v python >/dev/null 2>&1; then exec python - {interval}; "
+    "else exit 127; fi'"
+)
+
+
+def _to_float(value):
+    try:
+        return round(float(value), 1)
+    except (ValueError, TypeError):
+        return None
+
+
+def _collect_legacy(client, timeout):
+    """远端没有 python 解释器时的兜底方案：top / free / df 三次往返"""
+    def _exec(cmd):
+        stdin, stdout, stderr = client.exec_command(cmd, timeout=timeout)
+        return stdout.read().decode('utf-8', errors='replace').strip()
+
+    return {
+        'cpu_usage': _to_float(_exec("top -bn1 | grep 'Cpu(s)' | awk '{print $2}'")),
+        'memory_usage': _to_float(_exec("free | grep Mem | awk '{printf(\"%.1f\", $3/$2*100)}'")),
+        'disk_usage': _to_float(_exec("df / | tail -1 | awk '{print $5}' | tr -d '%'")),
+    }
+
+
+def _percent(used, total):
+    return round(used * 100.0 / total, 1) if total else None
+
+
+def parse_probe(doc):
+    """
+    将 host_probe 输出的 JSON 文档解析为指标字典
+    前三项对应 Host 字段，其余为扩展指标（负载、网络、各挂载点等）
+    """
+    mem = doc.get('mem') or {}
+    net = doc.get('net') or {}
+    load = list(doc.get('load') or [])[:3]
+
+    disks = []
+    for mount, fstype, total, used, avail in doc.get('disks') or []:
+        # 与 df 的 Use% 口径一致：used / (used + 普通用户可用)
+        disks.append({
+            'mount': mount,
+            'fstype': fstype,
+            'total': total,
+            'used': used,
+            'usage': _percent(used, used + avail),
+        })
+    root = next((d for d in disks if d['mount'] == '/'), None)
+    if root is None and disks:
+        root = max(disks, key=lambda d: d['usage'] or 0)
+
+    mem_total = mem.get('total') or 0
+    swap_total = mem.get('swap_total') or 0
+    return {
+        'cpu_usage': _to_float(doc.get('cpu')),
+        'memory_usage': _percent(mem_total - (mem.get('avail') or 0), mem_total),
+        'disk_usage': root['usage'] if root else None,
+        'ts': doc.get('ts'),
+        'ncpu': doc.get('ncpu'),
+        'load': load,
+        'uptime': doc.get('uptime'),
+        'swap_usage': _percent(swap_total - (mem.get('swap_free') or 0), swap_total),
+        'net_rx_bps': net.get('rx_bps'),
+        'net_tx_bps': net.get('tx_bps'),
+        'disks': disks,
+    }
+
+
+def collect_metrics(host, timeout=DEFAULT_TIMEOUT):
+    """
+    采集单台主机指标，失败抛出异常
+    通过一次 exec 把 host_probe.py 经 stdin 交给远端 python 执行，返回 parse_probe() 的结果
+    """
+    interval = getattr(settings, 'HOST_PROBE_INTERVAL', 0.25)
+    with ssh_pool.acquire(host, timeout=timeout, connect_timeout=timeout) as client:
+        stdin, stdout, stderr = client.exec_command(PROBE_COMMAND.format(interval=interval), timeout=timeout)
+        stdin.write(PROBE_SOURCE)
+        stdin.flush()
+        stdin.channel.shutdown_write()
+        output = stdout.read()
+        exit_code = stdout.channel.recv_exit_status()
+        if exit_code == 127:
+            return _collect_legacy(client, timeout)
+        if exit_code != 0:
+            err = stderr.read().decode('utf-8', errors='replace').strip()
+            raise RuntimeError(f'探针执行失败 (exit {exit_code}): {err[-200:]}')
+    return parse_probe(json.loads(output))
+
+
+def apply_metrics(host, metrics):
+    """将采集结果写回 Host 实例（不保存），解析失败的指标保留原值"""
+    for field in ('cpu_usage', 'memory_usage', 'disk_usage'):
+        value = metrics.get(field)
+        if value is not None:
+            setattr(host, field, value)
+    host.status = 'online'
+
+
+def _dashboard_deltas(rows):
+    """锁定并读取本批主机的旧值，返回回写后主机计数器的增量（须在事务中调用）"""
+    deltas = {}
+    for i in range(0, len(rows), 500):
+        batch = rows[i:i + 500]
+        previous = {
+            pk: values for pk, *values in Host.objects.select_for_update().filter(
+                pk__in=[row[0] for row in batch],
+            ).values_list('pk', 'status', 'cpu_usage', 'memory_usage', 'disk_usage')
+        }
+        for host_id, cpu, memory, disk, status in batch:
+            old = previous.get(host_id)
+            if old is None:
+                continue
+            # 指标为 None 时保留原值，与 UPDATE 中的 COALESCE 一致
+            metrics = [value if value is not None else prev for value, prev in zip((cpu, memory, disk), old[1:])]
+            new = (status, *metrics)
+            for key, value in dashboard.diff(dashboard.host_contribution(*old),
+                                             dashboard.host_contribution(*new)).items():
+                deltas[key] = deltas.get(key, 0) + value
+    return deltas
+
+
+def save_host_metrics(rows):
+    """
+    批量回写主机指标，rows: [(host_id, cpu_usage, memory_usage, disk_usage, status), ...]
+    指标为 None 时保留原值。SQLite / PostgreSQL 下每批只执行一条 UPDATE ... FROM (VALUES ...)，
+    避免 bulk_update 生成的超长 CASE WHEN；其它数据库退回 bulk_update。
+    批量 UPDATE 不触发模型信号，在同一事务中读取本批主机的旧值，把新旧贡献之差累加到仪表盘计数器，并通知实时推送
+    """
+    # 同一主机出现多次时以最后一条为准
+    rows = list({row[0]: row for row in rows}.values())
+    if not rows:
+        return 0
+    if connection.vendor not in ('sqlite', 'postgresql'):
+        groups = {}
+        for host_id, *values in rows:
+            host = Host(pk=host_id)
+            fields = []
+            for field, value in zip(METRIC_FIELDS, values):
+                if value is not None:
+                    setattr(host, field, value)
+                    fields.append(field)
+            groups.setdefault(tuple(fields), []).append(host)
+        with transaction.atomic():
+            deltas = _dashboard_deltas(rows)
+            for fields, hosts in groups.items():
+                Host.objects.bulk_update(hosts, fields, batch_size=500)
+            dashboard.apply_deltas(deltas)
+        live.notify('hosts', [row[0] for row in rows])
+        return len(rows)
+
+    table = connection.ops.quote_name(Host._meta.db_table)
+    cast = '::double precision' if connection.vendor == 'postgresql' else ''
+    per_batch = max(1, (connection.features.max_query_params or 999) // 5)
+    with transaction.atomic(), connection.cursor() as cursor:
+        deltas = _dashboard_deltas(rows)
+        for i in range(0, len(rows), per_batch):
+            batch = rows[i:i + per_batch]
+            values = ', '.join(['(%s, %s, %s, %s, %s)'] * len(batch))
+            params = [value for row in batch for value in row]
+            cursor.execute(
+                f'WITH v(id, cpu, mem, disk, status) AS (VALUES {values}) '
+                f'UPDATE {table} SET '
+                f'cpu_usage = COALESCE(v.cpu{cast}, {table}.cpu_usage), '
+                f'memory_usage = COALESCE(v.mem{cast}, {table}.memory_usage), '
+                f'disk_usage = COALESCE(v.disk{cast}, {table}.disk_usage), '
+                f'status = v.status '
+                f'FROM v WHERE {table}.id = v.id',
+                params,
+            )
+        dashboard.apply_deltas(deltas)
+    live.notify('hosts', [row[0] for row in rows])
+    return len(rows)
+
+
+def refresh_hosts(hosts, concurrency=DEFAULT_CONCURRENCY, timeout=DEFAULT_TIMEOUT):
+    """
+    并发刷新多台主机指标，并批量回写
+    返回 (results, summary)：
+      results: [{'id', 'hostname', 'success', 'elapsed_ms', 'error'?}, ...]
+      summary: {'total', 'success', 'failed', 'concurrency', 'elapsed_ms'}
+    """
+    hosts = list(hosts)
+    started = time.monotonic()
+    results = {}
+
+    def _task(host):
+        t0 = time.monotonic()
+        try:
+            metrics = collect_metrics(host, timeout=timeout)
+            return metrics, None, time.monotonic() - t0
+        except Exception as e:
+            return None, str(e) or e.__class__.__name__, time.monotonic() - t0
+
+    workers = max(1, min(concurrency, len(hosts) or 1))
+    executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='host-refresh')
+    try:
+        futures = {executor.submit(_task, host): host for host in hosts}
+        # 单台主机的连接/命令都受 timeout 约束，这里再给整体等待加一层兜底，
+        # 避免个别卡死的 SSH 会话拖住整个请求
+        batches = -(-len(hosts) // workers) if hosts else 0
+        done, not_done = wait(futures, timeout=timeout * 3 * max(batches, 1))
+        for future in done:
+            results[futures[future].pk] = future.result()
+        for future in not_done:
+            future.cancel()
+            results[futures[future].pk] = (None, '采集超时', time.monotonic() - started)
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    updates = []
+    samples = []
+    rows = []
+    for host in hosts:
+        metrics, error, elapsed = results[host.pk]
+        if error is None:
+            apply_metrics(host, metrics)
+            samples.append((host.pk, metrics))
+        else:
+            logger.warning('refresh host %s failed: %s', host.hostname, error)
+            host.status = 'offline'
+        updates.append((host.pk, host.cpu_usage, host.memory_usage, host.disk_usage, host.status))
+        row = {
+            'id': host.pk,
+            'hostname': host.hostname,
+            'success': error is None,
+            'elapsed_ms': int(elapsed * 1000),
+        }
+        if error is not None:
+            row['error'] = error
+        rows.append(row)
+
+    save_host_metrics(updates)
+    timeseries.record_samples(samples)
+
+    success = sum(1 for r in rows if r['success'])
+    summary = {
+        'total': len(rows),
+        'success': success,
+        'failed': len(rows) - success,
+        'concurrency': workers,
+        'elapsed_ms': int((time.monotonic() - started) * 1000),
+    }
+    return rows, summary
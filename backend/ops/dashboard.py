@@ -0,0 +1,213 @@
+"""
+仪表盘统计快照
+- 计数器（总数、各状态数、资源使用率之和）存放在 DashboardCounter 表中，
+  单条记录的增删改由 ops/signals.py 通过 post_save / post_delete 以增量 UPDATE 维护
+- QuerySet.update() / bulk_update 等不触发信号的批量路径，自行读取旧值计算增量后调用 apply_deltas（如
+  collector.save_host_metrics），或调用 reconcile(['hosts']) 等按分区重算
+- reconcile() 定期与业务表对账（调度器任务 / reconcile_dashboard 命令），修正并发或遗漏造成的偏差
+- 最近部署 / 未确认告警列表缓存 DASHBOARD_RECENT_TTL 秒，相关记录变化时失效
+
+读取快照只需一次查询，与业务表的数据量无关。
+"""
+import logging
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Case, Count, F, FloatField, Q, Sum, Value, When
+
+from .models import Alert, DashboardCounter, Deployment, Host
+from .serializers import AlertSerializer, DeploymentSerializer
+
+logger = logging.getLogger(__name__)
+
+RECENT_CACHE_KEY = 'ops:dashboard:recent'
+RECONCILED_KEY = 'meta.reconciled_at'
+SECTIONS = ('hosts', 'deployments', 'alerts')
+
+
+# ----------------------------------------------------------------------
+# 单条记录对计数器的贡献
+# ----------------------------------------------------------------------
+
+def host_contribution(status, cpu, memory, disk):
+    return {
+        'hosts.total': 1,
+        f'hosts.status.{status}': 1,
+        'hosts.sum_cpu': cpu or 0,
+        'hosts.sum_memory': memory or 0,
+        'hosts.sum_disk': disk or 0,
+    }
+
+
+def deployment_contribution(status):
+    return {'deployments.total': 1, f'deployments.status.{status}': 1}
+
+
+def alert_contribution(level, is_acknowledged):
+    return {
+        'alerts.total': 1,
+        'alerts.unacknowledged': 0 if is_acknowledged else 1,
+        f'alerts.level.{level}': 1,
+    }
+
+
+def diff(before, after):
+    """两个贡献字典之差（after - before），省略为 0 的项"""
+    deltas = dict(after or {})
+    for key, value in (before or {}).items():
+        deltas[key] = deltas.get(key, 0) - value
+    return {key: value for key, value in deltas.items() if value}
+
+
+# ----------------------------------------------------------------------
+# 计数器读写
+# ----------------------------------------------------------------------
+
+def apply_deltas(deltas):
+    """以一条 UPDATE 语句原子地累加多个计数器（value = value + delta）"""
+    deltas = {key: value for key, value in deltas.items() if value}
+    if not deltas:
+        return 0
+    return DashboardCounter.objects.filter(key__in=list(deltas)).update(
+        value=F('value') + Case(
+            *[When(key=key, then=Value(float(delta))) for key, delta in deltas.items()],
+            default=Value(0.0), output_field=FloatField(),
+        ),
+    )
+
+
+def _write(values):
+    DashboardCounter.objects.bulk_create(
+        [DashboardCounter(key=key, value=value) for key, value in values.items()],
+        update_conflicts=True, unique_fields=['key'], update_fields=['value', 'updated_at'],
+    )
+
+
+def _count_by(queryset, field):
+    return dict(queryset.values_list(field).annotate(count=Count('id')).values_list(field, 'count'))
+
+
+def _compute_hosts():
+    agg = Host.objects.aggregate(
+        total=Count('id'), sum_cpu=Sum('cpu_usage'), sum_memory=Sum('memory_usage'), sum_disk=Sum('disk_usage'),
+    )
+    values = {f'hosts.status.{s}': 0 for s, _ in Host.STATUS_CHOICES}
+    values.update({f'hosts.status.{s}': n for s, n in _count_by(Host.objects, 'status').items()})
+    values.update({f'hosts.{k}': v or 0 for k, v in agg.items()})
+    return values
+
+
+def _compute_deployments():
+    values = {f'deployments.status.{s}': 0 for s, _ in Deployment.STATUS_CHOICES}
+    values.update({f'deployments.status.{s}': n for s, n in _count_by(Deployment.objects, 'status').items()})
+    values['deployments.total'] = sum(values.values())
+    return values
+
+
+def _compute_alerts():
+    values = {f'alerts.level.{level}': 0 for level, _ in Alert.LEVEL_CHOICES}
+    values.update({f'alerts.level.{level}': n for level, n in _count_by(Alert.objects, 'level').items()})
+    agg = Alert.objects.aggregate(total=Count('id'), unacknowledged=Count('id', filter=Q(is_acknowledged=False)))
+    values.update({f'alerts.{k}': v for k, v in agg.items()})
+    return values
+
+
+_COMPUTE = {'hosts': _compute_hosts, 'deployments': _compute_deployments, 'alerts': _compute_alerts}
+
+
+def reconcile(sections=None):
+    """
+    按分区从业务表重算计数器并覆盖写入
+    返回与快照不一致的计数器 {key: (旧值, 新值)}，便于观察漂移
+    """
+    sections = SECTIONS if sections is None else sections
+    values = {}
+    with transaction.atomic():
+        for section in sections:
+            values.update(_COMPUTE[section]())
+        current = dict(DashboardCounter.objects.filter(key__in=list(values)).values_list('key', 'value'))
+        if set(sections) == set(SECTIONS):
+            values[RECONCILED_KEY] = time.time()
+        _write(values)
+    drift = {
+        key: (current.get(key), value) for key, value in values.items()
+        if key != RECONCILED_KEY and abs((current.get(key) or 0) - value) > 1e-6
+    }
+    if drift and current:
+        logger.info('dashboard counters reconciled, drift: %s', drift)
+    return drift
+
+
+def snapshot():
+    """读取全部计数器；首次使用或长时间未对账（无调度器运行）时先全量对账"""
+    values = dict(DashboardCounter.objects.values_list('key', 'value'))
+    max_age = getattr(settings, 'DASHBOARD_MAX_STALENESS', 3600)
+    if time.time() - values.get(RECONCILED_KEY, 0) > max_age:
+        reconcile()
+        values = dict(DashboardCounter.objects.values_list('key', 'value'))
+    return values
+
+
+# ----------------------------------------------------------------------
+# 最近列表
+# ----------------------------------------------------------------------
+
+def invalidate_recent():
+    cache.delete(RECENT_CACHE_KEY)
+
+
+def recent_lists():
+    data = cache.get(RECENT_CACHE_KEY)
+    if data is None:
+        data = {
+            'recent_deploys': DeploymentSerializer(
+                Deployment.objects.select_related('host').all()[:10], many=True
+            ).data,
+            'recent_alerts': AlertSerializer(
+                Alert.objects.select_related('host').filter(is_acknowledged=False)[:10], many=True
+            ).data,
+        }
+        cache.set(RECENT_CACHE_KEY, data, getattr(settings, 'DASHBOARD_RECENT_TTL', 10))
+    return data
+
+
+def build_stats():
+    """组装 /api/dashboard/stats/ 的响应数据"""
+    c = snapshot()
+
+    def n(key):
+        return int(round(c.get(key, 0)))
+
+    host_total = n('hosts.total')
+
+    def avg(key):
+        return round(c.get(key, 0) / host_total, 1) if host_total else 0
+
+    data = {
+        'hosts': {
+            'total': host_total,
+            'online': n('hosts.status.online'),
+            'offline': n('hosts.status.offline'),
+            'warning': n('hosts.status.warning'),
+            'avg_cpu': avg('hosts.sum_cpu'),
+            'avg_memory': avg('hosts.sum_memory'),
+            'avg_disk': avg('hosts.sum_disk'),
+        },
+        'deployments': {
+            'total': n('deployments.total'),
+            'success': n('deployments.status.success'),
+            'failed': n('deployments.status.failed'),
+            'running': n('deployments.status.running'),
+        },
+        'alerts': {
+            'total': n('alerts.total'),
+            'unacknowledged': n('alerts.unacknowledged'),
+            'critical': n('alerts.level.critical'),
+            'warning': n('alerts.level.warning'),
+            'info': n('alerts.level.info'),
+        },
+    }
+    data.update(recent_lists())
+    return data
@@ -0,0 +1,203 @@
+"""
+读写分离
+ReplicaRouter 把安全的读请求（GET / HEAD / OPTIONS 下的列表、详情、仪表盘、导出）路由到 DATABASE_REPLICAS 中的只读副本，
+其余一律走主库（default）:
+    - 写操作始终走主库；请求内一旦发生写入，该请求后续的读也走主库
+    - 读自己的写: 发生写入的请求在响应中设置 Cookie，DATABASE_STICKY_SECONDS 秒内同一客户端的读请求仍走主库
+    - 事务内、请求之外（调度器、管理命令、WebSocket 推送）的查询走主库
+    - 副本定期探活（SQLite 副本另检查文件是否存在，PostgreSQL 副本检查复制延迟），不健康的副本被摘除，全部不健康时回落主库
+需要强一致读的代码可用 `with use_primary():` 固定到主库。
+
+配置（settings）:
+    DATABASE_ROUTERS = ['ops.db_router.ReplicaRouter']
+    DATABASE_REPLICAS = ['replica']           # DATABASES 中的副本别名，为空时不做读写分离
+    DATABASE_STICKY_SECONDS = 5
+    DATABASE_REPLICA_CHECK_INTERVAL = 10      # 健康副本的探活间隔（秒）
+    DATABASE_REPLICA_RETRY_INTERVAL = 30      # 不健康副本的重试间隔（秒）
+    DATABASE_REPLICA_MAX_LAG = 30             # 允许的最大复制延迟（秒，仅 PostgreSQL）
+并在 MIDDLEWARE 中加入 'ops.db_router.ReplicaRoutingMiddleware'。
+"""
+import contextvars
+import logging
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+logger = logging.getLogger(__name__)
+
+STICKY_COOKIE = 'db_primary_until'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+class RoutingState:
+    """单个请求的路由状态；对象在请求内共享，sync_to_async 线程中的写入对请求可见"""
+
+    def __init__(self, read_replica):
+        self.read_replica = read_replica
+        self.wrote = False
+        self.replica = None   # 首次读取时选定，同一请求内的读取（如分页的 COUNT 与数据行）使用同一个从库
+
+
+_state = contextvars.ContextVar('db_routing_state', default=None)
+_pinned = contextvars.ContextVar('db_routing_pinned', default=False)
+
+
+def replicas():
+    return [alias for alias in getattr(settings, 'DATABASE_REPLICAS', []) if alias in settings.DATABASES]
+
+
+@contextmanager
+def use_primary():
+    """块内的读全部走主库"""
+    token = _pinned.set(True)
+    try:
+        yield
+    finally:
+        _pinned.reset(token)
+
+
+# ----------------------------------------------------------------------
+# 副本健康检查
+# ----------------------------------------------------------------------
+
+_health = {}  # alias -> (healthy, checked_at)
+_health_lock = threading.Lock()
+
+
+def _probe(alias):
+    """返回 (是否健康, 原因)"""
+    connection = connections[alias]
+    if connection.vendor == 'sqlite':
+        name = str(connection.settings_dict['NAME'])
+        # 连接不存在的 SQLite 文件会直接创建一个空库
+        if not name.startswith(':memory:') and 'mode=memory' not in name and not os.path.exists(name):
+            return False, f'文件不存在: {name}'
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1 FROM django_migrations LIMIT 1')
+            cursor.fetchone()
+            if connection.vendor == 'postgresql':
+                cursor.execute('SELECT EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())')
+                lag = cursor.fetchone()[0]
+                max_lag = getattr(settings, 'DATABASE_REPLICA_MAX_LAG', 30)
+                if lag is not None and lag > max_lag:
+                    return False, f'复制延迟 {lag:.0f}s'
+    except Exception as exc:
+        connection.close()
+        return False, str(exc)
+    return True, ''
+
+
+def is_healthy(alias, force=False):
+    now = time.monotonic()
+    healthy, checked_at = _health.get(alias, (None, 0))
+    interval = getattr(settings, 'DATABASE_REPLICA_CHECK_INTERVAL', 10) if healthy else \
+        getattr(settings, 'DATABASE_REPLICA_RETRY_INTERVAL', 30)
+    if not force and healthy is not None and now - checked_at < interval:
+        return healthy
+    with _health_lock:
+        healthy, checked_at = _health.get(alias, (None, 0))
+        if force or healthy is None or now - checked_at >= interval:
+            ok, reason = _probe(alias)
+            if ok != healthy:
+                if ok:
+                    logger.info('database replica %s is healthy', alias)
+                else:
+                    logger.warning('database replica %s is unhealthy: %s', alias, reason)
+            _health[alias] = (ok, time.monotonic())
+            healthy = ok
+    return healthy
+
+
+def health(force=False):
+    return {alias: is_healthy(alias, force=force) for alias in replicas()}
+
+
+# ----------------------------------------------------------------------
+# 路由
+# ----------------------------------------------------------------------
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        state = _state.get()
+        if (state is None or not state.read_replica or state.wrote or _pinned.get()
+                or connections[DEFAULT_DB_ALIAS].in_atomic_block):
+            return DEFAULT_DB_ALIAS
+        if state.replica is not None and is_healthy(state.replica):
+            return state.replica
+        candidates = [alias for alias in replicas() if is_healthy(alias)]
+        state.replica = random.choice(candidates) if candidates else None
+        return state.replica or DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is not None:
+            state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        pool = {DEFAULT_DB_ALIAS, *replicas()}
+        if obj1._state.db in pool and obj2._state.db in pool:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in getattr(settings, 'DATABASE_REPLICAS', []):
+            return False
+        return None
+
+
+def _sticky(request):
+    try:
+        return float(request.COOKIES.get(STICKY_COOKIE, 0)) > time.time()
+    except ValueError:
+        return False
+
+
+class ReplicaRoutingMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def _start(self, request):
+        read_replica = bool(replicas()) and request.method in SAFE_METHODS and not _sticky(request)
+        return _state.set(RoutingState(read_replica))
+
+    def _finish(self, request, response, token):
+        state = _state.get()
+        _state.reset(token)
+        if replicas() and (state.wrote or request.method not in SAFE_METHODS):
+            window = getattr(settings, 'DATABASE_STICKY_SECONDS', 5)
+            response.set_cookie(STICKY_COOKIE, f'{time.time() + window:.3f}', max_age=window,
+                                httponly=True, samesite='Lax')
+        return response
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        token = self._start(request)
+        try:
+            response = self.get_response(request)
+        except BaseException:
+            _state.reset(token)
+            raise
+        return self._finish(request, response, token)
+
+    async def __acall__(self, request):
+        token = self._start(request)
+        try:
+            response = await self.get_response(request)
+        except BaseException:
+            _state.reset(token)
+            raise
+        return self._finish(request, response, token)
@@ -0,0 +1,127 @@
+"""
+流式导出（CSV / NDJSON，可选 gzip）
+GET /api/logs/export/、/api/alerts/export/、/api/deployments/export/
+    fmt       csv（默认）/ ndjson
+    compress  gzip 时输出 .gz 文件
+    search    与列表接口相同的全文检索
+    start/end 时间范围（Unix 秒或 ISO 8601），作用于各模型的时间字段
+
+行通过 values_list().iterator(chunk_size=EXPORT_CHUNK_SIZE) 逐块读取，编码后按约 EXPORT_BLOCK_SIZE 字节
+输出一次，不构造模型实例、不缓存结果集，内存占用与导出行数无关。
+ASGI 下 StreamingHttpResponse 会把同步迭代器整体读入内存再发送，因此 ASGI 请求改用异步迭代器，
+每次在同一数据库线程中取下一块。
+"""
+import csv
+import io
+import json
+import zlib
+from datetime import datetime
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+
+FORMATS = {
+    'csv': ('text/csv; charset=utf-8', 'csv'),
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+}
+
+
+def _converter():
+    # 当前时区只解析一次，逐值调用 timezone.localtime() 的开销与行数成正比
+    tz = timezone.get_current_timezone()
+
+    def convert(value):
+        if isinstance(value, datetime):
+            return value.astimezone(tz).isoformat() if value.tzinfo else value.isoformat()
+        return value
+    return convert
+
+
+def _encode_csv(headers, rows, batch=500):
+    convert = _converter()
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    # UTF-8 BOM 便于 Excel 正确识别中文
+    buffer.write('\ufeff')
+    writer.writerow(headers)
+    for i, row in enumerate(rows, 1):
+        writer.writerow(['' if v is None else convert(v) for v in row])
+        if i % batch == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def _encode_ndjson(headers, rows):
+    convert = _converter()
+    for row in rows:
+        yield json.dumps(dict(zip(headers, map(convert, row))), ensure_ascii=False, separators=(',', ':')) + '\n'
+
+
+ENCODERS = {'csv': _encode_csv, 'ndjson': _encode_ndjson}
+
+
+def stream_rows(queryset, columns, fmt='csv', compress=False, chunk_size=None, block_size=None):
+    """
+    columns: [(列名, values_list 字段路径), ...]
+    以 bytes 块的形式产出编码（及压缩）后的导出内容
+    """
+    chunk_size = chunk_size or getattr(settings, 'EXPORT_CHUNK_SIZE', 2000)
+    block_size = block_size or getattr(settings, 'EXPORT_BLOCK_SIZE', 64 * 1024)
+    headers = [name for name, _ in columns]
+    rows = queryset.values_list(*[path for _, path in columns]).iterator(chunk_size=chunk_size)
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if compress else None
+
+    pending = []
+    size = 0
+    for text in ENCODERS[fmt](headers, rows):
+        pending.append(text)
+        size += len(text)
+        if size >= block_size:
+            data = ''.join(pending).encode()
+            pending, size = [], 0
+            if compressor:
+                data = compressor.compress(data)
+            if data:
+                yield data
+    data = ''.join(pending).encode()
+    if compressor:
+        data = compressor.compress(data) + compressor.flush()
+    if data:
+        yield data
+
+
+async def _aiter(iterator):
+    """把同步生成器逐块搬到异步上下文；thread_sensitive 保证始终在同一线程使用同一数据库连接"""
+    sentinel = object()
+    next_block = sync_to_async(lambda: next(iterator, sentinel), thread_sensitive=True)
+    while True:
+        block = await next_block()
+        if block is sentinel:
+            return
+        yield block
+
+
+def export_response(request, queryset, columns, filename):
+    fmt = request.GET.get('fmt') or 'csv'
+    if fmt not in FORMATS:
+        raise ValidationError({'fmt': f'不支持的导出格式: {fmt}（可选 {", ".join(FORMATS)}）'})
+    compress = request.GET.get('compress') == 'gzip'
+    content_type, ext = FORMATS[fmt]
+    name = f'{filename}-{timezone.localtime():%Y%m%d%H%M%S}.{ext}'
+    if compress:
+        content_type, name = 'application/gzip', name + '.gz'
+
+    # ASGI 下流式迭代发生在中间件返回之后，这里先确定读库（见 ops/db_router.py）
+    content = stream_rows(queryset.using(queryset.db), columns, fmt=fmt, compress=compress)
+    if isinstance(getattr(request, '_request', request), ASGIRequest):
+        content = _aiter(content)
+    response = StreamingHttpResponse(content, content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="{name}"'
+    return response
+
@@ -0,0 +1,162 @@
+"""
+列表接口的只读快速序列化
+ModelSerializer 逐行逐字段经过 get_attribute / to_representation 的通用流程，页大小较大时成为列表接口的主要耗时。
+ValuesSerializer 由现有 ModelSerializer 的声明推导出一份“读取计划”：
+
+    模型字段                  -> values() 中的同名列
+    外键（PrimaryKeyRelated）  -> values() 中的外键 id
+    source='get_X_display'    -> 预先计算的 X 字段 choices 标签表
+    source='host.hostname'    -> values() 中的 host__hostname，关联为空时取字段 default
+
+列表查询改用 queryset.values(...) 一次取出所需列（不构造模型实例），再按计划直接生成与原序列化器
+字段顺序、取值完全一致的字典。包含无法推导的字段（SerializerMethodField、嵌套序列化器等）时
+get_values_serializer() 返回 None，调用方退回原序列化器。
+
+python manage.py bench_serializers 对比两种方式的耗时并校验输出一致。
+"""
+import datetime
+
+from django.conf import settings
+from django.utils import timezone
+from rest_framework import fields as drf_fields, relations
+from rest_framework.fields import empty
+from rest_framework.settings import api_settings
+
+_cache = {}
+
+
+class Unsupported(Exception):
+    pass
+
+
+def _identity(value):
+    return value
+
+
+def _datetime(tz):
+    def convert(value):
+        if isinstance(value, str):
+            return value
+        if tz is not None:
+            value = value.astimezone(tz) if timezone.is_aware(value) else timezone.make_aware(value, tz)
+        elif timezone.is_aware(value):
+            value = timezone.make_naive(value, datetime.timezone.utc)
+        value = value.isoformat()
+        if value.endswith('+00:00'):
+            value = value[:-6] + 'Z'
+        return value
+    return convert
+
+
+SIMPLE_CONVERTERS = [
+    # 子类在前：IPAddressField / EmailField 等都是 CharField
+    (drf_fields.BooleanField, bool),
+    (drf_fields.IntegerField, int),
+    (drf_fields.FloatField, float),
+    (drf_fields.ChoiceField, _identity),
+    (drf_fields.CharField, str),
+    (drf_fields.ReadOnlyField, _identity),
+    (relations.PrimaryKeyRelatedField, _identity),
+]
+
+
+class _Column:
+    """kind: value（convert 转换）/ label（choices 标签）/ datetime（tz 为 empty 时使用当前时区）"""
+    __slots__ = ('name', 'path', 'kind', 'convert', 'default', 'labels', 'tz')
+
+    def __init__(self, name, path, kind='value', convert=_identity, default=None, labels=None, tz=empty):
+        self.name = name
+        self.path = path
+        self.kind = kind
+        self.convert = convert
+        self.default = default
+        self.labels = labels
+        self.tz = tz
+
+
+class ValuesSerializer:
+    def __init__(self, serializer_class):
+        serializer = serializer_class()
+        self.serializer_class = serializer_class
+        self.model = serializer.Meta.model
+        self.columns = [
+            self._compile(name, field) for name, field in serializer.fields.items() if not field.write_only
+        ]
+        self.paths = list(dict.fromkeys(column.path for column in self.columns))
+
+    def _compile(self, name, field):
+        opts = self.model._meta
+        attrs = field.source_attrs
+        if field.source == '*' or not attrs:
+            raise Unsupported(name)
+
+        # get_X_display
+        if len(attrs) == 1 and attrs[0].startswith('get_') and attrs[0].endswith('_display'):
+            model_field = opts.get_field(attrs[0][4:-8])
+            labels = {value: str(label) for value, label in model_field.flatchoices}
+            return _Column(name, model_field.attname, kind='label', labels=labels)
+
+        # 跨关联的取值（host.hostname），中间对象为空时 DRF 使用字段 default
+        path = '__'.join(attrs)
+        if len(attrs) == 1:
+            model_field = opts.get_field(attrs[0])
+            if model_field.is_relation and not isinstance(field, relations.PrimaryKeyRelatedField):
+                raise Unsupported(name)
+            path = model_field.attname if model_field.is_relation else model_field.name
+        default = None if field.default is empty or len(attrs) == 1 else field.default
+
+        if isinstance(field, drf_fields.DateTimeField):
+            if getattr(field, 'format', api_settings.DATETIME_FORMAT) not in (None, drf_fields.ISO_8601):
+                raise Unsupported(name)
+            tz = field.timezone if hasattr(field, 'timezone') else empty
+            return _Column(name, path, kind='datetime', default=default, tz=tz)
+        for field_class, convert in SIMPLE_CONVERTERS:
+            if isinstance(field, field_class):
+                return _Column(name, path, convert=convert, default=default)
+        raise Unsupported(name)
+
+    def _columns(self, names):
+        if names is None:
+            return self.columns
+        return [column for column in self.columns if column.name in names]
+
+    def values(self, queryset, names=None, extra_paths=()):
+        """
+        转换为只取所需列的 values() 查询；names 为稀疏字段集（见 ops/fieldsets.py），
+        extra_paths 为分页排序需要的列，extra(select=...) 的列（如检索排序 search_rank）一并保留
+        """
+        paths = self.paths if names is None else [column.path for column in self._columns(names)]
+        return queryset.values(*dict.fromkeys([*paths, *extra_paths]), *queryset.query.extra)
+
+    def to_representation(self, rows, names=None):
+        # 时区在每次调用时解析一次（与 DRF DateTimeField.default_timezone 相同的规则）
+        current_tz = timezone.get_current_timezone() if settings.USE_TZ else None
+        plan = []
+        for column in self._columns(names):
+            if column.kind == 'label':
+                labels = column.labels
+                plan.append((column.name, column.path, None, lambda v, labels=labels: labels.get(v, str(v))))
+            elif column.kind == 'datetime':
+                tz = current_tz if column.tz is empty else column.tz
+                plan.append((column.name, column.path, column.default, _datetime(tz)))
+            else:
+                plan.append((column.name, column.path, column.default, column.convert))
+
+        data = []
+        for row in rows:
+            item = {}
+            for name, path, default, convert in plan:
+                value = row[path]
+                item[name] = default if value is None else convert(value)
+            data.append(item)
+        return data
+
+
+def get_values_serializer(serializer_class):
+    """返回 serializer_class 对应的 ValuesSerializer；存在无法推导的字段时返回 None"""
+    if serializer_class not in _cache:
+        try:
+            _cache[serializer_class] = ValuesSerializer(serializer_class)
+        except Unsupported:
+            _cache[serializer_class] = None
+    return _cache[serializer_class]
@@ -0,0 +1,128 @@
+"""
+稀疏字段集
+列表 / 详情接口支持 ?fields=a,b,c 只返回指定字段，?exclude=x,y 去掉指定字段（两者可同时使用）。
+字段选择同时下推到查询：
+    - 序列化器只保留所选字段
+    - 按所选字段的 source 推导需要读取的列，以 only() 查询，未选中的大文本列不会从数据库读出
+    - 未被所选字段用到的 select_related / prefetch_related 一并去掉
+所选字段中含无法推导数据来源的字段（SerializerMethodField、source='*' 等）时只裁剪序列化器，不做 only()。
+仅作用于 GET 的 list / retrieve，写操作与自定义动作不受影响。
+"""
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework.exceptions import ValidationError
+from rest_framework.serializers import ListSerializer, SerializerMethodField
+
+FIELDS_PARAM = 'fields'
+EXCLUDE_PARAM = 'exclude'
+
+
+def _parse(value):
+    return [name.strip() for name in (value or '').split(',') if name.strip()]
+
+
+def required_columns(model, field):
+    """
+    推导序列化器字段依赖的模型列
+    返回 (列集合, 依赖的关联名集合)；无法推导时返回 None
+    """
+    attrs = field.source_attrs
+    if isinstance(field, SerializerMethodField) or field.source == '*' or not attrs:
+        return None
+    name = attrs[0]
+    if name.startswith('get_') and name.endswith('_display'):
+        name = name[4:-8]
+    try:
+        model_field = model._meta.get_field(name)
+    except FieldDoesNotExist:
+        return None
+    if not model_field.concrete:
+        # 反向关联 / 多对多：由 prefetch 读取，不占用本表的列
+        return set(), {name}
+    if not model_field.is_relation or len(attrs) == 1:
+        return {model_field.name}, set()
+    if len(attrs) == 2:
+        return {model_field.name, f'{name}__{attrs[1]}'}, {name}
+    return None
+
+
+class SparseFieldsetMixin:
+    def sparse_fields(self):
+        """返回所选的序列化器字段名列表（保持序列化器中的顺序）；未使用 ?fields= / ?exclude= 时返回 None"""
+        if hasattr(self, '_sparse_fields'):
+            return self._sparse_fields
+        self._sparse_fields = None
+        request = getattr(self, 'request', None)
+        if request is None or request.method != 'GET' or getattr(self, 'action', None) not in ('list', 'retrieve'):
+            return None
+        include = _parse(request.query_params.get(FIELDS_PARAM))
+        exclude = _parse(request.query_params.get(EXCLUDE_PARAM))
+        if not include and not exclude:
+            return None
+
+        self._sparse_serializer_fields = self.get_serializer_class()().fields
+        available = [name for name, field in self._sparse_serializer_fields.items() if not field.write_only]
+        unknown = [name for name in include + exclude if name not in available]
+        if unknown:
+            raise ValidationError({
+                'fields': f'未知字段: {", ".join(unknown)}；可选: {", ".join(available)}',
+            })
+        selected = [name for name in available if (not include or name in include) and name not in exclude]
+        if not selected:
+            raise ValidationError({'fields': '至少需要保留一个字段'})
+        self._sparse_fields = selected
+        return selected
+
+    def get_serializer(self, *args, **kwargs):
+        serializer = super().get_serializer(*args, **kwargs)
+        selected = self.sparse_fields()
+        if selected is not None:
+            target = serializer.child if isinstance(serializer, ListSerializer) else serializer
+            for name in list(target.fields):
+                if name not in selected:
+                    target.fields.pop(name)
+        return serializer
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        selected = self.sparse_fields()
+        if selected is None:
+            return queryset
+        return self.defer_unselected(queryset, selected)
+
+    def defer_unselected(self, queryset, selected):
+        model = queryset.model
+        serializer_fields = self._sparse_serializer_fields
+        columns = {model._meta.pk.name}
+        relations = set()
+        for name in selected:
+            required = required_columns(model, serializer_fields[name])
+            if required is None:
+                return queryset
+            columns |= required[0]
+            relations |= required[1]
+        # 排序 / 游标分页需要读取的字段
+        for name in getattr(self, 'cursor_ordering', None) or ():
+            columns.add(name.lstrip('-'))
+
+        select_related = queryset.query.select_related
+        if select_related is True:
+            return queryset
+        if select_related:
+            kept = [name for name in select_related if name in relations]
+            queryset = queryset.select_related(None)
+            if kept:
+                queryset = queryset.select_related(*kept)
+            # 未 select_related 的关联按需单独查询，这里只保留外键列
+            columns = {c for c in columns if '__' not in c or c.split('__', 1)[0] in kept}
+        else:
+            columns = {c for c in columns if '__' not in c}
+
+        # QuerySet 没有读取已登记 prefetch 的公开接口
+        lookups = queryset._prefetch_related_lookups
+        if lookups:
+            kept = [lookup for lookup in lookups if getattr(lookup, 'prefetch_through', lookup).split('__')[0]
+                    in relations]
+            queryset = queryset.prefetch_related(None)
+            if kept:
+                queryset = queryset.prefetch_related(*kept)
+        return queryset.only(*columns)
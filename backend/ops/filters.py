@@ -0,0 +1,26 @@
+"""
+列表过滤
+FullTextSearchFilter: ?search= 对注册了全文索引的模型（见 ops/search.py）走全文检索并按相关度排序，
+其它模型沿用 DRF SearchFilter 的 search_fields 匹配。
+游标分页（?pagination=cursor / ?cursor=）、?ordering=time 或导出时只过滤、不按相关度排序，保持时间倒序。
+"""
+from rest_framework.filters import SearchFilter
+
+from . import search
+
+
+class FullTextSearchFilter(SearchFilter):
+    def filter_queryset(self, request, queryset, view):
+        query = request.query_params.get(self.search_param, '')
+        if not query.strip():
+            return queryset
+        rank = not (
+            'cursor' in request.query_params
+            or request.query_params.get('pagination') == 'cursor'
+            or request.query_params.get('ordering') == 'time'
+            or getattr(view, 'action', None) == 'export'
+        )
+        result = search.search(queryset, query, rank=rank)
+        if result is None:
+            return super().filter_queryset(request, queryset, view)
+        return result
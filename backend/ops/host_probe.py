@@ -0,0 +1,126 @@
+"""
+主机指标探针（在被管主机上执行）
+由 collector 通过 SSH 的 stdin 发送到远端 python 解释器执行，一次往返返回一份紧凑的 JSON：
+
+    {"v":1,"hostname":"web-01","ts":...,"cpu":12.5,"ncpu":8,"load":[0.1,0.2,0.3],"uptime":12345.6,
+     "mem":{"total":...,"avail":...,"swap_total":...,"swap_free":...},
+     "disks":[["/","ext4",total,used,avail],...],
+     "net":{"rx":...,"tx":...,"rx_bps":...,"tx_bps":...}}
+
+仅依赖标准库并兼容 Python 2.7 / 3.x，只读取 /proc 与 statvfs，不启动任何子进程。
+也可以作为推送 Agent 独立运行（见 ops/ingest.py）:
+    python3 host_probe.py [采样间隔秒数] | gzip | curl --data-binary @- \
+        -H 'Content-Type: application/x-ndjson' -H 'Content-Encoding: gzip' http://<平台>/api/metrics/ingest/
+"""
+import json
+import os
+import socket
+import sys
+import time
+
+PSEUDO_FS = frozenset([
+    'autofs', 'binfmt_misc', 'bpf', 'cgroup', 'cgroup2', 'configfs', 'debugfs', 'devpts',
+    'devtmpfs', 'efivarfs', 'fusectl', 'hugetlbfs', 'mqueue', 'nsfs', 'overlay', 'proc',
+    'pstore', 'ramfs', 'rpc_pipefs', 'securityfs', 'squashfs', 'sysfs', 'tmpfs', 'tracefs',
+])
+
+
+def _cpu_times():
+    with open('/proc/stat') as f:
+        values = [int(x) for x in f.readline().split()[1:]]
+    idle = values[3] + (values[4] if len(values) > 4 else 0)
+    # guest / guest_nice 已计入 user / nice，不重复累加
+    return sum(values[:8]), idle
+
+
+def _net_bytes():
+    rx = tx = 0
+    with open('/proc/net/dev') as f:
+        for line in f.readlines()[2:]:
+            name, _, data = line.partition(':')
+            if name.strip() == 'lo':
+                continue
+            fields = data.split()
+            rx += int(fields[0])
+            tx += int(fields[8])
+    return rx, tx
+
+
+def _meminfo():
+    info = {}
+    with open('/proc/meminfo') as f:
+        for line in f:
+            key, _, value = line.partition(':')
+            info[key] = int(value.split()[0]) * 1024
+    avail = info.get('MemAvailable')
+    if avail is None:
+        avail = info.get('MemFree', 0) + info.get('Buffers', 0) + info.get('Cached', 0)
+    return {
+        'total': info.get('MemTotal', 0),
+        'avail': avail,
+        'swap_total': info.get('SwapTotal', 0),
+        'swap_free': info.get('SwapFree', 0),
+    }
+
+
+def _disks():
+    disks = []
+    seen = set()
+    with open('/proc/mounts') as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) < 3:
+                continue
+            device, mount, fstype = parts[0], parts[1].replace('\\040', ' '), parts[2]
+            if fstype in PSEUDO_FS or device in seen or not device.startswith('/'):
+                continue
+            seen.add(device)
+            try:
+                st = os.statvfs(mount)
+            except OSError:
+                continue
+            total = st.f_blocks * st.f_frsize
+            if not total:
+                continue
+            used = (st.f_blocks - st.f_bfree) * st.f_frsize
+            avail = st.f_bavail * st.f_frsize
+            disks.append([mount, fstype, total, used, avail])
+    return disks
+
+
+def probe(interval=0.25):
+    cpu1, idle1 = _cpu_times()
+    rx1, tx1 = _net_bytes()
+    t1 = time.time()
+    time.sleep(interval)
+    cpu2, idle2 = _cpu_times()
+    rx2, tx2 = _net_bytes()
+    elapsed = max(time.time() - t1, 1e-3)
+
+    total = cpu2 - cpu1
+    with open('/proc/loadavg') as f:
+        load = [float(x) for x in f.read().split()[:3]]
+    with open('/proc/uptime') as f:
+        uptime = float(f.read().split()[0])
+
+    return {
+        'v': 1,
+        'hostname': socket.gethostname(),
+        'ts': round(time.time(), 3),
+        'cpu': round(100.0 * (total - (idle2 - idle1)) / total, 2) if total > 0 else 0.0,
+        'ncpu': os.sysconf('SC_NPROCESSORS_ONLN'),
+        'load': load,
+        'uptime': uptime,
+        'mem': _meminfo(),
+        'disks': _disks(),
+        'net': {
+            'rx': rx2,
+            'tx': tx2,
+            'rx_bps': int((rx2 - rx1) / elapsed),
+            'tx_bps': int((tx2 - tx1) / elapsed),
+        },
+    }
+
+
+if __name__ == '__main__':
+    sys.stdout.write(json.dumps(probe(float(sys.argv[1]) if len(sys.argv) > 1 else 0.25), separators=(',', ':')))
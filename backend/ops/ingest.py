@@ -0,0 +1,256 @@
+"""
+Agent 推送指标 / 日志接入
+被管主机定时执行 host_probe.py 并把结果推送到 POST /api/metrics/ingest/，
+一个请求可以携带多台主机、多次采样的报告（NDJSON 或 JSON 数组，可 gzip 压缩）。
+
+报告格式（两种均可）:
+    host_probe 原始输出: {"hostname": "web-01", "ts": 1700000000.0, "cpu": 12.5, "mem": {...}, ...}
+    扁平指标:           {"hostname": "web-01", "ts": 1700000000.0, "cpu_usage": 12.5, "memory_usage": 40, "disk_usage": 70}
+
+整批报告只做一次主机查询（带进程内缓存），每台主机取最新一份报告批量回写 Host，
+全部报告通过 bulk_create 追加为时序采样，不产生逐行查询。
+
+日志批量接入（POST /api/logs/ingest/）:
+    {"service": "api", "message": "...", "level": "error", "hostname": "web-01", "ts": 1700000000.123}
+level 缺省为 info，hostname 未登记时仍然接收（不关联主机），ts 可为 Unix 时间戳或 ISO 8601，缺省为接收时间。
+按 LOG_INGEST_CHUNK_SIZE 分块 bulk_create，每块一个事务，单块失败不影响已写入的块。
+"""
+import math
+import threading
+import time
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from . import timeseries
+from .collector import parse_probe, save_host_metrics
+from .models import Host, LogEntry
+
+MAX_ERRORS = 50
+MAX_RAW_TS = 1e20
+USAGE_FIELDS = ('cpu_usage', 'memory_usage', 'disk_usage')
+
+
+class HostLookup:
+    """hostname -> host_id 的进程内缓存，未命中的主机名批量回源一次（不存在的主机名同样缓存）"""
+
+    def __init__(self, ttl=60):
+        self.ttl = ttl
+        self._cache = {}
+        self._expires = 0.0
+        self._lock = threading.Lock()
+
+    def resolve(self, hostnames):
+        now = time.monotonic()
+        with self._lock:
+            if now >= self._expires:
+                self._cache = {}
+                self._expires = now + self.ttl
+            cached = {name: self._cache[name] for name in hostnames if name in self._cache}
+        missing = [name for name in hostnames if name not in cached]
+        if missing:
+            rows = dict(Host.objects.filter(hostname__in=missing).values_list('hostname', 'id'))
+            with self._lock:
+                self._cache.update({name: rows.get(name) for name in missing})
+            cached.update(rows)
+        return {name: host_id for name, host_id in cached.items() if host_id is not None}
+
+    def clear(self):
+        with self._lock:
+            self._cache = {}
+
+
+host_lookup = HostLookup(ttl=getattr(settings, 'INGEST_HOST_CACHE_TTL', 60))
+
+
+def _parse_ts(value, now):
+    if value in (None, ''):
+        return now
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        # json 模块会把 Infinity / 1e400 解析为 inf；纳秒时间戳在 1e19 量级
+        if not math.isfinite(value) or not 0 <= value < MAX_RAW_TS:
+            raise ValueError('ts 超出有效范围')
+        # 兼容毫秒 / 纳秒时间戳
+        while value > 1e11:
+            value /= 1000.0
+        try:
+            return datetime.fromtimestamp(value, tz=dt_timezone.utc)
+        except (OverflowError, OSError) as e:
+            raise ValueError('ts 超出有效范围') from e
+    if isinstance(value, str):
+        parsed = parse_datetime(value)
+        if parsed is not None:
+            return timezone.make_aware(parsed) if timezone.is_naive(parsed) else parsed
+    raise ValueError('ts 必须是 Unix 时间戳或 ISO 8601 时间')
+
+
+def validate_report(report, now):
+    """校验并归一化单条报告，返回 (hostname, metrics)，不合法时抛出 ValueError"""
+    if not isinstance(report, dict):
+        raise ValueError('报告必须是 JSON 对象')
+    hostname = report.get('hostname')
+    if not isinstance(hostname, str) or not hostname.strip():
+        raise ValueError('缺少 hostname')
+
+    if 'mem' in report or 'cpu' in report:
+        metrics = parse_probe(report)
+    else:
+        metrics = {field: report.get(field) for field in USAGE_FIELDS}
+        metrics.update({
+            'load': report.get('load'),
+            'net_rx_bps': report.get('net_rx_bps'),
+            'net_tx_bps': report.get('net_tx_bps'),
+        })
+
+    for field in USAGE_FIELDS:
+        value = metrics.get(field)
+        if value is None:
+            continue
+        if isinstance(value, bool) or not isinstance(value, (int, float)) or not 0 <= value <= 100:
+            raise ValueError(f'{field} 必须是 0~100 之间的数值')
+    if all(metrics.get(field) is None for field in USAGE_FIELDS):
+        raise ValueError('报告中没有可用指标')
+
+    ts = _parse_ts(report.get('ts'), now)
+    skew = getattr(settings, 'INGEST_MAX_CLOCK_SKEW', 300)
+    if ts > now + timedelta(seconds=skew):
+        raise ValueError('ts 超前于服务器时间')
+    if ts < now - timedelta(seconds=timeseries.retention('raw')):
+        raise ValueError('ts 已超出原始采样保留期')
+    metrics['timestamp'] = ts
+    return hostname.strip(), metrics
+
+
+def ingest_metric_reports(reports, parse_errors=()):
+    """
+    批量接入指标报告
+    parse_errors: 解析阶段已发现的错误 [(行号, 原因)]
+    返回 {'accepted', 'rejected', 'hosts', 'errors'}，errors 中 line 为 NDJSON 行号，index 为报告序号
+    """
+    now = timezone.now()
+    errors = [{'line': line, 'error': msg} for line, msg in parse_errors]
+    rejected = len(errors)
+    parsed = []
+    for index, report in enumerate(reports, 1):
+        try:
+            parsed.append((index, *validate_report(report, now)))
+        except (ValueError, TypeError, KeyError, OverflowError) as e:
+            rejected += 1
+            errors.append({'index': index, 'error': str(e)})
+
+    host_ids = host_lookup.resolve({hostname for _, hostname, _ in parsed})
+    samples = []
+    latest = {}
+    for index, hostname, metrics in parsed:
+        host_id = host_ids.get(hostname)
+        if host_id is None:
+            rejected += 1
+            errors.append({'index': index, 'error': f'未知主机: {hostname}'})
+            continue
+        samples.append((host_id, metrics))
+        current = latest.get(host_id)
+        if current is None or metrics['timestamp'] >= current['timestamp']:
+            latest[host_id] = metrics
+
+    with transaction.atomic():
+        save_host_metrics(
+            (host_id, m.get('cpu_usage'), m.get('memory_usage'), m.get('disk_usage'), 'online')
+            for host_id, m in latest.items()
+        )
+        timeseries.record_samples(samples, timestamp=now)
+
+    return {
+        'accepted': len(samples),
+        'rejected': rejected,
+        'hosts': len(latest),
+        'errors': errors[:MAX_ERRORS],
+    }
+
+
+LOG_LEVELS = {level for level, _ in LogEntry.LEVEL_CHOICES}
+LOG_LEVEL_ALIASES = {
+    'warn': 'warning', 'err': 'error', 'fatal': 'error', 'critical': 'error', 'crit': 'error',
+    'panic': 'error', 'trace': 'debug', 'notice': 'info', 'information': 'info',
+}
+SERVICE_MAX_LENGTH = LogEntry._meta.get_field('service').max_length
+
+
+def validate_log_entry(entry, now):
+    """校验并归一化单条日志，返回 (hostname | None, service, level, message, timestamp)"""
+    if not isinstance(entry, dict):
+        raise ValueError('日志必须是 JSON 对象')
+    service = entry.get('service')
+    if not isinstance(service, str) or not service.strip():
+        raise ValueError('缺少 service')
+    service = service.strip()
+    if len(service) > SERVICE_MAX_LENGTH:
+        raise ValueError(f'service 长度超过 {SERVICE_MAX_LENGTH}')
+    message = entry.get('message', entry.get('msg'))
+    if not isinstance(message, str) or not message:
+        raise ValueError('缺少 message')
+    max_message = getattr(settings, 'LOG_INGEST_MAX_MESSAGE', 64 * 1024)
+    if len(message) > max_message:
+        message = message[:max_message]
+
+    level = entry.get('level') or 'info'
+    if not isinstance(level, str):
+        raise ValueError('level 必须是字符串')
+    level = level.strip().lower()
+    level = LOG_LEVEL_ALIASES.get(level, level)
+    if level not in LOG_LEVELS:
+        raise ValueError(f'不支持的 level: {entry.get("level")}')
+
+    hostname = entry.get('hostname', entry.get('host'))
+    if hostname is not None and not isinstance(hostname, str):
+        raise ValueError('hostname 必须是字符串')
+    ts = _parse_ts(entry.get('ts', entry.get('timestamp')), now)
+    return (hostname.strip() or None) if hostname else None, service, level, message, ts
+
+
+def ingest_log_entries(entries, parse_errors=()):
+    """
+    批量接入日志
+    返回 {'accepted', 'rejected', 'unknown_hosts', 'errors'}，errors 中 line 为 NDJSON 行号，index 为日志序号
+    """
+    now = timezone.now()
+    errors = [{'line': line, 'error': msg} for line, msg in parse_errors]
+    rejected = len(errors)
+    parsed = []
+    for index, entry in enumerate(entries, 1):
+        try:
+            parsed.append((index, validate_log_entry(entry, now)))
+        except (ValueError, TypeError, OverflowError) as e:
+            rejected += 1
+            errors.append({'index': index, 'error': str(e)})
+
+    host_ids = host_lookup.resolve({row[0] for _, row in parsed if row[0]})
+    unknown_hosts = set()
+    objs = []
+    for _, (hostname, service, level, message, ts) in parsed:
+        host_id = host_ids.get(hostname) if hostname else None
+        if hostname and host_id is None:
+            unknown_hosts.add(hostname)
+        objs.append(LogEntry(host_id=host_id, service=service, level=level, message=message, timestamp=ts))
+
+    accepted = 0
+    chunk_size = getattr(settings, 'LOG_INGEST_CHUNK_SIZE', 2000)
+    for i in range(0, len(objs), chunk_size):
+        chunk = objs[i:i + chunk_size]
+        try:
+            with transaction.atomic():
+                LogEntry.objects.bulk_create(chunk)
+        except Exception as e:
+            rejected += len(chunk)
+            errors.append({'index': parsed[i][0], 'error': f'第 {i + 1}~{i + len(chunk)} 条写入失败: {e}'})
+            continue
+        accepted += len(chunk)
+
+    return {
+        'accepted': accepted,
+        'rejected': rejected,
+        'unknown_hosts': sorted(unknown_hosts)[:MAX_ERRORS],
+        'errors': errors[:MAX_ERRORS],
+    }
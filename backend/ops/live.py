@@ -0,0 +1,213 @@
+"""
+实时推送（WebSocket ws/live/）
+主机 / 告警 / 部署记录的变更由信号与批量写入路径调用 notify() 记入进程内缓冲区（只记录 id），
+合并器每 LIVE_COALESCE_INTERVAL 秒把缓冲区合并为一条差量消息，按主题发送到 channel layer 分组:
+
+    live.hosts / live.alerts / live.deployments
+        {"type": "diff", "topic": "alerts", "updated": [{...}, ...], "deleted": [1, 2]}
+        单周期变更超过 LIVE_MAX_DIFF_ROWS 行或无法列举（如批量确认）时: {"type": "reload", "topic": "alerts"}
+    live.dashboard
+        {"type": "dashboard", "data": <与 /api/dashboard/stats/ 相同>}，最多每 LIVE_DASHBOARD_INTERVAL 秒一次
+
+没有变更时合并器不访问数据库；当前进程没有订阅者时（进程内 channel layer）缓冲区直接丢弃，
+没有合并器运行的进程（WSGI、尚无订阅者连接的 ASGI 进程）不记录变更。
+ASGI 进程内由第一个连接的订阅者启动合并协程；使用 Redis 等跨进程 channel layer 时，
+独立运行的采集进程（run_collector）通过 start_thread_flusher() 推送自己产生的变更。
+"""
+import asyncio
+import logging
+import threading
+import time
+
+from asgiref.sync import async_to_sync, sync_to_async
+from channels.layers import get_channel_layer
+from django.conf import settings
+from django.db import transaction
+
+logger = logging.getLogger(__name__)
+
+TOPICS = ('dashboard', 'hosts', 'alerts', 'deployments')
+RELOAD = object()
+
+
+def group_name(topic):
+    return f'live.{topic}'
+
+
+def _serialize(topic, ids):
+    from .models import Alert, Deployment, Host
+    from .serializers import AlertSerializer, DeploymentSerializer, HostSerializer
+
+    if topic == 'hosts':
+        rows = HostSerializer(Host.objects.filter(pk__in=ids), many=True).data
+        for row in rows:
+            row.pop('ssh_password', None)
+        return rows
+    if topic == 'alerts':
+        return AlertSerializer(Alert.objects.select_related('host').filter(pk__in=ids), many=True).data
+    return DeploymentSerializer(Deployment.objects.select_related('host').filter(pk__in=ids), many=True).data
+
+
+class LiveHub:
+    def __init__(self, interval=1.0, dashboard_interval=5.0, max_diff_rows=500):
+        self.interval = interval
+        self.dashboard_interval = dashboard_interval
+        self.max_diff_rows = max_diff_rows
+        self._lock = threading.Lock()
+        self._pending = {topic: {} for topic in TOPICS if topic != 'dashboard'}   # id -> 是否删除
+        self._reload = set()
+        self._dashboard_dirty = False
+        self._last_dashboard = 0.0
+        self._subscribers = {topic: 0 for topic in TOPICS}
+        self._task = None
+        self._thread = None
+        self._counters = {'notifications': 0, 'messages': 0, 'flushes': 0, 'dropped': 0, 'ignored': 0}
+
+    # ------------------------------------------------------------------
+    # 变更记录（任意线程）
+    # ------------------------------------------------------------------
+
+    def flushing(self):
+        """当前进程是否有合并器在运行（ASGI 进程有订阅者连接后 / run_collector 的推送线程）"""
+        task, thread = self._task, self._thread
+        return (task is not None and not task.done()) or (thread is not None and thread.is_alive())
+
+    def notify(self, topic, ids=(), deleted=False):
+        """记录变更；ids 为 RELOAD 时表示变更范围未知，订阅者应整体刷新"""
+        if not self.flushing():
+            # 没有合并器的进程（WSGI、空闲的 ASGI 进程）不累积缓冲区，否则只增不减
+            with self._lock:
+                self._counters['ignored'] += 1
+            return
+        with self._lock:
+            self._counters['notifications'] += 1
+            self._dashboard_dirty = True
+            if ids is RELOAD:
+                self._reload.add(topic)
+                return
+            pending = self._pending[topic]
+            for pk in ids:
+                pending[pk] = deleted
+
+    def subscribe(self, topic, delta):
+        with self._lock:
+            self._subscribers[topic] = max(0, self._subscribers[topic] + delta)
+
+    def _local_only(self):
+        layer = get_channel_layer()
+        return layer is None or type(layer).__name__ == 'InMemoryChannelLayer'
+
+    def _drain(self, now):
+        with self._lock:
+            pending = {topic: items for topic, items in self._pending.items() if items}
+            reload = self._reload
+            self._pending = {topic: {} for topic in self._pending}
+            self._reload = set()
+            dashboard_due = self._dashboard_dirty and now - self._last_dashboard >= self.dashboard_interval
+            if dashboard_due:
+                self._dashboard_dirty = False
+                self._last_dashboard = now
+            subscribers = dict(self._subscribers)
+        if self._local_only():
+            # 进程内 channel layer：没有订阅者的主题无需构建消息
+            dropped = sum(len(items) for topic, items in pending.items() if not subscribers[topic])
+            pending = {topic: items for topic, items in pending.items() if subscribers[topic]}
+            reload = {topic for topic in reload if subscribers[topic]}
+            dashboard_due = dashboard_due and subscribers['dashboard'] > 0
+            if dropped:
+                with self._lock:
+                    self._counters['dropped'] += dropped
+        return pending, reload, dashboard_due
+
+    def build_messages(self, now=None):
+        """合并缓冲区中的变更，返回 [(主题, 消息)]；会访问数据库，需在同步上下文调用"""
+        from . import dashboard
+
+        now = time.monotonic() if now is None else now
+        pending, reload, dashboard_due = self._drain(now)
+        messages = []
+        for topic in TOPICS[1:]:
+            items = pending.get(topic, {})
+            if topic in reload or len(items) > self.max_diff_rows:
+                messages.append((topic, {'type': 'reload', 'topic': topic}))
+                continue
+            if not items:
+                continue
+            deleted = [pk for pk, gone in items.items() if gone]
+            updated = [pk for pk, gone in items.items() if not gone]
+            messages.append((topic, {
+                'type': 'diff', 'topic': topic,
+                'updated': _serialize(topic, updated) if updated else [],
+                'deleted': deleted,
+            }))
+        if dashboard_due:
+            messages.append(('dashboard', {'type': 'dashboard', 'data': dashboard.build_stats()}))
+        return messages
+
+    # ------------------------------------------------------------------
+    # 合并发送
+    # ------------------------------------------------------------------
+
+    def has_pending(self):
+        with self._lock:
+            return self._dashboard_dirty or bool(self._reload) or any(self._pending.values())
+
+    async def flush(self):
+        if not self.has_pending():
+            return
+        messages = await sync_to_async(self.build_messages)()
+        layer = get_channel_layer()
+        for topic, message in messages:
+            await layer.group_send(group_name(topic), {'type': 'live.message', 'message': message})
+        with self._lock:
+            self._counters['flushes'] += 1
+            self._counters['messages'] += len(messages)
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.flush()
+            except Exception:
+                logger.exception('live update flush failed')
+
+    def ensure_running(self):
+        """在当前事件循环中启动合并协程（由订阅者连接时调用）"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    def start_thread_flusher(self):
+        """非 ASGI 进程（如 run_collector）在跨进程 channel layer 下推送本进程产生的变更"""
+        if self._local_only() or (self._thread and self._thread.is_alive()):
+            return
+
+        def loop():
+            while True:
+                time.sleep(self.interval)
+                try:
+                    async_to_sync(self.flush)()
+                except Exception:
+                    logger.exception('live update flush failed')
+
+        self._thread = threading.Thread(target=loop, daemon=True, name='live-flusher')
+        self._thread.start()
+
+    def stats(self):
+        with self._lock:
+            data = dict(self._counters)
+            data['subscribers'] = dict(self._subscribers)
+            data['pending'] = {topic: len(items) for topic, items in self._pending.items()}
+        return data
+
+
+hub = LiveHub(
+    interval=getattr(settings, 'LIVE_COALESCE_INTERVAL', 1.0),
+    dashboard_interval=getattr(settings, 'LIVE_DASHBOARD_INTERVAL', 5.0),
+    max_diff_rows=getattr(settings, 'LIVE_MAX_DIFF_ROWS', 500),
+)
+
+
+def notify(topic, ids=(), deleted=False):
+    """记录变更；处于事务中时在提交后记录，避免合并器读到未提交的数据"""
+    ids = ids if ids is RELOAD else list(ids)
+    transaction.on_commit(lambda: hub.notify(topic, ids, deleted))
@@ -0,0 +1,58 @@
+"""
+WebSocket Consumer for live updates (ws/live/?topics=dashboard,alerts)
+订阅 ops/live.py 合并后的差量推送，替代前端轮询。连接后可发送
+    {"action": "subscribe" | "unsubscribe", "topics": ["hosts", ...]}
+调整订阅的主题。
+"""
+from channels.generic.websocket import AsyncJsonWebsocketConsumer
+from urllib.parse import parse_qs
+
+from . import live
+
+
+class LiveUpdatesConsumer(AsyncJsonWebsocketConsumer):
+    async def connect(self):
+        self.topics = set()
+        await self.accept()
+        query = parse_qs(self.scope.get('query_string', b'').decode())
+        requested = [t for value in query.get('topics', []) for t in value.split(',') if t]
+        await self._subscribe(requested or live.TOPICS)
+        live.hub.ensure_running()
+        await self.send_json({'type': 'subscribed', 'topics': sorted(self.topics)})
+
+    async def disconnect(self, close_code):
+        await self._unsubscribe(list(self.topics))
+
+    async def receive_json(self, content, **kwargs):
+        action = content.get('action')
+        topics = content.get('topics') or []
+        if isinstance(topics, str):
+            topics = [topics]
+        if action == 'subscribe':
+            await self._subscribe(topics)
+        elif action == 'unsubscribe':
+            await self._unsubscribe(topics)
+        elif action == 'ping':
+            await self.send_json({'type': 'pong'})
+            return
+        else:
+            await self.send_json({'type': 'error', 'message': f'未知操作: {action}'})
+            return
+        await self.send_json({'type': 'subscribed', 'topics': sorted(self.topics)})
+
+    async def _subscribe(self, topics):
+        for topic in topics:
+            if topic in live.TOPICS and topic not in self.topics:
+                self.topics.add(topic)
+                live.hub.subscribe(topic, 1)
+                await self.channel_layer.group_add(live.group_name(topic), self.channel_name)
+
+    async def _unsubscribe(self, topics):
+        for topic in topics:
+            if topic in self.topics:
+                self.topics.discard(topic)
+                live.hub.subscribe(topic, -1)
+                await self.channel_layer.group_discard(live.group_name(topic), self.channel_name)
+
+    async def live_message(self, event):
+        await self.send_json(event['message'])
@@ -0,0 +1,376 @@
+"""
+Loki query_range 结果缓存
+把查询区间按固定长度的时间桶切分（指标查询的桶长为 step 的整数倍，起止时间按 step 对齐，与 Loki query-frontend 一致）:
+    - 完全落在 now - LOKI_CACHE_FRESHNESS 之前的整桶视为不再变化，按桶缓存
+    - 区间开头不足一桶的部分与最近（可能仍有日志写入）的部分不缓存，每次直接查询 Loki
+    - 未缓存的段超过 LOKI_SPLIT_INTERVAL 时继续拆分；未启用缓存或区间内没有可缓存的整桶时，长区间同样按 LOKI_SPLIT_INTERVAL 拆分
+    - 各段经 ops.loki_split 并发查询（LOKI_SPLIT_CONCURRENCY）并按时间顺序合并；日志查询凑够 limit 条后不再查询更远的段
+缓存键由规范化后的 LogQL（去掉多余空白、流选择器内的匹配条件排序）、查询类型、step / limit / direction 与桶起点组成，
+缓存内容为 JSON 字节串，按总字节数（LOKI_CACHE_MAX_BYTES）LRU 淘汰。
+
+配置（settings）:
+    LOKI_CACHE_ENABLED = True
+    LOKI_CACHE_BUCKET = 900              # 桶长（秒），指标查询向上取整为 step 的整数倍
+    LOKI_CACHE_FRESHNESS = 600           # 最近多少秒内的数据不缓存（迟到的日志）
+    LOKI_CACHE_MAX_BYTES = 64 * 1024 * 1024
+    LOKI_CACHE_MAX_BUCKETS = 32          # 单个查询最多的桶数，长区间按 2 的幂倍加宽桶
+    LOKI_SPLIT_INTERVAL = 3600           # 不缓存的长区间的拆分粒度（秒）
+    LOKI_SPLIT_MAX_SEGMENTS = 32         # 拆分的最多段数，超过时加大拆分粒度
+    LOKI_SPLIT_CONCURRENCY = 8           # 单个查询同时向 Loki 发出的请求数
+"""
+import collections
+import hashlib
+import math
+import re
+import threading
+import time
+from datetime import datetime
+
+from django.conf import settings
+
+from . import loki_client, loki_split
+from .parsers import loads
+from .renderers import ORJSONRenderer
+
+NS = 1_000_000_000
+DEFAULT_RANGE = 3600 * NS
+_DURATION = re.compile(r'(\d+(?:\.\d+)?)(ms|s|m|h|d|w|y)')
+_UNITS = {'ms': NS // 1000, 's': NS, 'm': 60 * NS, 'h': 3600 * NS, 'd': 86400 * NS, 'w': 7 * 86400 * NS,
+          'y': 365 * 86400 * NS}
+
+
+# ----------------------------------------------------------------------
+# 参数解析
+# ----------------------------------------------------------------------
+
+def parse_time(value, default):
+    """与 Loki 相同的时间格式: 整数（≤10 位为秒，否则为纳秒）、浮点秒、RFC3339；返回纳秒"""
+    if not value:
+        return default
+    try:
+        number = int(value)
+        return number * NS if len(value.lstrip('-')) <= 10 else number
+    except ValueError:
+        pass
+    try:
+        return int(float(value) * NS)
+    except (ValueError, OverflowError):   # nan / inf / 1e400
+        pass
+    try:
+        return int(datetime.fromisoformat(value.replace('Z', '+00:00')).timestamp() * NS)
+    except ValueError:
+        return None
+
+
+def parse_step(value):
+    """step 支持浮点秒或 Prometheus 时长（如 1m30s），返回纳秒"""
+    try:
+        return int(float(value) * NS)
+    except (ValueError, OverflowError):
+        pass
+    parts = _DURATION.findall(value)
+    if not parts or ''.join(n + u for n, u in parts) != value:
+        return None
+    try:
+        return int(sum(float(n) * _UNITS[u] for n, u in parts))
+    except OverflowError:
+        return None
+
+
+def normalize_query(query):
+    """规范化 LogQL: 引号外的连续空白合并、符号两侧空白去掉，流选择器 {...} 内的匹配条件排序"""
+    out = []
+    quote = None
+    pending_space = False
+    i = 0
+    while i < len(query):
+        ch = query[i]
+        if quote:
+            out.append(ch)
+            if ch == '\\' and quote != '`' and i + 1 < len(query):
+                out.append(query[i + 1])
+                i += 1
+            elif ch == quote:
+                quote = None
+        elif ch.isspace():
+            pending_space = True
+        else:
+            if pending_space and out and out[-1] not in '{}(),=~!|' and ch not in '{}(),=~!|':
+                out.append(' ')
+            pending_space = False
+            out.append(ch)
+            if ch in '"`':
+                quote = ch
+        i += 1
+    return _sort_selectors(''.join(out))
+
+
+def _split_outside_quotes(text, sep):
+    parts, current, quote = [], [], None
+    i = 0
+    while i < len(text):
+        ch = text[i]
+        if quote:
+            current.append(ch)
+            if ch == '\\' and quote != '`' and i + 1 < len(text):
+                current.append(text[i + 1])
+                i += 1
+            elif ch == quote:
+                quote = None
+        elif ch in '"`':
+            quote = ch
+            current.append(ch)
+        elif ch == sep:
+            parts.append(''.join(current))
+            current = []
+        else:
+            current.append(ch)
+        i += 1
+    parts.append(''.join(current))
+    return parts
+
+
+def _sort_selectors(query):
+    out, quote, start = [], None, None
+    i = 0
+    while i < len(query):
+        ch = query[i]
+        if quote:
+            if ch == '\\' and quote != '`':
+                i += 1
+            elif ch == quote:
+                quote = None
+        elif ch in '"`':
+            quote = ch
+        elif ch == '{':
+            start = i
+        elif ch == '}' and start is not None:
+            matchers = sorted(m for m in _split_outside_quotes(query[start + 1:i], ',') if m)
+            out.append((start, i, '{' + ','.join(matchers) + '}'))
+            start = None
+        i += 1
+    for begin, end, text in reversed(out):
+        query = query[:begin] + text + query[end + 1:]
+    return query
+
+
+def is_log_query(normalized):
+    return normalized.startswith('{')
+
+
+# ----------------------------------------------------------------------
+# 按字节数淘汰的 LRU
+# ----------------------------------------------------------------------
+
+class BucketCache:
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries = collections.OrderedDict()  # key -> bytes
+        self._bytes = 0
+        self._counters = collections.Counter()
+
+    def get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self._counters['misses'] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._counters['hits'] += 1
+        return loads(value)
+
+    def set(self, key, data):
+        value = ORJSONRenderer().render(data)
+        if len(value) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= len(old)
+            self._entries[key] = value
+            self._bytes += len(value)
+            while self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= len(evicted)
+                self._counters['evictions'] += 1
+
+    def count(self, name, n=1):
+        with self._lock:
+            self._counters[name] += n
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            data = dict(self._counters)
+            data.update({'entries': len(self._entries), 'bytes': self._bytes, 'max_bytes': self.max_bytes})
+        lookups = data.get('hits', 0) + data.get('misses', 0)
+        data['hit_ratio'] = round(data.get('hits', 0) / lookups, 3) if lookups else None
+        return data
+
+
+cache = BucketCache(getattr(settings, 'LOKI_CACHE_MAX_BYTES', 64 * 1024 * 1024))
+
+
+# ----------------------------------------------------------------------
+# 查询
+# ----------------------------------------------------------------------
+
+class _Bypass(Exception):
+    """返回的结果类型与按查询判断的不符（如 vector），整体退回直接查询"""
+
+
+class _Plan:
+    """切分后的查询计划；segments 为按时间顺序排列的 (start, end, 缓存键或 None)"""
+
+    def __init__(self, params, normalized, log_query, start, end, step, limit, direction):
+        self.params = params
+        self.normalized = normalized
+        self.log_query = log_query
+        self.start = start
+        self.end = end
+        self.step = step
+        self.limit = limit
+        self.direction = direction
+        self.segments = []
+
+    def segment_params(self, start, end):
+        params = dict(self.params, start=str(start), end=str(end if self.log_query else end - 1))
+        if not self.log_query:
+            params['step'] = f'{self.step / NS:g}'
+        return params
+
+    def add(self, start, end, interval):
+        """不缓存的区间按 interval 拆分后加入，段数不超过 LOKI_SPLIT_MAX_SEGMENTS"""
+        max_segments = getattr(settings, 'LOKI_SPLIT_MAX_SEGMENTS', 32)
+        for segment in loki_split.split(start, end, interval, self.step or 1, max_segments):
+            self.segments.append((*segment, None))
+
+
+def plan(params, now_ns=None):
+    """
+    生成查询计划: 区间内有可缓存的整桶时按桶切分（LOKI_CACHE_ENABLED，最多约 LOKI_CACHE_MAX_BUCKETS 个桶），
+    否则超过 LOKI_SPLIT_INTERVAL 时按其拆分
+    参数无法解析、或区间较短无需切分时返回 None
+    """
+    now_ns = now_ns if now_ns is not None else time.time_ns()
+    end = parse_time(params.get('end'), now_ns)
+    start = parse_time(params.get('start'), None if end is None else end - DEFAULT_RANGE)
+    if start is None or end is None or end <= start:
+        return None
+    normalized = normalize_query(params['query'])
+    log_query = is_log_query(normalized)
+    bucket = int(getattr(settings, 'LOKI_CACHE_BUCKET', 900) * NS)
+    interval = int(getattr(settings, 'LOKI_SPLIT_INTERVAL', 3600) * NS)
+    direction = params.get('direction') or 'backward'
+    try:
+        limit = int(params.get('limit') or 100)
+    except ValueError:
+        return None
+
+    step = None
+    if not log_query:
+        # 与 Loki 相同的默认 step（约 250 个点），显式传给每一段，保证各段的取值点一致
+        step = parse_step(params['step']) if params.get('step') else max((end - start) // NS // 250, 1) * NS
+        if not step or step < 0:
+            return None
+        bucket = max(math.ceil(bucket / step), 1) * step
+        start, end = start - start % step, end - end % step + 1
+    # 桶数不超过 LOKI_CACHE_MAX_BUCKETS: 长区间按 2 的幂倍加宽桶，同样长度的区间刷新时桶宽不变，仍能命中缓存
+    max_buckets = max(getattr(settings, 'LOKI_CACHE_MAX_BUCKETS', 32), 1)
+    while (end - start) // bucket > max_buckets:
+        bucket *= 2
+    # 拆分粒度按整个区间放宽，首尾不缓存的部分合计也不超过 LOKI_SPLIT_MAX_SEGMENTS 段
+    max_segments = max(getattr(settings, 'LOKI_SPLIT_MAX_SEGMENTS', 32), 1)
+    while (end - start) // interval + 1 > max_segments:
+        interval *= 2
+
+    result = _Plan(params, normalized, log_query, start, end, step, limit, direction)
+    stable_until = now_ns - int(getattr(settings, 'LOKI_CACHE_FRESHNESS', 600) * NS)
+    first = -(-start // bucket) * bucket
+    if getattr(settings, 'LOKI_CACHE_ENABLED', True) and first + bucket <= min(end, stable_until):
+        kind = f'logs:{limit}:{direction}' if log_query else f'matrix:{step}'
+        digest = hashlib.sha1(f'{kind}\n{normalized}'.encode()).hexdigest()
+        result.add(start, first, interval)
+        cursor = first
+        while cursor + bucket <= min(end, stable_until):
+            result.segments.append((cursor, cursor + bucket, f'{digest}:{bucket}:{cursor}'))
+            cursor += bucket
+        result.add(cursor, end, interval)
+    elif end - start > interval:
+        result.add(start, end, interval)
+    else:
+        return None
+    return result
+
+
+def _result(data):
+    return (data.get('data') or {}).get('result') or []
+
+
+async def query_range(params):
+    """
+    切分 / 缓存后的 query_range，返回 (Loki 格式的响应数据, 缓存状态 hit / partial / miss / split)
+    split 表示区间被拆分查询但不涉及缓存；无需切分时返回 (None, 'bypass')，由调用方直接转发
+    合并后的日志超过 LOKI_MAX_RESPONSE_BYTES 时截断，data.truncated 为 True；失败时抛出 loki_client.LokiError
+    """
+    query_plan = plan(params)
+    if query_plan is None:
+        cache.count('bypass')
+        return None, 'bypass'
+
+    expected = 'streams' if query_plan.log_query else 'matrix'
+    lookups, hits = [0], [0]
+
+    async def fetch(segment):
+        start, end, key = segment
+        if key is not None:
+            lookups[0] += 1
+            data = cache.get(key)
+            if data is not None:
+                hits[0] += 1
+                return data
+        cache.count('upstream_requests')
+        response = await loki_client.client.aget('/loki/api/v1/query_range', query_plan.segment_params(start, end))
+        if (response.get('data') or {}).get('resultType') != expected:
+            raise _Bypass
+        data = _result(response)
+        if key is not None:
+            cache.set(key, data)
+        return data
+
+    # 日志查询按 direction 的顺序调度，backward 从最新的一段开始
+    segments = query_plan.segments
+    if query_plan.log_query and query_plan.direction != 'forward':
+        segments = segments[::-1]
+    enough = loki_split.limit_counter(query_plan.limit) if query_plan.log_query else None
+    try:
+        pieces = await loki_split.fan_out(segments, fetch, getattr(settings, 'LOKI_SPLIT_CONCURRENCY', 8), enough)
+    except _Bypass:
+        cache.count('bypass')
+        return None, 'bypass'
+    cache.count('segments', len(segments))
+    cache.count('segments_skipped', sum(1 for piece in pieces if piece is None))
+
+    truncated = False
+    if query_plan.log_query:
+        merged, truncated = loki_split.merge_streams(pieces, query_plan.direction, query_plan.limit,
+                                                     getattr(settings, 'LOKI_MAX_RESPONSE_BYTES', None))
+    else:
+        merged = loki_split.merge_matrix(pieces)
+    if not lookups[0]:
+        state = 'split'
+    else:
+        state = 'hit' if hits[0] == lookups[0] else 'partial' if hits[0] else 'miss'
+    data = {'resultType': expected, 'result': merged}
+    if truncated:
+        data['truncated'] = True
+    return {'status': 'success', 'data': data}, state
+
+
+def stats():
+    return cache.stats()
@@ -0,0 +1,385 @@
+"""
+Loki HTTP 客户端
+进程内复用到 Loki 的长连接，避免每次 LogQL 查询重新建立 TCP 连接:
+    - 同步调用（管理命令、WSGI）使用共享连接池的 requests Session（各线程独立 Session，共用同一个 HTTPAdapter）
+    - 异步视图使用 httpx.AsyncClient，长查询等待期间不占用 worker 线程；运行 ASGI 应用的事件循环（经 asgi.py 中的
+      serve_on_loop 包装登记）共用一个连接池，收到 lifespan.shutdown 时关闭；
+      async_to_sync 等临时事件循环中每次请求使用独立的客户端并在请求结束时关闭；
+      未安装 httpx 时退回专用线程池（LOKI_POOL_SIZE 个线程）中执行同步调用
+    - astream() 收到响应头即返回，正文按块读取原始字节（保留上游的 Content-Encoding），供代理直接转发
+    - 统一的错误映射（LokiError，与原代理的错误响应格式一致）与请求计数 / 延迟分位数统计
+
+    data = loki_client.client.get('/loki/api/v1/labels', {'start': ...})
+    data = await loki_client.client.aget('/loki/api/v1/query_range', params)
+    resp = await loki_client.client.astream('/loki/api/v1/labels', params)   # 原始字节流，用于直通转发
+
+配置（settings）:
+    LOKI_URL = 'http://localhost:3100'
+    LOKI_TIMEOUT = 30              # 读超时（秒）
+    LOKI_CONNECT_TIMEOUT = 3       # 建连超时（秒）
+    LOKI_POOL_SIZE = 20            # 同步连接池大小
+    LOKI_MAX_CONNECTIONS = 100     # 异步客户端最大并发连接
+    LOKI_KEEPALIVE_EXPIRY = 30     # 空闲长连接保留时间（秒）
+"""
+import asyncio
+import collections
+import threading
+import time
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+
+from .parsers import loads
+
+try:
+    import httpx
+except ImportError:  # httpx 为可选依赖
+    httpx = None
+
+LATENCY_SAMPLES = 1024
+_END = object()
+
+
+class LokiError(Exception):
+    """Loki 请求失败；status 为返回给前端的 HTTP 状态码"""
+
+    def __init__(self, status, error, detail, kind=None):
+        super().__init__(error)
+        self.status = status
+        self.error = error
+        self.detail = detail
+        self.kind = kind or detail
+
+    def payload(self):
+        return {'error': self.error, 'detail': self.detail}
+
+
+class StreamedResponse:
+    """
+    流式读取的上游响应
+    chunks() 逐块产出原始字节（不解压，Content-Encoding 保持上游的值），用完或中途放弃时需 await aclose()
+    """
+
+    def __init__(self, status, headers, chunks, close):
+        self.status = status
+        self.headers = headers
+        self._chunks = chunks
+        self._close = close
+
+    def chunks(self):
+        return self._chunks
+
+    async def read(self, limit):
+        """读取至多 limit 字节（用于错误响应的正文）"""
+        body = b''
+        async for chunk in self._chunks:
+            body += chunk
+            if len(body) >= limit:
+                break
+        return body[:limit]
+
+    async def aclose(self):
+        await self._close()
+
+
+class _Stats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = collections.Counter()
+        self._latency = collections.deque(maxlen=LATENCY_SAMPLES)
+        self.in_flight = 0
+
+    def begin(self, mode):
+        with self._lock:
+            self.in_flight += 1
+            self._counters[f'{mode}_requests'] += 1
+        return time.perf_counter()
+
+    def count(self, name, n=1):
+        with self._lock:
+            self._counters[name] += n
+
+    def end(self, started, error=None):
+        elapsed = time.perf_counter() - started
+        with self._lock:
+            self.in_flight -= 1
+            self._latency.append(elapsed)
+            if error is not None:
+                self._counters['errors'] += 1
+                self._counters[f'errors_{error.kind}'] += 1
+
+    def snapshot(self):
+        with self._lock:
+            samples = sorted(self._latency)
+            data = dict(self._counters)
+            data['in_flight'] = self.in_flight
+
+        def pct(p):
+            return round(samples[min(len(samples) - 1, int(len(samples) * p))] * 1000, 1) if samples else None
+
+        data['latency_ms'] = {
+            'samples': len(samples),
+            'avg': round(sum(samples) / len(samples) * 1000, 1) if samples else None,
+            'p50': pct(0.5), 'p95': pct(0.95), 'p99': pct(0.99),
+            'max': round(samples[-1] * 1000, 1) if samples else None,
+        }
+        return data
+
+
+class LokiClient:
+    def __init__(self, base_url, timeout=30, connect_timeout=3, pool_size=20, max_connections=100,
+                 keepalive_expiry=30):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout
+        self.pool_size = pool_size
+        self.max_connections = max_connections
+        self.keepalive_expiry = keepalive_expiry
+        self._adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self._local = threading.local()
+        self._async_clients = weakref.WeakKeyDictionary()  # 事件循环 -> httpx.AsyncClient
+        self._server_loops = weakref.WeakSet()             # 运行 ASGI 应用的长期事件循环
+        self._executor = None
+        self._executor_lock = threading.Lock()
+        self._stats = _Stats()
+
+    # ------------------------------------------------------------------
+    # 同步
+
+    def _session(self):
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = requests.Session()
+            session.mount('http://', self._adapter)
+            session.mount('https://', self._adapter)
+            self._local.session = session
+        return session
+
+    def _error(self, exc):
+        """把 requests / httpx 的异常映射为 LokiError"""
+        if isinstance(exc, LokiError):
+            return exc
+        if httpx is not None and isinstance(exc, httpx.HTTPStatusError):
+            code = exc.response.status_code
+            return LokiError(code, f'Loki 返回错误: {code}', str(exc), f'http_{code}')
+        if isinstance(exc, requests.HTTPError):
+            code = exc.response.status_code
+            return LokiError(code, f'Loki 返回错误: {code}', str(exc), f'http_{code}')
+        if isinstance(exc, requests.ConnectionError) or (
+                httpx is not None and isinstance(exc, (httpx.ConnectError, httpx.ConnectTimeout))):
+            return LokiError(502, f'无法连接 Loki 服务: {self.base_url}', 'connection_refused')
+        if isinstance(exc, requests.Timeout) or (httpx is not None and isinstance(exc, httpx.TimeoutException)):
+            return LokiError(504, 'Loki 请求超时', 'timeout')
+        return LokiError(500, '代理请求异常', str(exc), 'error')
+
+    def get(self, endpoint, params=None):
+        """同步 GET，返回解析后的 JSON；失败时抛出 LokiError"""
+        started = self._stats.begin('sync')
+        error = None
+        try:
+            resp = self._session().get(f'{self.base_url}{endpoint}', params=params,
+                                       timeout=(self.connect_timeout, self.timeout))
+            resp.raise_for_status()
+            return loads(resp.content)
+        except Exception as exc:
+            error = self._error(exc)
+            raise error from exc
+        finally:
+            self._stats.end(started, error)
+
+    # ------------------------------------------------------------------
+    # 异步
+
+    def _thread_pool(self):
+        if self._executor is None:
+            with self._executor_lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=self.pool_size, thread_name_prefix='loki')
+        return self._executor
+
+    def _new_async_client(self):
+        return httpx.AsyncClient(
+            base_url=self.base_url,
+            timeout=httpx.Timeout(self.timeout, connect=self.connect_timeout),
+            limits=httpx.Limits(max_connections=self.max_connections,
+                                max_keepalive_connections=self.pool_size,
+                                keepalive_expiry=self.keepalive_expiry),
+        )
+
+    def bind_loop(self):
+        """把当前事件循环登记为长期运行的服务器事件循环（由 serve_on_loop 调用）"""
+        self._server_loops.add(asyncio.get_running_loop())
+
+    def _async_client(self):
+        """
+        已登记的服务器事件循环返回共享的连接池客户端；
+        其它事件循环（async_to_sync、WSGI 下每次调用新建）返回 None，由调用方使用用完即关闭的客户端
+        """
+        loop = asyncio.get_running_loop()
+        if loop not in self._server_loops:
+            return None
+        client = self._async_clients.get(loop)
+        if client is None:
+            client = self._async_clients[loop] = self._new_async_client()
+        return client
+
+    async def aclose(self):
+        """关闭当前事件循环的共享客户端"""
+        client = self._async_clients.pop(asyncio.get_running_loop(), None)
+        if client is not None:
+            await client.aclose()
+
+    async def aget(self, endpoint, params=None):
+        """异步 GET，返回解析后的 JSON；失败时抛出 LokiError"""
+        if httpx is None:
+            # 在专用线程池中执行，不占用 thread_sensitive 的主同步线程
+            return await sync_to_async(self.get, thread_sensitive=False, executor=self._thread_pool())(
+                endpoint, params)
+        started = self._stats.begin('async')
+        error = None
+        try:
+            client = self._async_client()
+            if client is None:
+                async with self._new_async_client() as client:
+                    resp = await client.get(endpoint, params=params)
+            else:
+                resp = await client.get(endpoint, params=params)
+            resp.raise_for_status()
+            return loads(resp.content)
+        except Exception as exc:
+            error = self._error(exc)
+            raise error from exc
+        finally:
+            self._stats.end(started, error)
+
+    async def astream(self, endpoint, params=None, headers=None, chunk_size=64 * 1024):
+        """
+        异步 GET，收到响应头即返回 StreamedResponse，正文按 chunk_size 分块读取；不检查状态码
+        连接失败 / 超时时抛出 LokiError
+        """
+        started = self._stats.begin('stream')
+        error = None
+        try:
+            if httpx is not None:
+                client = self._async_client()
+                owned = client is None
+                if owned:
+                    client = self._new_async_client()
+                try:
+                    resp = await client.send(client.build_request('GET', endpoint, params=params, headers=headers),
+                                             stream=True)
+                except BaseException:
+                    if owned:
+                        await client.aclose()
+                    raise
+
+                async def close_response():
+                    await resp.aclose()
+                    if owned:
+                        await client.aclose()
+
+                return StreamedResponse(resp.status_code, resp.headers, resp.aiter_raw(chunk_size), close_response)
+
+            run = sync_to_async(thread_sensitive=False, executor=self._thread_pool())
+            resp = await run(self._session().get)(f'{self.base_url}{endpoint}', params=params, headers=headers,
+                                                  stream=True, timeout=(self.connect_timeout, self.timeout))
+            raw = resp.raw.stream(chunk_size, decode_content=False)
+
+            async def chunks():
+                while True:
+                    chunk = await run(next)(raw, _END)
+                    if chunk is _END:
+                        return
+                    yield chunk
+
+            async def close():
+                await run(resp.close)()
+
+            return StreamedResponse(resp.status_code, resp.headers, chunks(), close)
+        except Exception as exc:
+            error = self._error(exc)
+            raise error from exc
+        finally:
+            self._stats.end(started, error)
+
+    def count(self, name, n=1):
+        self._stats.count(name, n)
+
+    # ------------------------------------------------------------------
+
+    def _sync_pool_stats(self):
+        pools = []
+        manager = self._adapter.poolmanager
+        for key in list(manager.pools.keys()):
+            pool = manager.pools.get(key)
+            if pool is None:
+                continue
+            pools.append({
+                'host': f'{pool.scheme}://{pool.host}:{pool.port}',
+                'connections_created': pool.num_connections,
+                'requests': pool.num_requests,
+                'idle': sum(1 for conn in list(pool.pool.queue) if conn is not None) if pool.pool else 0,
+            })
+        return pools
+
+    def _async_pool_stats(self):
+        pools = []
+        for client in list(self._async_clients.values()):
+            # httpx 未公开连接池状态，取 httpcore 连接池的 connections
+            connections = getattr(getattr(client._transport, '_pool', None), 'connections', [])
+            pools.append({
+                'connections': len(connections),
+                'idle': sum(1 for conn in connections if conn.is_idle()),
+            })
+        return pools
+
+    def stats(self):
+        data = self._stats.snapshot()
+        data.update({
+            'base_url': self.base_url,
+            'async_backend': 'httpx' if httpx is not None else 'thread',
+            'pool_size': self.pool_size,
+            'max_connections': self.max_connections,
+            'sync_pools': self._sync_pool_stats(),
+            'async_pools': self._async_pool_stats(),
+        })
+        return data
+
+
+client = LokiClient(
+    getattr(settings, 'LOKI_URL', 'http://localhost:3100'),
+    timeout=getattr(settings, 'LOKI_TIMEOUT', 30),
+    connect_timeout=getattr(settings, 'LOKI_CONNECT_TIMEOUT', 3),
+    pool_size=getattr(settings, 'LOKI_POOL_SIZE', 20),
+    max_connections=getattr(settings, 'LOKI_MAX_CONNECTIONS', 100),
+    keepalive_expiry=getattr(settings, 'LOKI_KEEPALIVE_EXPIRY', 30),
+)
+
+
+def stats():
+    return client.stats()
+
+
+def serve_on_loop(app):
+    """
+    包装 ASGI 应用: 运行它的事件循环登记为服务器事件循环，共用 Loki 连接池；
+    lifespan 在这里处理（uvicorn 等会发送，daphne 不发送，其事件循环随进程结束），关闭时释放连接池
+    """
+    async def application(scope, receive, send):
+        client.bind_loop()
+        if scope['type'] != 'lifespan':
+            return await app(scope, receive, send)
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await client.aclose()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    return application
@@ -0,0 +1,143 @@
+"""
+Loki 长区间查询拆分
+把 query_range 按时间拆成若干段，限制并发同时查询，再按时间顺序合并:
+    - 各段按 direction 的顺序调度（backward 从最新的一段开始），同时进行的请求不超过 concurrency
+    - 日志查询按顺序完成的各段累计已够 limit 条时，后面的段不可能进入结果，停止调度并取消仍在进行的请求
+    - 各段时间互不重叠，段内每个 stream 已按 direction 排好序，合并时只需顺序拼接后多路归并
+"""
+import asyncio
+import heapq
+import itertools
+
+
+def split(start, end, interval, align=1, max_segments=None):
+    """
+    把 [start, end) 按 interval 的整数倍边界切分，返回 [(start, end), ...]；align 为边界对齐的粒度（如 step）
+    段数超过 max_segments 时按 2 的幂倍加大 interval
+    """
+    interval = max(interval // align, 1) * align
+    if max_segments:
+        while (end - start) // interval + 1 > max_segments:
+            interval *= 2
+    segments = []
+    cursor = start
+    while cursor < end:
+        boundary = min((cursor // interval + 1) * interval, end)
+        segments.append((cursor, boundary))
+        cursor = boundary
+    return segments
+
+
+async def fan_out(segments, fetch, concurrency, enough=None):
+    """
+    按 segments 的顺序并发执行 fetch(segment)，同时最多 concurrency 个
+    enough(result) 按 segments 的顺序对已完成的段依次调用，返回 True 时之后的段不再查询（见 limit_counter）
+    返回与 segments 对应的结果列表，未查询的段为 None；任一段失败时取消其余请求并抛出异常
+    """
+    results = [None] * len(segments)
+    finished = [False] * len(segments)
+    state = {'next': 0, 'prefix': 0, 'stopped': False}
+    workers = []
+
+    async def worker():
+        while not state['stopped'] and state['next'] < len(segments):
+            index = state['next']
+            state['next'] += 1
+            try:
+                results[index] = await fetch(segments[index])
+            except BaseException:
+                state['stopped'] = True
+                _cancel_others()
+                raise
+            finished[index] = True
+            while state['prefix'] < len(segments) and finished[state['prefix']]:
+                if enough is not None and enough(results[state['prefix']]):
+                    state['stopped'] = True
+                state['prefix'] += 1
+                if state['stopped']:
+                    _cancel_others()
+                    return
+
+    def _cancel_others():
+        current = asyncio.current_task()
+        for task in workers:
+            if task is not current:
+                task.cancel()
+
+    workers.extend(asyncio.ensure_future(worker()) for _ in range(min(concurrency, len(segments))))
+    outcomes = await asyncio.gather(*workers, return_exceptions=True)
+    for outcome in outcomes:
+        if isinstance(outcome, BaseException) and not isinstance(outcome, asyncio.CancelledError):
+            raise outcome
+    return results
+
+
+def limit_counter(limit):
+    """生成 fan_out 的 enough 回调: 累计各段日志条数，达到 limit 时返回 True"""
+    collected = [0]
+
+    def enough(result):
+        collected[0] += sum(len(stream.get('values', [])) for stream in result or ())
+        return collected[0] >= limit
+
+    return enough
+
+
+def _labels_key(labels):
+    return tuple(sorted(labels.items()))
+
+
+def _entries(index, values):
+    return ((int(value[0]), index, value) for value in values)
+
+
+def merge_streams(pieces, direction, limit, max_bytes=None):
+    """
+    合并日志查询各段的 streams，pieces 按 direction 顺序排列（backward 时最新的段在前）
+    同一 stream 的各段直接拼接即保持有序，再跨 stream 多路归并取前 limit 条
+    估算的输出字节数超过 max_bytes 时截断（丢弃 direction 方向上更远的日志）
+    返回 (streams, 是否被截断)
+    """
+    streams = {}
+    for piece in pieces:
+        for stream in piece or ():
+            key = _labels_key(stream.get('stream', {}))
+            if key not in streams:
+                streams[key] = (stream.get('stream', {}), [])
+            streams[key][1].extend(stream.get('values', []))
+    backward = direction != 'forward'
+    ordered = heapq.merge(
+        *(_entries(index, values) for index, (_, values) in enumerate(streams.values())),
+        key=lambda item: item[0], reverse=backward,
+    )
+    grouped = {}
+    size, truncated = 0, False
+    for _, index, value in itertools.islice(ordered, limit or None):
+        if max_bytes is not None:
+            # ["<ts>","<line>"], 加上引号、逗号与括号
+            size += len(value[0]) + len(value[1]) + 8
+            if size > max_bytes:
+                truncated = True
+                break
+        grouped.setdefault(index, []).append(value)
+    result = [
+        {'stream': labels, 'values': grouped[index]}
+        for index, (labels, _) in enumerate(streams.values()) if index in grouped
+    ]
+    return result, truncated
+
+
+def merge_matrix(pieces):
+    """合并指标查询各段的 series，同一时间点去重"""
+    series = {}
+    for piece in pieces:
+        for item in piece or ():
+            key = _labels_key(item.get('metric', {}))
+            if key not in series:
+                series[key] = (item.get('metric', {}), {})
+            for point in item.get('values', []):
+                series[key][1][point[0]] = point
+    return [
+        {'metric': metric, 'values': [points[ts] for ts in sorted(points)]}
+        for metric, points in series.values()
+    ]
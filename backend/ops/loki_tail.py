@@ -0,0 +1,349 @@
+"""
+Loki 实时日志（WebSocket ws/loki/tail/?query=...）
+同一条 LogQL（规范化后相同）的所有浏览器订阅者共用一个上游 tail:
+    - 安装 websockets 时连接 Loki 的 /loki/api/v1/tail；否则每 LOKI_TAIL_POLL_INTERVAL 秒经 loki_client
+      的长连接池以 query_range 增量查询（从上次最新的日志之后开始），推送格式相同
+    - 第一个订阅者连接时启动上游，最后一个断开时关闭；上游断开后按指数退避重连，从断开前最新的日志之后继续
+    - 查询本身有误（Loki 返回 4xx）时向订阅者发送错误并关闭连接，不再重试
+
+每个订阅者有独立的缓冲区，上游日志按订阅者分发后由各自的发送协程分批推送:
+    {"type": "lines", "seq": 1, "streams": [{"stream": {...}, "values": [["<ns>", "<line>"], ...]}], "dropped": 0}
+    - 每帧最多 LOKI_TAIL_BATCH_SIZE 行；不足一帧时等待 LOKI_TAIL_BATCH_INTERVAL 秒再发送，把零散日志合并为一帧
+    - 背压: 客户端处理完一帧后回复 {"action": "ack", "seq": n}；未确认的帧达到 LOKI_TAIL_ACK_WINDOW 时暂停发送，
+      期间缓冲区超过 LOKI_TAIL_BUFFER 行丢弃最旧的日志，丢弃的条数（含 Loki 报告的 dropped_entries）在下一帧的 dropped 中告知；
+      慢客户端只影响自己，不阻塞上游和其他订阅者
+    - 其他消息: {"type": "status", "state": "connected" | "reconnecting"}、{"type": "error", "error": ..., "detail": ...}
+"""
+import asyncio
+import collections
+import logging
+import time
+from urllib.parse import urlencode
+
+from django.conf import settings
+
+from . import loki_cache, loki_client
+from .parsers import loads
+
+try:
+    import websockets
+except ImportError:  # websockets 为可选依赖，未安装时轮询 query_range
+    websockets = None
+
+logger = logging.getLogger(__name__)
+
+NS = 10 ** 9
+MAX_BACKOFF = 30
+POLL_LOOKBACK = 60   # 轮询无新日志时查询窗口最多回看的秒数（容忍 Loki 写入延迟）
+_CLOSED = object()
+
+
+class TailError(Exception):
+    """上游 tail 失败；fatal 为 True 时（查询有误）不再重试"""
+
+    def __init__(self, error, detail, fatal=False):
+        super().__init__(error)
+        self.error = error
+        self.detail = detail
+        self.fatal = fatal
+
+    def payload(self):
+        return {'type': 'error', 'error': self.error, 'detail': self.detail}
+
+
+def _labels_key(labels):
+    return tuple(sorted(labels.items()))
+
+
+class Subscriber:
+    """单个 WebSocket 连接的缓冲区与发送窗口"""
+
+    def __init__(self, buffer_size, batch_size, batch_interval, window):
+        self.buffer_size = buffer_size
+        self.batch_size = batch_size
+        self.batch_interval = batch_interval
+        self.window = window
+        self._entries = collections.deque()   # (labels, [ts, line])
+        self._notices = collections.deque()
+        self._ready = asyncio.Event()     # 有待发送的日志
+        self._noticed = asyncio.Event()   # 有待发送的通知（状态、错误、关闭）
+        self._acked = asyncio.Event()
+        self._acked.set()
+        self.tail = None
+        self.seq = 0
+        self.acked = 0
+        self.dropped = 0
+        self.sent_lines = 0
+
+    def push(self, labels, values):
+        overflow = len(self._entries) + len(values) - self.buffer_size
+        if overflow > 0:
+            # 丢弃最旧的日志（新到的一批本身超过缓冲区时只保留最新的部分）
+            self.dropped += overflow
+            for _ in range(min(overflow, len(self._entries))):
+                self._entries.popleft()
+            values = values[-self.buffer_size:]
+        self._entries.extend((labels, value) for value in values)
+        self._ready.set()
+
+    def notice(self, message):
+        self._notices.append(message)
+        self._noticed.set()
+
+    def ack(self, seq):
+        self.acked = max(self.acked, min(seq, self.seq))
+        if self.seq - self.acked < self.window:
+            self._acked.set()
+
+    def _take(self):
+        streams = {}
+        for _ in range(min(self.batch_size, len(self._entries))):
+            labels, value = self._entries.popleft()
+            key = _labels_key(labels)
+            if key not in streams:
+                streams[key] = {'stream': labels, 'values': []}
+            streams[key]['values'].append(value)
+        self.seq += 1
+        self.sent_lines += sum(len(stream['values']) for stream in streams.values())
+        frame = {'type': 'lines', 'seq': self.seq, 'streams': list(streams.values()), 'dropped': self.dropped}
+        self.dropped = 0
+        if self.window and self.seq - self.acked >= self.window:
+            self._acked.clear()
+        return frame
+
+    async def _wait(self, event=None, timeout=None):
+        """等待 event 或新的通知，至多 timeout 秒"""
+        waiters = [asyncio.ensure_future(self._noticed.wait())]
+        if event is not None:
+            waiters.append(asyncio.ensure_future(event.wait()))
+        try:
+            await asyncio.wait(waiters, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for waiter in waiters:
+                waiter.cancel()
+
+    async def frames(self):
+        """
+        依次产出要发送的消息；通知总是先于日志帧发送，等待确认期间也不受窗口限制，
+        上游因查询错误关闭时产出错误后结束
+        """
+        loop = asyncio.get_running_loop()
+        deadline = None
+        while True:
+            while self._notices:
+                notice = self._notices.popleft()
+                if notice is _CLOSED:
+                    return
+                yield notice
+            self._noticed.clear()
+            if not self._entries:
+                deadline = None
+                self._ready.clear()
+                await self._wait(self._ready)
+                continue
+            if not self._acked.is_set():
+                await self._wait(self._acked)
+                continue
+            if self.batch_interval and len(self._entries) < self.batch_size:
+                if deadline is None:
+                    deadline = loop.time() + self.batch_interval
+                if loop.time() < deadline:
+                    await self._wait(timeout=deadline - loop.time())
+                    continue
+            deadline = None
+            yield self._take()
+
+    def close(self):
+        self._notices.append(_CLOSED)
+        self._noticed.set()
+
+    def stats(self):
+        return {'buffered': len(self._entries), 'unacked': self.seq - self.acked,
+                'frames': self.seq, 'lines': self.sent_lines}
+
+
+class _Tail:
+    """一条查询的上游 tail 与订阅者"""
+
+    def __init__(self, hub, key, query):
+        self.hub = hub
+        self.key = key
+        self.query = query
+        self.subscribers = set()
+        self.last_ts = None
+        self.connected = False
+        self.counters = collections.Counter()
+        self.task = asyncio.get_running_loop().create_task(self._run())
+
+    def broadcast(self, message):
+        for subscriber in self.subscribers:
+            subscriber.notice(message)
+
+    def dispatch(self, message):
+        streams = message.get('streams') or []
+        lines = 0
+        for stream in streams:
+            values = stream.get('values') or []
+            if not values:
+                continue
+            lines += len(values)
+            self.last_ts = max(self.last_ts or 0, max(int(value[0]) for value in values))
+            labels = stream.get('stream') or {}
+            for subscriber in self.subscribers:
+                subscriber.push(labels, values)
+        dropped = len(message.get('dropped_entries') or ())
+        if dropped:
+            for subscriber in self.subscribers:
+                subscriber.dropped += dropped
+        self.counters['lines'] += lines
+        self.counters['upstream_dropped'] += dropped
+
+    def _start(self):
+        return self.last_ts + 1 if self.last_ts is not None else time.time_ns()
+
+    async def _run(self):
+        backoff = 1
+        while True:
+            try:
+                async for message in self.hub.upstream(self.query, self._start()):
+                    if not self.connected:
+                        self.connected = True
+                        backoff = 1
+                        self.broadcast({'type': 'status', 'state': 'connected'})
+                    self.dispatch(message)
+            except asyncio.CancelledError:
+                raise
+            except TailError as exc:
+                self.counters['errors'] += 1
+                self.broadcast(exc.payload())
+                if exc.fatal:
+                    for subscriber in self.subscribers:
+                        subscriber.close()
+                    self.hub.discard(self)
+                    return
+            except Exception as exc:
+                self.counters['errors'] += 1
+                logger.warning('loki tail failed: %s', exc)
+                self.broadcast(TailError('Loki 实时日志连接中断', str(exc)).payload())
+            self.connected = False
+            self.counters['reconnects'] += 1
+            self.broadcast({'type': 'status', 'state': 'reconnecting'})
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, MAX_BACKOFF)
+
+
+class TailHub:
+    def __init__(self, poll_interval=2.0, poll_limit=1000, buffer_size=5000, batch_size=500,
+                 batch_interval=0.2, ack_window=4):
+        self.poll_interval = poll_interval
+        self.poll_limit = poll_limit
+        self.buffer_size = buffer_size
+        self.batch_size = batch_size
+        self.batch_interval = batch_interval
+        self.ack_window = ack_window
+        self._tails = {}
+        self._counters = collections.Counter()
+
+    # ------------------------------------------------------------------
+    # 订阅（均在事件循环中调用）
+    # ------------------------------------------------------------------
+
+    def subscribe(self, query):
+        """订阅 query 的实时日志，返回 Subscriber；同一查询共用上游"""
+        key = loki_cache.normalize_query(query)
+        tail = self._tails.get(key)
+        if tail is None or tail.task.done():
+            tail = self._tails[key] = _Tail(self, key, query)
+            self._counters['upstreams_started'] += 1
+        subscriber = Subscriber(self.buffer_size, self.batch_size, self.batch_interval, self.ack_window)
+        tail.subscribers.add(subscriber)
+        subscriber.tail = tail
+        if tail.connected:
+            subscriber.notice({'type': 'status', 'state': 'connected'})
+        self._counters['subscriptions'] += 1
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        tail = subscriber.tail
+        tail.subscribers.discard(subscriber)
+        if not tail.subscribers:
+            tail.task.cancel()
+            self.discard(tail)
+
+    def discard(self, tail):
+        if self._tails.get(tail.key) is tail:
+            del self._tails[tail.key]
+
+    # ------------------------------------------------------------------
+    # 上游
+    # ------------------------------------------------------------------
+
+    def upstream(self, query, start):
+        """产出 Loki tail 格式的消息 {"streams": [...], "dropped_entries": [...]}"""
+        if websockets is not None:
+            return self._tail_websocket(query, start)
+        return self._tail_poll(query, start)
+
+    async def _tail_websocket(self, query, start):
+        client = loki_client.client
+        url = client.base_url.replace('http', 'ws', 1) + '/loki/api/v1/tail'
+        params = {'query': query, 'start': str(start), 'limit': str(self.poll_limit)}
+        try:
+            connection = await websockets.connect(
+                f'{url}?{urlencode(params)}', open_timeout=client.connect_timeout, max_size=None)
+        except websockets.InvalidStatus as exc:
+            code = exc.response.status_code
+            body = exc.response.body.decode('utf-8', 'replace').strip() if exc.response.body else ''
+            raise TailError(f'Loki 返回错误: {code}', body, fatal=400 <= code < 500) from exc
+        except (OSError, asyncio.TimeoutError) as exc:
+            raise TailError(f'无法连接 Loki 服务: {client.base_url}', 'connection_refused') from exc
+        async with connection:
+            yield {}   # 握手成功即视为已连接，不必等到第一条日志
+            async for raw in connection:
+                yield loads(raw)
+
+    async def _tail_poll(self, query, start):
+        cursor = start
+        while True:
+            end = time.time_ns()
+            try:
+                data = await loki_client.client.aget('/loki/api/v1/query_range', {
+                    'query': query, 'start': cursor, 'end': end, 'direction': 'forward', 'limit': self.poll_limit,
+                })
+            except loki_client.LokiError as exc:
+                raise TailError(exc.error, exc.detail, fatal=400 <= exc.status < 500) from exc
+            streams = data.get('data', {}).get('result') or []
+            yield {'streams': streams}
+            timestamps = [int(value[0]) for stream in streams for value in stream.get('values') or ()]
+            if timestamps:
+                cursor = max(timestamps) + 1
+                if len(timestamps) >= self.poll_limit:
+                    continue   # 本轮未取完，立即继续
+            else:
+                cursor = max(cursor, end - POLL_LOOKBACK * NS)
+            await asyncio.sleep(self.poll_interval)
+
+    def stats(self):
+        return {
+            **self._counters,
+            'backend': 'websocket' if websockets is not None else 'poll',
+            'upstreams': [
+                {'query': tail.key, 'connected': tail.connected, 'subscribers': len(tail.subscribers),
+                 **tail.counters, 'clients': [subscriber.stats() for subscriber in tail.subscribers]}
+                for tail in list(self._tails.values())
+            ],
+        }
+
+
+hub = TailHub(
+    poll_interval=getattr(settings, 'LOKI_TAIL_POLL_INTERVAL', 2.0),
+    poll_limit=getattr(settings, 'LOKI_TAIL_POLL_LIMIT', 1000),
+    buffer_size=getattr(settings, 'LOKI_TAIL_BUFFER', 5000),
+    batch_size=getattr(settings, 'LOKI_TAIL_BATCH_SIZE', 500),
+    batch_interval=getattr(settings, 'LOKI_TAIL_BATCH_INTERVAL', 0.2),
+    ack_window=getattr(settings, 'LOKI_TAIL_ACK_WINDOW', 4),
+)
+
+
+def stats():
+    return hub.stats()
@@ -0,0 +1,64 @@
+"""
+WebSocket Consumer for Loki live tail (ws/loki/tail/?query={job="nginx"})
+订阅 ops/loki_tail.py 中共用的上游 tail，分批推送新日志。连接后可发送
+    {"action": "ack", "seq": n}    确认已处理的帧（见 loki_tail 的背压说明）
+    {"action": "ping"}
+"""
+import asyncio
+from urllib.parse import parse_qs
+
+from channels.generic.websocket import AsyncJsonWebsocketConsumer
+
+from . import loki_cache, loki_tail
+from .parsers import loads
+from .renderers import ORJSONRenderer
+
+
+class LokiTailConsumer(AsyncJsonWebsocketConsumer):
+    subscriber = None
+    sender = None
+
+    async def connect(self):
+        await self.accept()
+        query = parse_qs(self.scope.get('query_string', b'').decode()).get('query', [''])[0].strip()
+        if not query:
+            await self.send_json({'type': 'error', 'error': '缺少 query 参数'})
+            await self.close(code=4400)
+            return
+        if not loki_cache.is_log_query(loki_cache.normalize_query(query)):
+            await self.send_json({'type': 'error', 'error': '实时日志只支持日志查询（以 {...} 流选择器开头）'})
+            await self.close(code=4400)
+            return
+        self.subscriber = loki_tail.hub.subscribe(query)
+        self.sender = asyncio.ensure_future(self._send_frames())
+
+    async def disconnect(self, close_code):
+        if self.sender is not None:
+            self.sender.cancel()
+        if self.subscriber is not None:
+            loki_tail.hub.unsubscribe(self.subscriber)
+            self.subscriber = None
+
+    async def receive_json(self, content, **kwargs):
+        action = content.get('action')
+        if action == 'ack':
+            if self.subscriber is not None and isinstance(content.get('seq'), int):
+                self.subscriber.ack(content['seq'])
+        elif action == 'ping':
+            await self.send_json({'type': 'pong'})
+        else:
+            await self.send_json({'type': 'error', 'error': f'未知操作: {action}'})
+
+    async def _send_frames(self):
+        async for message in self.subscriber.frames():
+            await self.send_json(message)
+        # 上游因查询错误关闭
+        await self.close(code=4400)
+
+    @classmethod
+    async def decode_json(cls, text_data):
+        return loads(text_data)
+
+    @classmethod
+    async def encode_json(cls, content):
+        return ORJSONRenderer().render(content).decode()
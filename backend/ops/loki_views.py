@@ -1,67 +1,148 @@
-import requests as http_requests
+"""
+Loki 日志代理
+异步视图，通过 ops.loki_client 的长连接池转发到 Loki；在 daphne（ASGI）下长查询等待期间不占用 worker 线程。
+query_range 经 ops.loki_cache 按时间桶缓存历史结果、长区间拆分后并发查询，响应头 X-Loki-Cache 标明命中情况（hit / partial / miss / split / bypass）。
+
+无需合并的请求（labels / label values / series / 未切分的 query_range）以直通方式转发: Loki 返回的字节、状态码与
+Content-Encoding（客户端接受 gzip 时向 Loki 请求 gzip）按 LOKI_STREAM_CHUNK_SIZE 分块原样写给客户端，不在 Python 中解析和重新序列化。
+响应大小上限 LOKI_MAX_RESPONSE_BYTES:
+    - 上游声明的 Content-Length 超限时直接返回 413
+    - 未声明长度的响应转发到超限为止即结束（客户端收到无法解析的不完整 JSON，而不是看似完整的截断结果）
+    - 合并后的日志结果超限时截断较远的日志，并设置 data.truncated 与响应头 X-Loki-Truncated；指标结果超限时返回 413
+"""
+import gzip
+import logging
+import zlib
+
 from django.conf import settings
-from rest_framework.decorators import api_view
-from rest_framework.response import Response
+from django.http import HttpResponse, StreamingHttpResponse
+from django.utils.cache import patch_vary_headers
+from django.views.decorators.http import require_GET
 from rest_framework import status
 
+from . import loki_cache, loki_client, loki_tail, middleware
+from .renderers import ORJSONRenderer
+
+logger = logging.getLogger(__name__)
+
+ERROR_BODY_LIMIT = 64 * 1024
+
+
+def _json(data, code=status.HTTP_200_OK):
+    return HttpResponse(ORJSONRenderer().render(data), status=code, content_type='application/json')
+
+
+def _max_bytes():
+    return getattr(settings, 'LOKI_MAX_RESPONSE_BYTES', 32 * 1024 * 1024)
+
+
+def _too_large(size):
+    limit = _max_bytes()
+    return _json({
+        'error': f'查询结果过大（{size / 1048576:.1f} MB，上限 {limit / 1048576:.0f} MB），请缩小时间范围或减少 limit',
+        'detail': 'response_too_large',
+    }, status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+
 
-LOKI_BASE = getattr(settings, 'LOKI_URL', 'http://localhost:3100')
-LOKI_TIMEOUT = 30
+def _decode_error_body(body, encoding):
+    if encoding == 'gzip':
+        try:
+            body = gzip.decompress(body)
+        except (OSError, EOFError, zlib.error):
+            pass
+    return body.decode('utf-8', 'replace').strip()
 
 
-def _proxy_loki(endpoint, query_params):
-    """通用 Loki 代理函数"""
-    url = f'{LOKI_BASE}{endpoint}'
+async def _passthrough(upstream, max_bytes):
+    sent = 0
     try:
-        resp = http_requests.get(url, params=query_params, timeout=LOKI_TIMEOUT)
-        resp.raise_for_status()
-        return Response(resp.json(), status=resp.status_code)
-    except http_requests.ConnectionError:
-        return Response(
-            {'error': f'无法连接 Loki 服务: {LOKI_BASE}', 'detail': 'connection_refused'},
-            status=status.HTTP_502_BAD_GATEWAY,
-        )
-    except http_requests.Timeout:
-        return Response(
-            {'error': 'Loki 请求超时', 'detail': 'timeout'},
-            status=status.HTTP_504_GATEWAY_TIMEOUT,
-        )
-    except http_requests.HTTPError as e:
-        return Response(
-            {'error': f'Loki 返回错误: {e.response.status_code}', 'detail': str(e)},
-            status=e.response.status_code,
-        )
-    except Exception as e:
-        return Response(
-            {'error': '代理请求异常', 'detail': str(e)},
-            status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+        async for chunk in upstream.chunks():
+            if sent + len(chunk) > max_bytes:
+                # 响应头已发出，无法再改为 413；在 ASGI 服务器下抛异常不会断开连接，只能提前结束响应
+                loki_client.client.count('oversize_aborted')
+                logger.warning('loki response exceeded %d bytes, aborting', max_bytes)
+                return
+            sent += len(chunk)
+            yield chunk
+    finally:
+        loki_client.client.count('bytes_streamed', sent)
+        await upstream.aclose()
+
+
+async def _stream_loki(request, endpoint, query_params):
+    """直通转发 Loki 的响应"""
+    accept_gzip = middleware.negotiate(request.META.get('HTTP_ACCEPT_ENCODING', ''), ['gzip']) is not None
+    try:
+        upstream = await loki_client.client.astream(
+            endpoint, query_params, headers={'Accept-Encoding': 'gzip' if accept_gzip else 'identity'},
+            chunk_size=getattr(settings, 'LOKI_STREAM_CHUNK_SIZE', 64 * 1024),
         )
+    except loki_client.LokiError as e:
+        return _json(e.payload(), e.status)
 
+    encoding = upstream.headers.get('Content-Encoding')
+    if upstream.status >= 400:
+        try:
+            body = await upstream.read(ERROR_BODY_LIMIT)
+        finally:
+            await upstream.aclose()
+        loki_client.client.count(f'errors_http_{upstream.status}')
+        return _json({
+            'error': f'Loki 返回错误: {upstream.status}', 'detail': _decode_error_body(body, encoding),
+        }, upstream.status)
 
-@api_view(['GET'])
-def loki_labels(request):
-    """获取 Loki 所有标签名"""
+    max_bytes = _max_bytes()
+    length = upstream.headers.get('Content-Length')
+    if length and length.isdigit() and int(length) > max_bytes:
+        await upstream.aclose()
+        loki_client.client.count('oversize_rejected')
+        return _too_large(int(length))
+
+    response = StreamingHttpResponse(
+        _passthrough(upstream, max_bytes), status=upstream.status,
+        content_type=upstream.headers.get('Content-Type', 'application/json'),
+    )
+    if encoding:
+        response['Content-Encoding'] = encoding
+    if length:
+        response['Content-Length'] = length
+    patch_vary_headers(response, ('Accept-Encoding',))
+    return response
+
+
+async def _proxy_loki(request, endpoint, query_params):
+    """通用 Loki 代理函数；LOKI_STREAM_PASSTHROUGH = False 时解析后重新序列化"""
+    if getattr(settings, 'LOKI_STREAM_PASSTHROUGH', True):
+        return await _stream_loki(request, endpoint, query_params)
+    try:
+        return _json(await loki_client.client.aget(endpoint, query_params))
+    except loki_client.LokiError as e:
+        return _json(e.payload(), e.status)
+
+
+def _time_range(request):
     params = {}
     if request.GET.get('start'):
         params['start'] = request.GET['start']
     if request.GET.get('end'):
         params['end'] = request.GET['end']
-    return _proxy_loki('/loki/api/v1/labels', params)
+    return params
+
+
+@require_GET
+async def loki_labels(request):
+    """获取 Loki 所有标签名"""
+    return await _proxy_loki(request, '/loki/api/v1/labels', _time_range(request))
 
 
-@api_view(['GET'])
-def loki_label_values(request, label_name):
+@require_GET
+async def loki_label_values(request, label_name):
     """获取指定标签的所有值"""
-    params = {}
-    if request.GET.get('start'):
-        params['start'] = request.GET['start']
-    if request.GET.get('end'):
-        params['end'] = request.GET['end']
-    return _proxy_loki(f'/loki/api/v1/label/{label_name}/values', params)
+    return await _proxy_loki(request, f'/loki/api/v1/label/{label_name}/values', _time_range(request))
 
 
-@api_view(['GET'])
-def loki_query_range(request):
+@require_GET
+async def loki_query_range(request):
     """执行 LogQL range 查询"""
     params = {}
     for key in ('query', 'start', 'end', 'limit', 'direction', 'step'):
@@ -69,22 +150,37 @@ def loki_query_range(request):
         if val:
             params[key] = val
     if 'query' not in params:
-        return Response(
-            {'error': '缺少 query 参数'},
-            status=status.HTTP_400_BAD_REQUEST,
-        )
-    return _proxy_loki('/loki/api/v1/query_range', params)
+        return _json({'error': '缺少 query 参数'}, status.HTTP_400_BAD_REQUEST)
+    try:
+        data, cache_state = await loki_cache.query_range(params)
+    except loki_client.LokiError as e:
+        return _json(e.payload(), e.status)
+    if data is None:
+        response = await _proxy_loki(request, '/loki/api/v1/query_range', params)
+    else:
+        body = ORJSONRenderer().render(data)
+        if len(body) > _max_bytes():
+            loki_client.client.count('oversize_rejected')
+            return _too_large(len(body))
+        response = HttpResponse(body, content_type='application/json')
+        if data['data'].get('truncated'):
+            loki_client.client.count('truncated')
+            response['X-Loki-Truncated'] = '1'
+    response['X-Loki-Cache'] = cache_state
+    return response
 
 
-@api_view(['GET'])
-def loki_series(request):
+@require_GET
+async def loki_series(request):
     """查询 Loki series 信息"""
-    params = {}
+    params = _time_range(request)
     match_values = request.GET.getlist('match[]')
     if match_values:
         params['match[]'] = match_values
-    if request.GET.get('start'):
-        params['start'] = request.GET['start']
-    if request.GET.get('end'):
-        params['end'] = request.GET['end']
-    return _proxy_loki('/loki/api/v1/series', params)
+    return await _proxy_loki(request, '/loki/api/v1/series', params)
+
+
+@require_GET
+async def loki_stats(request):
+    """Loki 客户端连接池与请求延迟统计、query_range 缓存命中统计、实时日志订阅"""
+    return _json({**loki_client.stats(), 'cache': loki_cache.stats(), 'tail': loki_tail.stats()})
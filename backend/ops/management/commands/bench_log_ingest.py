@@ -0,0 +1,91 @@
+"""
+日志批量接入压测
+经完整的 HTTP/DRF 链路（gzip NDJSON）推送日志并统计吞吐，结束后清理临时数据
+用法: python manage.py bench_log_ingest [--hosts 200] [--batch 5000] [--requests 20]
+"""
+import gzip
+import json
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from rest_framework.test import APIClient
+
+from ops import dashboard, ingest
+from ops.models import Host, LogEntry
+
+PREFIX = 'bench-log-'
+SERVICES = ['api-gateway', 'order-service', 'payment', 'nginx', 'worker']
+LEVELS = ['info'] * 6 + ['debug'] * 2 + ['warn', 'error']
+MESSAGES = [
+    'GET /api/orders/{n} 200 {ms}ms',
+    'upstream timed out while reading response header, request_id={n}',
+    'connection refused: redis://10.0.0.{n}:6379',
+    '订单 {n} 支付完成，耗时 {ms}ms',
+    'slow query detected: SELECT * FROM orders WHERE id = {n} ({ms}ms)',
+]
+
+
+class Command(BaseCommand):
+    help = '日志批量接入吞吐压测'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hosts', type=int, default=200, help='模拟主机数')
+        parser.add_argument('--batch', type=int, default=5000, help='每个请求携带的日志条数')
+        parser.add_argument('--requests', type=int, default=20, help='请求次数')
+
+    def _entry(self, hostname):
+        return {
+            'hostname': hostname,
+            'service': random.choice(SERVICES),
+            'level': random.choice(LEVELS),
+            'message': random.choice(MESSAGES).format(n=random.randint(1, 99999), ms=random.randint(1, 3000)),
+            'ts': time.time(),
+        }
+
+    def handle(self, *args, **options):
+        n_hosts, batch, n_requests = options['hosts'], options['batch'], options['requests']
+        Host.objects.filter(hostname__startswith=PREFIX).delete()
+        Host.objects.bulk_create(
+            [Host(hostname=f'{PREFIX}{i:05d}', ip_address='10.255.0.1') for i in range(n_hosts)],
+            batch_size=1000,
+        )
+        dashboard.reconcile(['hosts'])
+        ingest.host_lookup.clear()
+        hostnames = [f'{PREFIX}{i:05d}' for i in range(n_hosts)]
+        start_id = LogEntry.objects.order_by('-id').values_list('id', flat=True).first() or 0
+
+        client = APIClient()
+        try:
+            bodies = []
+            for _ in range(n_requests):
+                lines = (json.dumps(self._entry(random.choice(hostnames)), ensure_ascii=False) for _ in range(batch))
+                bodies.append(gzip.compress('\n'.join(lines).encode()))
+
+            latencies = []
+            accepted = 0
+            started = time.perf_counter()
+            for body in bodies:
+                t0 = time.perf_counter()
+                resp = client.generic(
+                    'POST', '/api/logs/ingest/', body,
+                    content_type='application/x-ndjson', HTTP_CONTENT_ENCODING='gzip',
+                )
+                latencies.append(time.perf_counter() - t0)
+                if resp.status_code != 202:
+                    self.stderr.write(f'请求失败: {resp.status_code} {resp.content[:200]}')
+                    return
+                accepted += resp.json()['accepted']
+            elapsed = time.perf_counter() - started
+        finally:
+            LogEntry.objects.filter(id__gt=start_id, host__hostname__startswith=PREFIX).delete()
+            Host.objects.filter(hostname__startswith=PREFIX).delete()
+            ingest.host_lookup.clear()
+
+        latencies.sort()
+        self.stdout.write(f'请求 {n_requests} × {batch} 条，共写入 {accepted} 条')
+        self.stdout.write(
+            f'单请求耗时 p50={latencies[len(latencies) // 2] * 1000:.1f} ms '
+            f'max={latencies[-1] * 1000:.1f} ms'
+        )
+        self.stdout.write(self.style.SUCCESS(f'吞吐: {accepted / elapsed:,.0f} 条/秒'))
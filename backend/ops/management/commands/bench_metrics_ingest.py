@@ -0,0 +1,90 @@
+"""
+指标推送接入压测
+创建临时主机，经完整的 HTTP/DRF 链路（gzip NDJSON）推送报告并统计吞吐，结束后清理临时数据
+用法: python manage.py bench_metrics_ingest [--hosts 2000] [--batch 2000] [--requests 20]
+"""
+import gzip
+import json
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from rest_framework.test import APIClient
+
+from ops import dashboard, ingest
+from ops.models import Host
+
+PREFIX = 'bench-ingest-'
+
+
+class Command(BaseCommand):
+    help = '指标推送接入吞吐压测'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hosts', type=int, default=2000, help='模拟主机数')
+        parser.add_argument('--batch', type=int, default=2000, help='每个请求携带的报告数')
+        parser.add_argument('--requests', type=int, default=20, help='请求次数')
+        parser.add_argument('--probe-format', action='store_true', help='使用 host_probe 原始格式（默认扁平格式）')
+
+    def _report(self, hostname, probe_format):
+        if probe_format:
+            total = 16 * 1024 ** 3
+            return {
+                'v': 1, 'hostname': hostname, 'ts': time.time(), 'cpu': random.uniform(0, 100), 'ncpu': 8,
+                'load': [1.0, 0.8, 0.5], 'uptime': 86400.0,
+                'mem': {'total': total, 'avail': int(total * random.random()), 'swap_total': 0, 'swap_free': 0},
+                'disks': [['/', 'ext4', 10 ** 11, 4 * 10 ** 10, 6 * 10 ** 10]],
+                'net': {'rx': 0, 'tx': 0, 'rx_bps': 1000, 'tx_bps': 2000},
+            }
+        return {
+            'hostname': hostname, 'ts': time.time(),
+            'cpu_usage': round(random.uniform(0, 100), 1),
+            'memory_usage': round(random.uniform(0, 100), 1),
+            'disk_usage': round(random.uniform(0, 100), 1),
+        }
+
+    def handle(self, *args, **options):
+        n_hosts, batch, n_requests = options['hosts'], options['batch'], options['requests']
+        Host.objects.filter(hostname__startswith=PREFIX).delete()
+        Host.objects.bulk_create(
+            [Host(hostname=f'{PREFIX}{i:05d}', ip_address='10.255.0.1') for i in range(n_hosts)],
+            batch_size=1000,
+        )
+        dashboard.reconcile(['hosts'])
+        ingest.host_lookup.clear()
+        hostnames = [f'{PREFIX}{i:05d}' for i in range(n_hosts)]
+
+        client = APIClient()
+        try:
+            bodies = []
+            for _ in range(n_requests):
+                lines = (json.dumps(self._report(random.choice(hostnames), options['probe_format']))
+                         for _ in range(batch))
+                bodies.append(gzip.compress('\n'.join(lines).encode()))
+
+            latencies = []
+            accepted = 0
+            started = time.perf_counter()
+            for body in bodies:
+                t0 = time.perf_counter()
+                resp = client.generic(
+                    'POST', '/api/metrics/ingest/', body,
+                    content_type='application/x-ndjson', HTTP_CONTENT_ENCODING='gzip',
+                )
+                latencies.append(time.perf_counter() - t0)
+                if resp.status_code != 202:
+                    self.stderr.write(f'请求失败: {resp.status_code} {resp.content[:200]}')
+                    return
+                accepted += resp.json()['accepted']
+            elapsed = time.perf_counter() - started
+        finally:
+            Host.objects.filter(hostname__startswith=PREFIX).delete()
+            ingest.host_lookup.clear()
+
+        latencies.sort()
+        self.stdout.write(f'主机 {n_hosts}，请求 {n_requests} × {batch} 条，共接收 {accepted} 条')
+        self.stdout.write(
+            f'单请求耗时 p50={latencies[len(latencies) // 2] * 1000:.1f} ms '
+            f'max={latencies[-1] * 1000:.1f} ms'
+        )
+        self.stdout.write(self.style.SUCCESS(f'吞吐: {accepted / elapsed:,.0f} 条/秒'))
@@ -0,0 +1,98 @@
+"""
+JSON 渲染与响应压缩压测
+用典型载荷（日志列表、SQL 查询结果、Loki query_range、部署日志）对比 DRF JSONRenderer 与 ORJSONRenderer 的渲染耗时
+（并校验输出一致），以及 identity / gzip / br 的传输字节数与压缩耗时
+用法: python manage.py bench_render [--rows 10000] [--repeat 5]
+"""
+import random
+import time
+from datetime import datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.renderers import JSONRenderer
+
+from ops import middleware
+from ops.renderers import ORJSONRenderer, orjson
+
+WORDS = ['request', 'handled', 'timeout', 'upstream', '连接', '失败', '重试', 'user', 'order', 'cache', 'miss', 'ok']
+
+
+def _text(rng, n):
+    return ' '.join(rng.choice(WORDS) for _ in range(n))
+
+
+def payloads(rows):
+    rng = random.Random(42)
+    now = datetime(2026, 1, 1, tzinfo=dt_timezone.utc)
+    logs = {
+        'count': rows, 'next': None, 'previous': None,
+        'results': [{
+            'id': i, 'level_display': 'INFO', 'host_name': f'web-{i % 50:02d}',
+            'level': 'info', 'service': f'svc-{i % 20}', 'message': _text(rng, 12),
+            'timestamp': (now - timedelta(seconds=i)).isoformat(), 'host': i % 50 + 1,
+        } for i in range(rows)],
+    }
+    query = {
+        'columns': ['id', 'user_id', 'amount', 'status', 'remark', 'created_at'],
+        'rows': [{
+            'id': i, 'user_id': rng.randint(1, 10 ** 6), 'amount': Decimal(rng.randint(100, 10 ** 6)) / 100,
+            'status': rng.choice(['paid', 'refund', 'closed']), 'remark': _text(rng, 6),
+            'created_at': now - timedelta(minutes=i),
+        } for i in range(min(rows, 5000))],
+        'count': rows, 'duration_ms': 12,
+    }
+    base_ns = int(now.timestamp() * 1e9)
+    loki = {'status': 'success', 'data': {'resultType': 'streams', 'result': [{
+        'stream': {'job': f'svc-{s}', 'level': 'info', 'host': f'web-{s:02d}'},
+        'values': [[str(base_ns + i * 1000000), f'level=info msg="{_text(rng, 10)}" latency={rng.random():.3f}']
+                   for i in range(rows // 10)],
+    } for s in range(10)]}}
+    deploy_log = {'id': 1, 'status': 'running', 'deploy_log': '\n'.join(
+        f'[{i:05d}] Step {i % 12}/12 : {_text(rng, 8)}' for i in range(rows))}
+    return {'logs': logs, 'query_orders': query, 'loki': loki, 'deploy_log': deploy_log}
+
+
+def _best(func, repeat):
+    best = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - t0
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+class Command(BaseCommand):
+    help = 'JSON 渲染耗时与响应压缩字节数压测'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=10000, help='载荷行数')
+        parser.add_argument('--repeat', type=int, default=5, help='每组重复次数（取最快一次）')
+
+    def handle(self, *args, **options):
+        if orjson is None:
+            self.stdout.write(self.style.WARNING('未安装 orjson，ORJSONRenderer 将退回标准 json'))
+        config = middleware.compression_settings()
+        encodings = middleware.available_encodings({**config, 'ENCODINGS': ['gzip', 'br']})
+        if 'br' not in encodings:
+            self.stdout.write(self.style.WARNING('未安装 brotli，跳过 br'))
+        drf, fast = JSONRenderer(), ORJSONRenderer()
+        repeat = options['repeat']
+
+        for name, data in payloads(options['rows']).items():
+            slow_t, slow_body = _best(lambda: drf.render(data), repeat)
+            fast_t, fast_body = _best(lambda: fast.render(data), repeat)
+            if slow_body != fast_body:
+                raise CommandError(f'{name}: 两种渲染输出不一致')
+            self.stdout.write(
+                f'{name:<12} 渲染  JSONRenderer {slow_t * 1000:7.1f} ms  ORJSONRenderer {fast_t * 1000:6.1f} ms  '
+                f'加速 {slow_t / fast_t:4.1f}x'
+            )
+            line = f'{"":<12} 传输  identity {len(fast_body) / 1024:8.1f} KB'
+            for encoding in encodings:
+                elapsed, body = _best(lambda: middleware.compress(fast_body, encoding, config), repeat)
+                line += (f'  {encoding} {len(body) / 1024:7.1f} KB ({len(body) / len(fast_body):5.1%}, '
+                         f'{elapsed * 1000:.1f} ms)')
+            self.stdout.write(line)
+        self.stdout.write(self.style.SUCCESS('输出校验一致'))
@@ -0,0 +1,106 @@
+"""
+列表序列化压测
+在事务中临时写入测试数据（结束后回滚），对比 ModelSerializer 与 values() 快速序列化的耗时，并校验两者输出一致
+用法: python manage.py bench_serializers [--rows 1000 10000] [--repeat 5] [--model logs alerts deployments hosts]
+"""
+import random
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+
+from ops.fast_serializers import get_values_serializer
+from ops.models import Alert, Deployment, Host, LogEntry
+from ops.serializers import AlertSerializer, DeploymentSerializer, HostSerializer, LogEntrySerializer
+
+TARGETS = {
+    'hosts': (Host, HostSerializer, ('-created_at', '-id')),
+    'deployments': (Deployment, DeploymentSerializer, ('-deployed_at', '-id')),
+    'alerts': (Alert, AlertSerializer, ('-created_at', '-id')),
+    'logs': (LogEntry, LogEntrySerializer, ('-timestamp', '-id')),
+}
+
+
+class _Rollback(Exception):
+    pass
+
+
+def _fill(n):
+    rng = random.Random(42)
+    now = timezone.now()
+    hosts = Host.objects.bulk_create([
+        Host(hostname=f'bench-ser-{i}', ip_address=f'10.{i // 65536 % 256}.{i // 256 % 256}.{i % 256}',
+             status=rng.choice(['online', 'offline', 'warning']), cpu_usage=rng.uniform(0, 100))
+        for i in range(n)
+    ], batch_size=1000)
+    host_pool = hosts[:100] + [None]
+    Deployment.objects.bulk_create([
+        Deployment(app_name=f'app-{i % 50}', version=f'1.{i % 20}.{i % 7}', status=rng.choice(['success', 'failed']),
+                   environment=rng.choice(['development', 'testing', 'production']), host=rng.choice(host_pool))
+        for i in range(n)
+    ], batch_size=1000)
+    Alert.objects.bulk_create([
+        Alert(title=f'告警 {i}', level=rng.choice(['info', 'warning', 'critical']), source='bench',
+              message='x' * 80, host=rng.choice(host_pool), last_seen=now, fingerprint=f'bench-{i}')
+        for i in range(n)
+    ], batch_size=1000)
+    LogEntry.objects.bulk_create([
+        LogEntry(level=rng.choice(['debug', 'info', 'warning', 'error']), service=f'svc-{i % 20}',
+                 message='request handled ' * 5, host=rng.choice(host_pool), timestamp=now - timedelta(seconds=i))
+        for i in range(n)
+    ], batch_size=1000)
+
+
+def _best(func, repeat):
+    best = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - t0
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+class Command(BaseCommand):
+    help = '对比 ModelSerializer 与 values() 快速序列化的列表耗时'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, nargs='+', default=[1000, 10000], help='每次序列化的行数')
+        parser.add_argument('--repeat', type=int, default=5, help='每组重复次数（取最快一次）')
+        parser.add_argument('--model', nargs='+', choices=list(TARGETS), default=list(TARGETS))
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                _fill(max(options['rows']))
+                self._run(options)
+                raise _Rollback
+        except _Rollback:
+            pass
+
+    def _run(self, options):
+        renderer = JSONRenderer()
+        for name in options['model']:
+            model, serializer_class, ordering = TARGETS[name]
+            reader = get_values_serializer(serializer_class)
+            if reader is None:
+                raise CommandError(f'{serializer_class.__name__} 含无法推导的字段')
+            queryset = model.objects.all()
+            if any(f.name == 'host' for f in model._meta.fields):
+                queryset = queryset.select_related('host')
+            queryset = queryset.order_by(*ordering)
+
+            for n in options['rows']:
+                slow, slow_data = _best(lambda: serializer_class(list(queryset[:n]), many=True).data, options['repeat'])
+                fast, fast_data = _best(lambda: reader.to_representation(list(reader.values(queryset)[:n])),
+                                        options['repeat'])
+                if renderer.render(slow_data) != renderer.render(fast_data):
+                    raise CommandError(f'{name}: 两种序列化输出不一致')
+                self.stdout.write(
+                    f'{name:<12} {n:>6} 行  ModelSerializer {slow * 1000:8.1f} ms  '
+                    f'values() {fast * 1000:7.1f} ms  加速 {slow / fast:4.1f}x'
+                )
+        self.stdout.write(self.style.SUCCESS('输出校验一致'))
@@ -0,0 +1,23 @@
+"""
+主机指标降采样与过期清理
+用法: python manage.py downsample_metrics
+建议通过 cron 每分钟执行一次；采集写入时也会在后台自动触发
+"""
+from django.core.management.base import BaseCommand
+
+from ops import timeseries
+
+
+class Command(BaseCommand):
+    help = '主机指标降采样 (1m / 1h / 1d) 并清理过期数据'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--no-prune', action='store_true', help='只降采样，不清理过期数据')
+
+    def handle(self, *args, **options):
+        written = timeseries.downsample()
+        self.stdout.write('降采样: ' + ', '.join(f'{k}={v}' for k, v in written.items()))
+        if not options['no_prune']:
+            pruned = timeseries.prune()
+            self.stdout.write('清理: ' + ', '.join(f'{k}={v}' for k, v in pruned.items()))
+        self.stdout.write(self.style.SUCCESS('完成'))
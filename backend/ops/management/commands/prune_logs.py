@@ -0,0 +1,35 @@
+"""
+按保留策略清理过期日志（需要归档的先写入压缩段文件）
+用法: python manage.py prune_logs [--dry-run] [--chunk 2000] [--pause 0.05]
+采集调度器运行时会按 LOG_RETENTION_INTERVAL 自动执行；否则建议通过 cron 每小时执行一次
+"""
+from django.core.management.base import BaseCommand
+
+from ops import retention
+
+
+class Command(BaseCommand):
+    help = '按保留策略分块清理并归档过期日志'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='只统计各规则将清理的条数')
+        parser.add_argument('--chunk', type=int, default=None, help='每块删除的行数')
+        parser.add_argument('--pause', type=float, default=None, help='块之间的停顿秒数')
+        parser.add_argument('--max-seconds', type=float, default=None, help='本次执行的时间上限')
+
+    def handle(self, *args, **options):
+        result = retention.prune_logs(
+            dry_run=options['dry_run'], chunk_size=options['chunk'],
+            pause=options['pause'], max_seconds=options['max_seconds'],
+        )
+        if result.get('skipped'):
+            self.stdout.write('已有清理任务在执行，跳过')
+            return
+        for label, count in result['rules'].items():
+            self.stdout.write(f'{label}: {count}')
+        if not options['dry_run']:
+            self.stdout.write(
+                f"删除 {result['deleted']} 条，归档 {result['archived']} 条 / {result['segments']} 个段文件，"
+                f"耗时 {result['elapsed_ms']} ms"
+            )
+        self.stdout.write(self.style.SUCCESS('完成'))
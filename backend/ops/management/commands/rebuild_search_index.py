@@ -0,0 +1,22 @@
+"""
+重建日志 / 告警全文索引
+用法: python manage.py rebuild_search_index
+索引由触发器增量维护，通常无需手动执行；批量导入或恢复数据库后可用于校正
+"""
+from django.core.management.base import BaseCommand
+
+from ops import search
+
+
+class Command(BaseCommand):
+    help = '重建日志 / 告警全文索引'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default='default', help='数据库别名')
+
+    def handle(self, *args, **options):
+        backend = search.get_backend(options['database'])
+        self.stdout.write(f'检索后端: {type(backend).__name__}')
+        # setup 幂等，索引缺失时一并创建
+        search.setup_all(options['database'])
+        self.stdout.write(self.style.SUCCESS('完成'))
@@ -0,0 +1,19 @@
+"""
+仪表盘计数器对账
+从业务表重算全部计数器并输出偏差
+用法: python manage.py reconcile_dashboard
+未运行采集调度器（run_collector / COLLECTOR_AUTOSTART）时，建议通过 cron 定期执行
+"""
+from django.core.management.base import BaseCommand
+
+from ops import dashboard
+
+
+class Command(BaseCommand):
+    help = '仪表盘计数器与业务表对账'
+
+    def handle(self, *args, **options):
+        drift = dashboard.reconcile()
+        for key, (before, after) in sorted(drift.items()):
+            self.stdout.write(f'{key}: {before} -> {after}')
+        self.stdout.write(self.style.SUCCESS(f'完成，修正 {len(drift)} 项'))
@@ -0,0 +1,39 @@
+"""
+并发刷新主机 CPU / 内存 / 磁盘信息
+用法: python manage.py refresh_hosts [--ids 1 2 3] [--concurrency 32] [--timeout 15]
+"""
+from django.core.management.base import BaseCommand
+
+from ops import collector
+from ops.models import Host
+
+
+class Command(BaseCommand):
+    help = '并发刷新主机指标'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--ids', nargs='*', type=int, help='主机 ID 列表，默认全部')
+        parser.add_argument('--concurrency', type=int, default=collector.DEFAULT_CONCURRENCY, help='最大并发数')
+        parser.add_argument('--timeout', type=float, default=collector.DEFAULT_TIMEOUT, help='单台主机超时(秒)')
+        parser.add_argument('--verbose-hosts', action='store_true', help='逐台输出结果')
+
+    def handle(self, *args, **options):
+        hosts = Host.objects.all()
+        if options['ids']:
+            hosts = hosts.filter(pk__in=options['ids'])
+
+        results, summary = collector.refresh_hosts(
+            hosts, concurrency=options['concurrency'], timeout=options['timeout'],
+        )
+
+        for row in results:
+            if row['success']:
+                if options['verbose_hosts']:
+                    self.stdout.write(f"  [✓] {row['hostname']} ({row['elapsed_ms']} ms)")
+            else:
+                self.stdout.write(self.style.WARNING(f"  [✗] {row['hostname']}: {row['error']}"))
+
+        self.stdout.write(self.style.SUCCESS(
+            f"完成: 共 {summary['total']} 台，成功 {summary['success']}，失败 {summary['failed']}，"
+            f"并发 {summary['concurrency']}，耗时 {summary['elapsed_ms']} ms"
+        ))
@@ -0,0 +1,51 @@
+"""
+启动主机指标周期采集调度器（前台运行，Ctrl+C / SIGTERM 退出）
+用法: python manage.py run_collector [--interval 60] [--concurrency 32] [--subnet-concurrency 8]
+"""
+import json
+import signal
+
+from django.core.management.base import BaseCommand
+
+from ops import live, scheduler
+
+
+class Command(BaseCommand):
+    help = '周期采集主机指标'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float, help='采集周期(秒)，默认 COLLECTOR_INTERVAL')
+        parser.add_argument('--jitter', type=float, help='抖动比例 (0~1)，默认 COLLECTOR_JITTER')
+        parser.add_argument('--concurrency', type=int, help='全局并发上限，默认 COLLECTOR_CONCURRENCY')
+        parser.add_argument('--subnet-concurrency', type=int, help='单子网并发上限，默认 COLLECTOR_SUBNET_CONCURRENCY')
+        parser.add_argument('--timeout', type=float, help='单台主机超时(秒)')
+        parser.add_argument('--stats-interval', type=float, default=60, help='输出运行指标的间隔(秒)，0 为不输出')
+
+    def handle(self, *args, **options):
+        sched = scheduler.build_scheduler(
+            interval=options['interval'],
+            jitter=options['jitter'],
+            concurrency=options['concurrency'],
+            subnet_concurrency=options['subnet_concurrency'],
+            timeout=options['timeout'],
+        )
+        if options['stats_interval']:
+            sched.tasks.append((
+                'stats', options['stats_interval'],
+                lambda: self.stdout.write(json.dumps(sched.stats(), ensure_ascii=False)),
+            ))
+
+        def _shutdown(signum, frame):
+            sched.stop()
+
+        signal.signal(signal.SIGTERM, _shutdown)
+        # 跨进程 channel layer 下把本进程产生的变更推送给 ASGI 进程中的订阅者
+        live.hub.start_thread_flusher()
+        self.stdout.write(self.style.SUCCESS(
+            f'采集调度器已启动: 周期 {sched.interval}s，并发 {sched.concurrency}，单子网并发 {sched.subnet_concurrency}'
+        ))
+        try:
+            sched.run_forever()
+        except KeyboardInterrupt:
+            sched.stop()
+        self.stdout.write('采集调度器已停止')
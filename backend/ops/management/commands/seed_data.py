@@ -2,6 +2,7 @@ import random
 from django.core.management.base import BaseCommand
 from django.utils import timezone
 from datetime import timedelta
+from ops.alerting import fire_alert
 from ops.models import Host, Deployment, Alert, LogEntry
 
 
@@ -83,14 +84,16 @@ class Command(BaseCommand):
         ]
         for i in range(20):
             template = random.choice(alert_templates)
-            Alert.objects.create(
+            alert, _ = fire_alert(
                 title=template[0],
                 level=template[1],
                 source=template[2],
                 message=template[3],
-                is_acknowledged=random.choice([True, False, False]),
                 host=random.choice(hosts),
             )
+            if random.random() < 1 / 3:
+                alert.is_acknowledged = True
+                alert.save(update_fields=['is_acknowledged'])
 
         self.stdout.write('正在生成日志数据...')
         services = ['user-service', 'order-service', 'gateway', 'nginx', 'mysql', 'redis']
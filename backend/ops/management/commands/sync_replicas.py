@@ -0,0 +1,52 @@
+"""
+只读副本同步与探活
+把主库（SQLite）在线备份到 DATABASE_REPLICAS 中的 SQLite 副本文件，并输出各副本的健康状态；
+非 SQLite 副本由数据库自身的复制维护，只做探活。
+用法: python manage.py sync_replicas [--interval 5]
+本地用两个 SQLite 文件验证读写分离时使用，--interval 大于 0 时按间隔持续同步
+"""
+import sqlite3
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from ops import db_router
+
+
+def _backup(source, target):
+    src = sqlite3.connect(source)
+    dst = sqlite3.connect(target)
+    try:
+        src.backup(dst)
+    finally:
+        dst.close()
+        src.close()
+
+
+class Command(BaseCommand):
+    help = '同步 SQLite 只读副本并检查副本健康状态'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float, default=0, help='持续同步的间隔秒数，0 表示只同步一次')
+
+    def handle(self, *args, **options):
+        aliases = db_router.replicas()
+        if not aliases:
+            raise CommandError('未配置 DATABASE_REPLICAS')
+        primary = connections[DEFAULT_DB_ALIAS]
+        while True:
+            for alias in aliases:
+                connection = connections[alias]
+                if connection.vendor == 'sqlite' and primary.vendor == 'sqlite':
+                    # 先断开副本上的连接，备份会整体替换文件内容
+                    connection.close()
+                    t0 = time.perf_counter()
+                    _backup(str(primary.settings_dict['NAME']), str(connection.settings_dict['NAME']))
+                    self.stdout.write(f'{alias}: 已从主库同步 ({(time.perf_counter() - t0) * 1000:.0f} ms)')
+                healthy = db_router.is_healthy(alias, force=True)
+                status = self.style.SUCCESS('健康') if healthy else self.style.ERROR('不可用')
+                self.stdout.write(f'{alias}: {status}')
+            if options['interval'] <= 0:
+                break
+            time.sleep(options['interval'])
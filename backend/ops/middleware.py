@@ -0,0 +1,96 @@
+"""
+响应压缩
+按 Accept-Encoding 协商 br / gzip，压缩超过 MIN_SIZE 字节的 JSON / 文本响应（如 SQL 查询结果、Loki 代理、部署日志）。
+brotli 为可选依赖，未安装时只协商 gzip。
+流式响应不在这里处理（导出接口自带 compress=gzip 参数），HTML 页面不压缩，避免 BREACH 类攻击泄露页面中的 CSRF 令牌。
+
+配置（settings.REST_FRAMEWORK['RESPONSE_COMPRESSION']，均可省略）:
+    'ENABLED': True
+    'MIN_SIZE': 1024
+    'ENCODINGS': ['br', 'gzip']          # 服务端优先顺序
+    'GZIP_LEVEL': 6
+    'BROTLI_QUALITY': 5
+    'CONTENT_TYPES': ['application/json', 'application/x-ndjson', 'text/plain', 'text/csv']
+"""
+import gzip
+
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+
+try:
+    import brotli
+except ImportError:  # brotli 为可选依赖
+    brotli = None
+
+DEFAULTS = {
+    'ENABLED': True,
+    'MIN_SIZE': 1024,
+    'ENCODINGS': ['br', 'gzip'],
+    'GZIP_LEVEL': 6,
+    'BROTLI_QUALITY': 5,
+    'CONTENT_TYPES': ['application/json', 'application/x-ndjson', 'text/plain', 'text/csv'],
+}
+
+
+def compression_settings():
+    return {**DEFAULTS, **getattr(settings, 'REST_FRAMEWORK', {}).get('RESPONSE_COMPRESSION', {})}
+
+
+def available_encodings(config):
+    return [e for e in config['ENCODINGS'] if e == 'gzip' or (e == 'br' and brotli is not None)]
+
+
+def negotiate(accept_encoding, encodings):
+    """按 Accept-Encoding（含 q 值与 *）从 encodings（服务端优先顺序）中选出编码，不可接受时返回 None"""
+    accepted = {}
+    for item in accept_encoding.split(','):
+        name, _, params = item.strip().partition(';')
+        name = name.strip().lower()
+        if not name:
+            continue
+        q = 1.0
+        for param in params.split(';'):
+            key, _, value = param.strip().partition('=')
+            if key.strip() == 'q':
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        accepted[name] = q
+    for encoding in encodings:
+        if accepted.get(encoding, accepted.get('*', 0)) > 0:
+            return encoding
+    return None
+
+
+def compress(data, encoding, config):
+    if encoding == 'br':
+        return brotli.compress(data, quality=config['BROTLI_QUALITY'])
+    return gzip.compress(data, compresslevel=config['GZIP_LEVEL'], mtime=0)
+
+
+class ResponseCompressionMiddleware(MiddlewareMixin):
+    def process_response(self, request, response):
+        config = compression_settings()
+        if not config['ENABLED'] or response.streaming or response.has_header('Content-Encoding'):
+            return response
+        content_type = response.get('Content-Type', '').split(';', 1)[0].strip().lower()
+        if content_type not in config['CONTENT_TYPES'] or len(response.content) < config['MIN_SIZE']:
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        encoding = negotiate(request.META.get('HTTP_ACCEPT_ENCODING', ''), available_encodings(config))
+        if encoding is None:
+            return response
+        compressed = compress(response.content, encoding, config)
+        if len(compressed) >= len(response.content):
+            return response
+
+        response.content = compressed
+        response.headers['Content-Length'] = str(len(compressed))
+        response.headers['Content-Encoding'] = encoding
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response.headers['ETag'] = 'W/' + etag
+        return response
@@ -0,0 +1,64 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:12
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ops', '0002_host_ssh_password_host_ssh_port_host_ssh_user'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HostMetricRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('resolution', models.CharField(choices=[('1m', '1 分钟'), ('1h', '1 小时'), ('1d', '1 天')], max_length=4, verbose_name='分辨率')),
+                ('bucket', models.DateTimeField(verbose_name='时间桶')),
+                ('samples', models.IntegerField(default=0, verbose_name='样本数')),
+                ('cpu_min', models.FloatField(default=0)),
+                ('cpu_avg', models.FloatField(default=0)),
+                ('cpu_max', models.FloatField(default=0)),
+                ('cpu_p95', models.FloatField(default=0)),
+                ('memory_min', models.FloatField(default=0)),
+                ('memory_avg', models.FloatField(default=0)),
+                ('memory_max', models.FloatField(default=0)),
+                ('memory_p95', models.FloatField(default=0)),
+                ('disk_min', models.FloatField(default=0)),
+                ('disk_avg', models.FloatField(default=0)),
+                ('disk_max', models.FloatField(default=0)),
+                ('disk_p95', models.FloatField(default=0)),
+                ('load1_avg', models.FloatField(blank=True, null=True)),
+                ('net_rx_bps_avg', models.BigIntegerField(blank=True, null=True)),
+                ('net_tx_bps_avg', models.BigIntegerField(blank=True, null=True)),
+                ('host', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='metric_rollups', to='ops.host', verbose_name='主机')),
+            ],
+            options={
+                'verbose_name': '主机指标聚合',
+                'verbose_name_plural': '主机指标聚合',
+                'indexes': [models.Index(fields=['resolution', 'bucket'], name='ops_rollup_res_bucket_idx')],
+                'constraints': [models.UniqueConstraint(fields=('host', 'resolution', 'bucket'), name='uniq_host_metric_rollup')],
+            },
+        ),
+        migrations.CreateModel(
+            name='HostMetricSample',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('timestamp', models.DateTimeField(db_index=True, verbose_name='采样时间')),
+                ('cpu_usage', models.FloatField(verbose_name='CPU 使用率 (%)')),
+                ('memory_usage', models.FloatField(verbose_name='内存使用率 (%)')),
+                ('disk_usage', models.FloatField(verbose_name='磁盘使用率 (%)')),
+                ('load1', models.FloatField(blank=True, null=True, verbose_name='1 分钟负载')),
+                ('net_rx_bps', models.BigIntegerField(blank=True, null=True, verbose_name='网络接收 (B/s)')),
+                ('net_tx_bps', models.BigIntegerField(blank=True, null=True, verbose_name='网络发送 (B/s)')),
+                ('host', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='metric_samples', to='ops.host', verbose_name='主机')),
+            ],
+            options={
+                'verbose_name': '主机指标采样',
+                'verbose_name_plural': '主机指标采样',
+                'indexes': [models.Index(fields=['host', 'timestamp'], name='ops_sample_host_ts_idx')],
+            },
+        ),
+    ]
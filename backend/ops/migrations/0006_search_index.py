@@ -0,0 +1,31 @@
+from django.db import migrations
+
+from ops import search
+
+FIELDS = {
+    'logentry': ('service', 'message'),
+    'alert': ('title', 'source', 'message'),
+}
+
+
+def _indexes(apps):
+    return {apps.get_model('ops', name): fields for name, fields in FIELDS.items()}
+
+
+def create_index(apps, schema_editor):
+    search.setup_all(schema_editor.connection.alias, _indexes(apps))
+
+
+def drop_index(apps, schema_editor):
+    search.teardown_all(schema_editor.connection.alias, _indexes(apps))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ops', '0005_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ops', '0007_logentry_timestamp_default'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LogRetentionPolicy',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('service', models.CharField(blank=True, default='', max_length=128, verbose_name='服务名')),
+                ('level', models.CharField(blank=True, choices=[('error', 'ERROR'), ('warning', 'WARNING'), ('info', 'INFO'), ('debug', 'DEBUG')], default='', max_length=16, verbose_name='级别')),
+                ('retention_days', models.PositiveIntegerField(default=30, verbose_name='保留天数')),
+                ('archive', models.BooleanField(default=True, verbose_name='过期归档')),
+                ('enabled', models.BooleanField(default=True, verbose_name='启用')),
+                ('description', models.CharField(blank=True, default='', max_length=256, verbose_name='说明')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='更新时间')),
+            ],
+            options={
+                'verbose_name': '日志保留策略',
+                'verbose_name_plural': '日志保留策略',
+                'ordering': ['service', 'level'],
+                'constraints': [models.UniqueConstraint(fields=('service', 'level'), name='uniq_log_retention_scope')],
+            },
+        ),
+    ]
@@ -0,0 +1,76 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:26
+
+import hashlib
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def _fingerprint(alert):
+    raw = '\x1f'.join([alert.source or '', str(alert.host_id or ''), alert.title or '', alert.level or ''])
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+
+def backfill_fingerprints(apps, schema_editor):
+    """计算存量告警的指纹，并把同一指纹的多条未确认告警合并到最新一条上"""
+    Alert = apps.get_model('ops', 'Alert')
+    DashboardCounter = apps.get_model('ops', 'DashboardCounter')
+    open_alerts = {}
+    batch = []
+    for alert in Alert.objects.only('id', 'source', 'host_id', 'title', 'level', 'is_acknowledged', 'created_at') \
+            .order_by('id').iterator(chunk_size=2000):
+        alert.fingerprint = _fingerprint(alert)
+        alert.last_seen = alert.created_at
+        batch.append(alert)
+        if not alert.is_acknowledged:
+            open_alerts.setdefault(alert.fingerprint, []).append(alert)
+        if len(batch) >= 2000:
+            Alert.objects.bulk_update(batch, ['fingerprint', 'last_seen'])
+            batch = []
+    if batch:
+        Alert.objects.bulk_update(batch, ['fingerprint', 'last_seen'])
+
+    duplicates = []
+    for group in open_alerts.values():
+        if len(group) < 2:
+            continue
+        latest = group[-1]
+        Alert.objects.filter(pk=latest.pk).update(
+            count=len(group), last_seen=max(a.created_at for a in group),
+        )
+        duplicates.extend(a.pk for a in group[:-1])
+    for i in range(0, len(duplicates), 500):
+        Alert.objects.filter(pk__in=duplicates[i:i + 500]).delete()
+    if duplicates:
+        # 仪表盘计数器在下次读取时全量对账
+        DashboardCounter.objects.filter(key='meta.reconciled_at').delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ops', '0008_logretentionpolicy'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='alert',
+            name='count',
+            field=models.PositiveIntegerField(default=1, verbose_name='触发次数'),
+        ),
+        migrations.AddField(
+            model_name='alert',
+            name='fingerprint',
+            field=models.CharField(blank=True, default='', editable=False, max_length=40, verbose_name='指纹'),
+        ),
+        migrations.AddField(
+            model_name='alert',
+            name='last_seen',
+            field=models.DateTimeField(default=django.utils.timezone.now, verbose_name='最近触发'),
+        ),
+        migrations.RunPython(backfill_fingerprints, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='alert',
+            constraint=models.UniqueConstraint(condition=models.Q(('is_acknowledged', False)), fields=('fingerprint',), name='uniq_open_alert_fingerprint'),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ops', '0009_alert_fingerprint'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AlertRule',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=128, unique=True, verbose_name='规则名称')),
+                ('metric', models.CharField(choices=[('cpu_usage', 'CPU 使用率'), ('memory_usage', '内存使用率'), ('disk_usage', '磁盘使用率')], max_length=32, verbose_name='指标')),
+                ('operator', models.CharField(choices=[('>', '大于'), ('>=', '大于等于'), ('<', '小于'), ('<=', '小于等于')], default='>', max_length=2, verbose_name='比较符')),
+                ('threshold', models.FloatField(verbose_name='阈值')),
+                ('duration', models.PositiveIntegerField(default=0, verbose_name='持续时间 (秒)')),
+                ('level', models.CharField(choices=[('critical', '严重'), ('warning', '警告'), ('info', '信息')], default='warning', max_length=16, verbose_name='告警级别')),
+                ('enabled', models.BooleanField(default=True, verbose_name='启用')),
+                ('description', models.CharField(blank=True, default='', max_length=256, verbose_name='说明')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='创建时间')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='更新时间')),
+            ],
+            options={
+                'verbose_name': '告警规则',
+                'verbose_name_plural': '告警规则',
+                'ordering': ['name'],
+            },
+        ),
+    ]
@@ -1,4 +1,7 @@
+import hashlib
+
 from django.db import models
+from django.utils import timezone
 
 
 class Host(models.Model):
@@ -58,6 +61,10 @@ class Deployment(models.Model):
         verbose_name = '部署记录'
         verbose_name_plural = '部署记录'
         ordering = ['-deployed_at']
+        indexes = [
+            # 游标分页按 (时间, id) 定位
+            models.Index(fields=['deployed_at', 'id'], name='ops_deploy_time_id_idx'),
+        ]
 
     def __str__(self):
         return f'{self.app_name} v{self.version} -> {self.environment}'
@@ -77,16 +84,77 @@ class Alert(models.Model):
     is_acknowledged = models.BooleanField('已确认', default=False)
     host = models.ForeignKey(Host, on_delete=models.SET_NULL, null=True, blank=True, verbose_name='关联主机')
     created_at = models.DateTimeField('创建时间', auto_now_add=True)
+    # 同一 (来源, 主机, 标题, 级别) 的重复触发合并到未确认的告警上，见 ops/alerting.py
+    fingerprint = models.CharField('指纹', max_length=40, blank=True, default='', editable=False)
+    count = models.PositiveIntegerField('触发次数', default=1)
+    last_seen = models.DateTimeField('最近触发', default=timezone.now)
 
     class Meta:
         verbose_name = '告警'
         verbose_name_plural = '告警'
         ordering = ['-created_at']
+        indexes = [
+            # 游标分页按 (时间, id) 定位
+            models.Index(fields=['created_at', 'id'], name='ops_alert_time_id_idx'),
+        ]
+        constraints = [
+            # 每个指纹最多一条未确认告警，同时作为去重 upsert 的冲突目标
+            models.UniqueConstraint(
+                fields=['fingerprint'], condition=models.Q(is_acknowledged=False),
+                name='uniq_open_alert_fingerprint',
+            ),
+        ]
+
+    @staticmethod
+    def make_fingerprint(source, host_id, title, level):
+        raw = '\x1f'.join([source or '', str(host_id or ''), title or '', level or ''])
+        return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+    def save(self, *args, **kwargs):
+        self.fingerprint = self.make_fingerprint(self.source, self.host_id, self.title, self.level)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'fingerprint' not in update_fields:
+            kwargs['update_fields'] = [*update_fields, 'fingerprint']
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return f'[{self.level}] {self.title}'
 
 
+class AlertRule(models.Model):
+    """阈值告警规则，例如 "cpu_usage > 90 持续 300 秒"，由 ops/rules.py 对全部主机批量评估"""
+    METRIC_CHOICES = [
+        ('cpu_usage', 'CPU 使用率'),
+        ('memory_usage', '内存使用率'),
+        ('disk_usage', '磁盘使用率'),
+    ]
+    OPERATOR_CHOICES = [
+        ('>', '大于'),
+        ('>=', '大于等于'),
+        ('<', '小于'),
+        ('<=', '小于等于'),
+    ]
+
+    name = models.CharField('规则名称', max_length=128, unique=True)
+    metric = models.CharField('指标', max_length=32, choices=METRIC_CHOICES)
+    operator = models.CharField('比较符', max_length=2, choices=OPERATOR_CHOICES, default='>')
+    threshold = models.FloatField('阈值')
+    duration = models.PositiveIntegerField('持续时间 (秒)', default=0)
+    level = models.CharField('告警级别', max_length=16, choices=Alert.LEVEL_CHOICES, default='warning')
+    enabled = models.BooleanField('启用', default=True)
+    description = models.CharField('说明', max_length=256, blank=True, default='')
+    created_at = models.DateTimeField('创建时间', auto_now_add=True)
+    updated_at = models.DateTimeField('更新时间', auto_now=True)
+
+    class Meta:
+        verbose_name = '告警规则'
+        verbose_name_plural = '告警规则'
+        ordering = ['name']
+
+    def __str__(self):
+        return f'{self.name}: {self.metric} {self.operator} {self.threshold} for {self.duration}s'
+
+
 class LogEntry(models.Model):
     LEVEL_CHOICES = [
         ('error', 'ERROR'),
@@ -99,12 +167,116 @@ class LogEntry(models.Model):
     service = models.CharField('服务名', max_length=128)
     message = models.TextField('日志内容')
     host = models.ForeignKey(Host, on_delete=models.SET_NULL, null=True, blank=True, verbose_name='来源主机')
-    timestamp = models.DateTimeField('时间', auto_now_add=True)
+    timestamp = models.DateTimeField('时间', default=timezone.now)
 
     class Meta:
         verbose_name = '日志'
         verbose_name_plural = '日志'
         ordering = ['-timestamp']
+        indexes = [
+            # 游标分页按 (时间, id) 定位
+            models.Index(fields=['timestamp', 'id'], name='ops_log_time_id_idx'),
+        ]
 
     def __str__(self):
         return f'[{self.level}] {self.service}: {self.message[:50]}'
+
+
+class LogRetentionPolicy(models.Model):
+    """日志保留策略，service / level 为空表示匹配全部；同时命中多条时 service+level > service > level > 全局"""
+    service = models.CharField('服务名', max_length=128, blank=True, default='')
+    level = models.CharField('级别', max_length=16, choices=LogEntry.LEVEL_CHOICES, blank=True, default='')
+    retention_days = models.PositiveIntegerField('保留天数', default=30)
+    archive = models.BooleanField('过期归档', default=True)
+    enabled = models.BooleanField('启用', default=True)
+    description = models.CharField('说明', max_length=256, blank=True, default='')
+    updated_at = models.DateTimeField('更新时间', auto_now=True)
+
+    class Meta:
+        verbose_name = '日志保留策略'
+        verbose_name_plural = '日志保留策略'
+        ordering = ['service', 'level']
+        constraints = [
+            models.UniqueConstraint(fields=['service', 'level'], name='uniq_log_retention_scope'),
+        ]
+
+    def __str__(self):
+        return f'{self.service or "*"}/{self.level or "*"}: {self.retention_days}d'
+
+
+class HostMetricSample(models.Model):
+    """主机指标原始采样（短期保留，定期降采样为 HostMetricRollup）"""
+    host = models.ForeignKey(Host, on_delete=models.CASCADE, related_name='metric_samples', verbose_name='主机')
+    timestamp = models.DateTimeField('采样时间', db_index=True)
+    cpu_usage = models.FloatField('CPU 使用率 (%)')
+    memory_usage = models.FloatField('内存使用率 (%)')
+    disk_usage = models.FloatField('磁盘使用率 (%)')
+    load1 = models.FloatField('1 分钟负载', null=True, blank=True)
+    net_rx_bps = models.BigIntegerField('网络接收 (B/s)', null=True, blank=True)
+    net_tx_bps = models.BigIntegerField('网络发送 (B/s)', null=True, blank=True)
+
+    class Meta:
+        verbose_name = '主机指标采样'
+        verbose_name_plural = '主机指标采样'
+        indexes = [
+            models.Index(fields=['host', 'timestamp'], name='ops_sample_host_ts_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.host_id} @ {self.timestamp}'
+
+
+class HostMetricRollup(models.Model):
+    """主机指标降采样（按分辨率聚合 min / avg / max / p95）"""
+    RESOLUTION_CHOICES = [
+        ('1m', '1 分钟'),
+        ('1h', '1 小时'),
+        ('1d', '1 天'),
+    ]
+
+    host = models.ForeignKey(Host, on_delete=models.CASCADE, related_name='metric_rollups', verbose_name='主机')
+    resolution = models.CharField('分辨率', max_length=4, choices=RESOLUTION_CHOICES)
+    bucket = models.DateTimeField('时间桶')
+    samples = models.IntegerField('样本数', default=0)
+    cpu_min = models.FloatField(default=0)
+    cpu_avg = models.FloatField(default=0)
+    cpu_max = models.FloatField(default=0)
+    cpu_p95 = models.FloatField(default=0)
+    memory_min = models.FloatField(default=0)
+    memory_avg = models.FloatField(default=0)
+    memory_max = models.FloatField(default=0)
+    memory_p95 = models.FloatField(default=0)
+    disk_min = models.FloatField(default=0)
+    disk_avg = models.FloatField(default=0)
+    disk_max = models.FloatField(default=0)
+    disk_p95 = models.FloatField(default=0)
+    load1_avg = models.FloatField(null=True, blank=True)
+    net_rx_bps_avg = models.BigIntegerField(null=True, blank=True)
+    net_tx_bps_avg = models.BigIntegerField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = '主机指标聚合'
+        verbose_name_plural = '主机指标聚合'
+        constraints = [
+            models.UniqueConstraint(fields=['host', 'resolution', 'bucket'], name='uniq_host_metric_rollup'),
+        ]
+        indexes = [
+            models.Index(fields=['resolution', 'bucket'], name='ops_rollup_res_bucket_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.host_id} [{self.resolution}] {self.bucket}'
+
+
+class DashboardCounter(models.Model):
+    """仪表盘统计计数器（由信号增量维护，定期与业务表对账）"""
+    key = models.CharField('键', max_length=64, unique=True)
+    value = models.FloatField('值', default=0)
+    updated_at = models.DateTimeField('更新时间', auto_now=True)
+
+    class Meta:
+        verbose_name = '仪表盘计数器'
+        verbose_name_plural = '仪表盘计数器'
+
+    def __str__(self):
+        return f'{self.key}={self.value}'
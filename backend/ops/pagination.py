@@ -0,0 +1,261 @@
+"""
+列表分页
+KeysetPagination 在原有页码分页（?page=N）之外提供基于 (时间, id) 的游标分页:
+
+    GET /api/logs/?pagination=cursor              # 第一页
+    GET /api/logs/?cursor=<next 中返回的游标>       # 后续页，深翻页耗时不随页数增长
+
+游标分页按 WHERE (ts, id) < (游标) 定位，走 (时间, id) 复合索引，不执行 OFFSET 扫描，
+返回 {"next", "previous", "count", "count_mode", "results"}。
+
+总数通过 ?count= 控制:
+    exact   精确 COUNT(*)（页码分页默认）
+    cached  精确 COUNT(*) 按查询条件缓存 PAGINATION_COUNT_CACHE_TTL 秒
+    approx  无过滤条件时读取数据库统计信息 / 主键范围估算，有过滤条件时等同 cached
+    none    不返回总数（游标分页默认）
+"""
+import base64
+import hashlib
+import json
+
+from django.conf import settings
+from django.core import exceptions
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from django.utils.functional import cached_property
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+COUNT_MODES = ('exact', 'cached', 'approx', 'none')
+
+
+def exact_count(queryset):
+    return queryset.count()
+
+
+def cached_count(queryset):
+    """按 SQL 与参数缓存 COUNT(*) 结果"""
+    sql, params = queryset.query.sql_with_params()
+    digest = hashlib.sha1(f'{queryset.db}|{sql}|{params!r}'.encode()).hexdigest()
+    key = f'ops:count:{queryset.model._meta.label_lower}:{digest}'
+    count = cache.get(key)
+    if count is None:
+        count = queryset.count()
+        cache.set(key, count, getattr(settings, 'PAGINATION_COUNT_CACHE_TTL', 60))
+    return count
+
+
+def approx_count(queryset):
+    """
+    估算总数：无过滤条件时使用数据库的表统计信息（PostgreSQL reltuples / MySQL table_rows），
+    SQLite 使用主键范围（索引两端各一次查找）；有过滤条件时退回 cached_count
+    """
+    if queryset.query.where:
+        return cached_count(queryset)
+    model = queryset.model
+    connection = connections[queryset.db]
+    table = model._meta.db_table
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute('SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass', [table])
+        elif connection.vendor == 'mysql':
+            cursor.execute(
+                'SELECT table_rows FROM information_schema.tables '
+                'WHERE table_schema = DATABASE() AND table_name = %s', [table],
+            )
+        else:
+            pk = connection.ops.quote_name(model._meta.pk.column)
+            cursor.execute(
+                f'SELECT MAX({pk}) - MIN({pk}) + 1 FROM {connection.ops.quote_name(table)}'
+            )
+        row = cursor.fetchone()
+    estimate = row[0] if row else None
+    if estimate is None or estimate < 0:
+        # 新建表尚无统计信息
+        return cached_count(queryset)
+    return int(estimate)
+
+
+COUNTERS = {'exact': exact_count, 'cached': cached_count, 'approx': approx_count}
+
+
+class _CountedPaginator(Paginator):
+    """总数由外部函数提供的 Paginator（页码分页使用 cached / approx 计数）"""
+
+    def __init__(self, *args, count_func=exact_count, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._count_func = count_func
+
+    @cached_property
+    def count(self):
+        return self._count_func(self.object_list)
+
+
+class KeysetPagination(PageNumberPagination):
+    """
+    页码 / 游标混合分页
+    视图通过 cursor_ordering 声明排序键，例如 ('-timestamp', '-id')；最后一个字段必须唯一
+    """
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+    cursor_query_param = 'cursor'
+    mode_query_param = 'pagination'
+    count_query_param = 'count'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.count_mode = request.query_params.get(self.count_query_param) or None
+        if self.count_mode is not None and self.count_mode not in COUNT_MODES:
+            raise ValidationError({'count': f'count 参数无效，可选: {", ".join(COUNT_MODES)}'})
+        self.cursor_mode = (
+            self.cursor_query_param in request.query_params
+            or request.query_params.get(self.mode_query_param) == 'cursor'
+        )
+        # 视图可通过 count_queryset 指定计数用的查询（values() 查询中的关联列会把 JOIN 带进 COUNT）
+        self.count_queryset = getattr(view, 'count_queryset', None)
+        if self.count_queryset is None:
+            self.count_queryset = queryset
+        if not self.cursor_mode:
+            mode = self.count_mode or 'exact'
+            if mode == 'none':
+                mode = 'cached'
+            self.count_mode = mode
+            count_queryset = self.count_queryset
+            self.django_paginator_class = lambda *args, **kwargs: _CountedPaginator(
+                *args, count_func=lambda _: COUNTERS[mode](count_queryset), **kwargs)
+            return super().paginate_queryset(queryset, request, view)
+        return self._paginate_keyset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if not self.cursor_mode:
+            return Response({
+                'count': self.page.paginator.count,
+                'count_mode': self.count_mode,
+                'next': self.get_next_link(),
+                'previous': self.get_previous_link(),
+                'results': data,
+            })
+        return Response({
+            'count': self.count,
+            'count_mode': self.count_mode,
+            'next': self._cursor_link(self.next_position, reverse=False),
+            'previous': self._cursor_link(self.previous_position, reverse=True),
+            'results': data,
+        })
+
+    # ------------------------------------------------------------------
+    # 游标分页
+    # ------------------------------------------------------------------
+
+    def _ordering(self, view):
+        ordering = tuple(getattr(view, 'cursor_ordering', None) or ('-id',))
+        if ordering[-1].lstrip('-') not in ('id', 'pk'):
+            ordering += ('-id',) if ordering[0].startswith('-') else ('id',)
+        return ordering
+
+    def _decode_cursor(self, raw):
+        try:
+            data = json.loads(base64.urlsafe_b64decode(raw.encode() + b'=' * (-len(raw) % 4)))
+            return list(data['p']), bool(data.get('r'))
+        except (TypeError, ValueError, KeyError):
+            raise NotFound('游标无效')
+
+    def _encode_cursor(self, position, reverse):
+        data = {'p': position}
+        if reverse:
+            data['r'] = 1
+        return base64.urlsafe_b64encode(json.dumps(data, separators=(',', ':')).encode()).decode().rstrip('=')
+
+    def _position(self, obj):
+        # 列表接口的快速序列化路径分页的是 values() 字典
+        values = []
+        for field in self.fields:
+            value = obj[field] if isinstance(obj, dict) else getattr(obj, field)
+            values.append(value.isoformat() if hasattr(value, 'isoformat') else value)
+        return values
+
+    def _parse_position(self, queryset, position):
+        if len(position) != len(self.fields):
+            raise NotFound('游标无效')
+        values = []
+        for name, value in zip(self.fields, position):
+            field = queryset.model._meta.get_field(name)
+            # 游标可被手工修改，按字段类型校验（如 id 必须是整数），避免错误类型的值进入查询
+            if isinstance(value, (dict, list)) or value is None:
+                raise NotFound('游标无效')
+            try:
+                if field.get_internal_type() == 'DateTimeField':
+                    value = parse_datetime(value) if isinstance(value, str) else None
+                    if value is None:
+                        raise NotFound('游标无效')
+                else:
+                    value = field.to_python(value)
+                    if isinstance(value, int):
+                        low, high = connections[queryset.db].ops.integer_field_range(field.get_internal_type())
+                        if (low is not None and value < low) or (high is not None and value > high):
+                            raise NotFound('游标无效')
+            except (ValueError, exceptions.ValidationError):
+                raise NotFound('游标无效')
+            values.append(value)
+        return values
+
+    def _after(self, position, descending):
+        """构造 (f1, f2, ...) 在排序方向上严格位于 position 之后的条件"""
+        condition = Q()
+        for i in range(len(self.fields) - 1, -1, -1):
+            lookup = 'lt' if descending[i] else 'gt'
+            step = Q(**{f'{self.fields[i]}__{lookup}': position[i]})
+            if i < len(self.fields) - 1:
+                step |= Q(**{self.fields[i]: position[i]}) & condition
+            condition = step
+        return condition
+
+    def _paginate_keyset(self, queryset, request, view):
+        page_size = self.get_page_size(request)
+        if not page_size:
+            return None
+        ordering = self._ordering(view)
+        self.fields = [f.lstrip('-') for f in ordering]
+        descending = [f.startswith('-') for f in ordering]
+
+        raw = request.query_params.get(self.cursor_query_param)
+        reverse = False
+        position = None
+        if raw:
+            position, reverse = self._decode_cursor(raw)
+            position = self._parse_position(queryset, position)
+
+        mode = self.count_mode or 'none'
+        self.count_mode = mode
+        self.count = COUNTERS[mode](self.count_queryset) if mode != 'none' else None
+
+        # 向前翻页时反转排序方向查询，再把结果倒回来
+        direction = [not d for d in descending] if reverse else descending
+        page_qs = queryset.order_by(*[('-' if d else '') + f for f, d in zip(self.fields, direction)])
+        if position is not None:
+            page_qs = page_qs.filter(self._after(position, direction))
+        rows = list(page_qs[:page_size + 1])
+        has_more = len(rows) > page_size
+        rows = rows[:page_size]
+        if reverse:
+            rows.reverse()
+
+        if reverse:
+            self.previous_position = self._position(rows[0]) if rows and has_more else None
+            self.next_position = self._position(rows[-1]) if rows else None
+        else:
+            self.previous_position = self._position(rows[0]) if rows and position is not None else None
+            self.next_position = self._position(rows[-1]) if rows and has_more else None
+        return rows
+
+    def _cursor_link(self, position, reverse):
+        if position is None:
+            return None
+        url = self.request.build_absolute_uri()
+        url = remove_query_param(url, self.mode_query_param)
+        return replace_query_param(url, self.cursor_query_param, self._encode_cursor(position, reverse))
@@ -0,0 +1,121 @@
+"""
+批量上报使用的请求体解析器
+- NDJSONParser: 每行一个 JSON 对象（application/x-ndjson），单行格式错误不影响其它行
+- 两个解析器都支持 Content-Encoding: gzip，解压后大小受 INGEST_MAX_BODY_BYTES 限制
+- ORJSONParser: 默认 JSON 解析器，安装了 orjson 时用其解析请求体（见 ops/renderers.py）
+"""
+import json
+import zlib
+
+try:
+    import orjson
+except ImportError:  # orjson 为可选依赖
+    orjson = None
+
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser, JSONParser
+
+READ_CHUNK = 64 * 1024
+
+
+def _max_body_bytes():
+    return getattr(settings, 'INGEST_MAX_BODY_BYTES', 64 * 1024 * 1024)
+
+
+def read_body(stream, parser_context):
+    """读取（必要时解压）请求体，超出大小上限时抛出 ParseError"""
+    if stream is None:
+        return b''
+    request = (parser_context or {}).get('request')
+    encoding = ''
+    if request is not None:
+        encoding = request.META.get('HTTP_CONTENT_ENCODING', '').strip().lower()
+    limit = _max_body_bytes()
+
+    if encoding in ('', 'identity'):
+        data = stream.read(limit + 1)
+        if len(data) > limit:
+            raise ParseError('请求体过大')
+        return data
+    if encoding not in ('gzip', 'x-gzip', 'deflate'):
+        raise ParseError(f'不支持的 Content-Encoding: {encoding}')
+
+    # wbits: gzip 用 16+MAX_WBITS，deflate 自动识别 zlib 头
+    decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS if 'gzip' in encoding else zlib.MAX_WBITS | 32)
+    chunks = []
+    size = 0
+    try:
+        while True:
+            raw = stream.read(READ_CHUNK)
+            if not raw:
+                break
+            out = decompressor.decompress(raw, limit + 1 - size)
+            size += len(out)
+            if size > limit or decompressor.unconsumed_tail:
+                raise ParseError('解压后请求体过大')
+            chunks.append(out)
+        chunks.append(decompressor.flush())
+    except zlib.error as e:
+        raise ParseError(f'请求体解压失败: {e}')
+    return b''.join(chunks)
+
+
+class NDJSONDocument(list):
+    """NDJSON 解析结果：成功解析的对象列表，errors 记录 (行号, 原因)"""
+
+    def __init__(self, items=(), errors=None):
+        super().__init__(items)
+        self.errors = errors or []
+
+
+def loads(data):
+    return orjson.loads(data) if orjson is not None else json.loads(data)
+
+
+def parse_ndjson(data):
+    items = []
+    errors = []
+    for line_no, line in enumerate(data.splitlines(), 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            items.append(loads(line))
+        except ValueError as e:
+            errors.append((line_no, f'JSON 格式错误: {e}'))
+    return NDJSONDocument(items, errors)
+
+
+class NDJSONParser(BaseParser):
+    media_type = 'application/x-ndjson'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        return parse_ndjson(read_body(stream, parser_context))
+
+
+class GzipJSONParser(JSONParser):
+    """支持 gzip 压缩请求体的 JSONParser"""
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        data = read_body(stream, parser_context)
+        try:
+            return loads(data)
+        except ValueError as e:
+            raise ParseError(f'JSON parse error - {e}')
+
+
+class ORJSONParser(JSONParser):
+    """与 JSONParser 行为一致（拒绝 NaN / Infinity），未安装 orjson 时直接使用 JSONParser"""
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        if orjson is None or stream is None:
+            return super().parse(stream, media_type, parser_context)
+        encoding = (parser_context or {}).get('encoding', 'utf-8')
+        data = stream.read()
+        try:
+            if encoding.lower().replace('-', '') != 'utf8':
+                data = data.decode(encoding)
+            return orjson.loads(data)
+        except (ValueError, UnicodeDecodeError) as e:
+            raise ParseError(f'JSON parse error - {e}')
@@ -0,0 +1,42 @@
+"""
+JSON 渲染
+ORJSONRenderer 使用 orjson 序列化响应，输出与 DRF JSONRenderer（COMPACT_JSON / UNICODE_JSON 默认配置）一致:
+    - 紧凑格式、非 ASCII 字符不转义，U+2028 / U+2029 转义
+    - datetime / Decimal / UUID / 惰性翻译字符串等交给 DRF 的 JSONEncoder 处理，格式保持不变
+    - 与 STRICT_JSON 不同，NaN / Infinity 输出为 null 而不是抛出异常
+请求了缩进（Accept: application/json; indent=4 或可浏览 API）、或未安装 orjson 时退回 JSONRenderer。
+
+配置（settings.REST_FRAMEWORK）:
+    'DEFAULT_RENDERER_CLASSES': ['ops.renderers.ORJSONRenderer', ...]
+    'DEFAULT_PARSER_CLASSES': ['ops.parsers.ORJSONParser', ...]
+"""
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # orjson 为可选依赖
+    orjson = None
+
+_LINE_SEPARATORS = ((b'\xe2\x80\xa8', b'\\u2028'), (b'\xe2\x80\xa9', b'\\u2029'))
+
+
+class ORJSONRenderer(JSONRenderer):
+    options = 0 if orjson is None else orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if (orjson is None or self.encoder_class is not JSONEncoder or not self.compact or self.ensure_ascii
+                or self.get_indent(accepted_media_type, renderer_context or {})):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        try:
+            ret = orjson.dumps(data, default=JSONEncoder().default, option=self.options)
+        except orjson.JSONEncodeError:
+            # 超出 64 位的整数等 orjson 不支持的值
+            return super().render(data, accepted_media_type, renderer_context)
+        for raw, escaped in _LINE_SEPARATORS:
+            if raw in ret:
+                ret = ret.replace(raw, escaped)
+        return ret
@@ -0,0 +1,275 @@
+"""
+日志保留与归档
+- 按 LogRetentionPolicy（service / level 维度）计算每条日志的过期时间，未命中策略的日志使用
+  LOG_RETENTION_DAYS / LOG_RETENTION_ARCHIVE 全局默认值
+- 清理按 (timestamp, id) 索引分块进行：每块最多 LOG_PRUNE_CHUNK 行，独立的短事务删除，
+  块之间让出 LOG_PRUNE_PAUSE 秒，避免长时间持有 SQLite 写锁
+- 需要归档的日志在删除前写入 gzip 压缩的 NDJSON 段文件，按小时分区:
+      LOG_ARCHIVE_DIR/YYYY/MM/DD/HH/<起始 id>-<结束 id>.ndjson.gz
+  段文件先写临时文件再原子改名，写入成功后才删除数据库中的行
+- read_archive() 只读取查询时间范围覆盖的小时分区，无需重新导入
+
+运行方式:
+    python manage.py prune_logs [--dry-run]
+    采集调度器运行时每 LOG_RETENTION_INTERVAL 秒自动执行
+"""
+import gzip
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timedelta, timezone as dt_timezone
+from pathlib import Path
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import LogEntry, LogRetentionPolicy
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_FIELDS = ('id', 'timestamp', 'level', 'service', 'host_id', 'host__hostname', 'message')
+_prune_lock = threading.Lock()
+
+
+def archive_dir():
+    return Path(getattr(settings, 'LOG_ARCHIVE_DIR', Path(settings.BASE_DIR) / 'archive' / 'logs'))
+
+
+# ----------------------------------------------------------------------
+# 策略
+# ----------------------------------------------------------------------
+
+class _Rule:
+    __slots__ = ('service', 'level', 'days', 'archive', 'label')
+
+    def __init__(self, service, level, days, archive, label):
+        self.service = service
+        self.level = level
+        self.days = days
+        self.archive = archive
+        self.label = label
+
+    @property
+    def priority(self):
+        return (2 if self.service else 0) + (1 if self.level else 0)
+
+    def selector(self):
+        condition = Q()
+        if self.service:
+            condition &= Q(service=self.service)
+        if self.level:
+            condition &= Q(level=self.level)
+        return condition
+
+    def overlaps(self, other):
+        """other 命中的日志中是否可能有一部分同时被本规则命中"""
+        return all(not a or not b or a == b for a, b in (
+            (self.service, other.service), (self.level, other.level),
+        ))
+
+
+def load_rules():
+    """启用的策略 + 全局默认，按优先级从高到低排列"""
+    rules = [
+        _Rule(p.service, p.level, p.retention_days, p.archive, str(p))
+        for p in LogRetentionPolicy.objects.filter(enabled=True)
+    ]
+    if not any(r.priority == 0 for r in rules):
+        rules.append(_Rule(
+            '', '', getattr(settings, 'LOG_RETENTION_DAYS', 30),
+            getattr(settings, 'LOG_RETENTION_ARCHIVE', True), 'default',
+        ))
+    rules.sort(key=lambda r: r.priority, reverse=True)
+    return rules
+
+
+def _expired_queryset(rule, rules, now):
+    """规则负责且已过期的日志：排除被更高优先级规则接管的部分"""
+    queryset = LogEntry.objects.filter(rule.selector(), timestamp__lt=now - timedelta(days=rule.days))
+    for other in rules:
+        if other.priority > rule.priority and rule.overlaps(other):
+            queryset = queryset.exclude(other.selector())
+    return queryset
+
+
+# ----------------------------------------------------------------------
+# 归档写入
+# ----------------------------------------------------------------------
+
+def _partition(ts):
+    ts = ts.astimezone(dt_timezone.utc)
+    return archive_dir() / f'{ts:%Y}' / f'{ts:%m}' / f'{ts:%d}' / f'{ts:%H}'
+
+
+def _record(row):
+    data = dict(zip(ARCHIVE_FIELDS, row))
+    data['hostname'] = data.pop('host__hostname')
+    data['timestamp'] = data['timestamp'].astimezone(dt_timezone.utc).isoformat()
+    return data
+
+
+def write_segments(rows):
+    """把一块日志按小时分组写成段文件，返回写入的文件列表"""
+    groups = {}
+    for row in rows:
+        groups.setdefault(_partition(row[1]), []).append(row)
+    written = []
+    for directory, group in groups.items():
+        directory.mkdir(parents=True, exist_ok=True)
+        ids = [row[0] for row in group]
+        path = directory / f'{min(ids)}-{max(ids)}.ndjson.gz'
+        tmp = path.with_name(f'.{path.name}.{os.getpid()}.tmp')
+        with open(tmp, 'wb') as raw:
+            with gzip.GzipFile(fileobj=raw, mode='wb', compresslevel=6, mtime=0) as f:
+                for row in group:
+                    f.write(json.dumps(_record(row), ensure_ascii=False, separators=(',', ':')).encode())
+                    f.write(b'\n')
+            raw.flush()
+            os.fsync(raw.fileno())
+        os.replace(tmp, path)
+        written.append(path)
+    return written
+
+
+# ----------------------------------------------------------------------
+# 清理
+# ----------------------------------------------------------------------
+
+def prune_logs(now=None, dry_run=False, chunk_size=None, pause=None, max_seconds=None):
+    """
+    按保留策略清理过期日志
+    返回 {'deleted', 'archived', 'segments', 'rules': {规则: 删除条数}, 'elapsed_ms'}
+    """
+    if not _prune_lock.acquire(blocking=False):
+        logger.info('log pruning already running, skipped')
+        return {'skipped': True}
+    try:
+        return _prune(now or timezone.now(), dry_run,
+                      chunk_size or getattr(settings, 'LOG_PRUNE_CHUNK', 2000),
+                      getattr(settings, 'LOG_PRUNE_PAUSE', 0.05) if pause is None else pause,
+                      getattr(settings, 'LOG_PRUNE_MAX_SECONDS', 600) if max_seconds is None else max_seconds)
+    finally:
+        _prune_lock.release()
+
+
+def _prune(now, dry_run, chunk_size, pause, max_seconds):
+    started = time.monotonic()
+    result = {'deleted': 0, 'archived': 0, 'segments': 0, 'rules': {}, 'elapsed_ms': 0}
+    rules = load_rules()
+    for rule in rules:
+        queryset = _expired_queryset(rule, rules, now)
+        if dry_run:
+            result['rules'][rule.label] = queryset.count()
+            continue
+        deleted = 0
+        while time.monotonic() - started < max_seconds:
+            # 走 (timestamp, id) 索引取最早的一块
+            if rule.archive:
+                rows = list(queryset.order_by('timestamp', 'id').values_list(*ARCHIVE_FIELDS)[:chunk_size])
+                ids = [row[0] for row in rows]
+            else:
+                rows = None
+                ids = list(queryset.order_by('timestamp', 'id').values_list('id', flat=True)[:chunk_size])
+            if not ids:
+                break
+            if rows:
+                result['segments'] += len(write_segments(rows))
+                result['archived'] += len(rows)
+            with transaction.atomic():
+                deleted += LogEntry.objects.filter(id__in=ids).delete()[0]
+            if pause:
+                time.sleep(pause)
+        result['rules'][rule.label] = deleted
+        result['deleted'] += deleted
+    result['elapsed_ms'] = int((time.monotonic() - started) * 1000)
+    if result['deleted']:
+        logger.info('pruned %s log entries (%s archived)', result['deleted'], result['archived'])
+    return result
+
+
+# ----------------------------------------------------------------------
+# 归档读取
+# ----------------------------------------------------------------------
+
+def _hours_desc(start, end):
+    hour = end.astimezone(dt_timezone.utc).replace(minute=0, second=0, microsecond=0)
+    floor = start.astimezone(dt_timezone.utc).replace(minute=0, second=0, microsecond=0)
+    while hour >= floor:
+        yield hour
+        hour -= timedelta(hours=1)
+
+
+def _read_segment(path):
+    with gzip.open(path, 'rb') as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def read_archive(start, end, service=None, level=None, search=None, hostname=None, limit=500):
+    """
+    查询归档日志，按时间倒序返回 [start, end) 内最多 limit 条
+    返回 {'results', 'segments_scanned', 'truncated'}
+    """
+    terms = [t.lower() for t in (search or '').split()]
+    results = []
+    scanned = 0
+    seen = set()
+    truncated = False
+    for hour in _hours_desc(start, end):
+        directory = _partition(hour)
+        if not directory.is_dir():
+            continue
+        hour_rows = []
+        for path in directory.glob('*.ndjson.gz'):
+            scanned += 1
+            for record in _read_segment(path):
+                if record['id'] in seen:
+                    # 删除失败后重试会重复归档同一批日志
+                    continue
+                if service and record['service'] != service:
+                    continue
+                if level and record['level'] != level:
+                    continue
+                if hostname and record.get('hostname') != hostname:
+                    continue
+                if terms:
+                    text = f"{record['service']} {record['message']}".lower()
+                    if not all(t in text for t in terms):
+                        continue
+                ts = parse_datetime(record['timestamp'])
+                if not start <= ts < end:
+                    continue
+                seen.add(record['id'])
+                hour_rows.append((ts, record))
+        hour_rows.sort(key=lambda item: (item[0], item[1]['id']), reverse=True)
+        results.extend(record for _, record in hour_rows)
+        if len(results) >= limit:
+            truncated = len(results) > limit
+            results = results[:limit]
+            break
+    return {'results': results, 'segments_scanned': scanned, 'truncated': truncated}
+
+
+def archive_stats():
+    """归档目录概况"""
+    root = archive_dir()
+    files = list(root.glob('*/*/*/*/*.ndjson.gz')) if root.is_dir() else []
+    hours = sorted({f.parent for f in files})
+
+    def hour_of(path):
+        y, m, d, h = path.relative_to(root).parts
+        return datetime(int(y), int(m), int(d), int(h), tzinfo=dt_timezone.utc).isoformat()
+
+    return {
+        'path': str(root),
+        'segments': len(files),
+        'bytes': sum(f.stat().st_size for f in files),
+        'oldest_hour': hour_of(hours[0]) if hours else None,
+        'newest_hour': hour_of(hours[-1]) if hours else None,
+    }
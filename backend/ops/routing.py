@@ -1,6 +1,8 @@
 from django.urls import re_path
-from . import ssh_consumer
+from . import live_consumer, loki_tail_consumer, ssh_consumer
 
 websocket_urlpatterns = [
     re_path(r'ws/ssh/(?P<host_id>\d+)/$', ssh_consumer.SSHConsumer.as_asgi()),
+    re_path(r'ws/live/$', live_consumer.LiveUpdatesConsumer.as_asgi()),
+    re_path(r'ws/loki/tail/$', loki_tail_consumer.LokiTailConsumer.as_asgi()),
 ]
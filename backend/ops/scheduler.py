@@ -0,0 +1,339 @@
+"""
+主机指标周期采集调度器
+- 每台主机按 COLLECTOR_INTERVAL 周期采集，首次调度与每次重排都加入随机抖动，避免整点扎堆
+- 采集失败（或已标记为 offline）的主机按指数退避延长间隔，恢复后立即回到正常周期
+- 全局并发与按子网（/24 或 IPv6 /64）的并发分别受 COLLECTOR_CONCURRENCY / COLLECTOR_SUBNET_CONCURRENCY 限制
+- 采集结果按 COLLECTOR_FLUSH_INTERVAL 汇总后批量回写 Host 与时序采样
+- stats() 暴露队列深度、调度延迟等运行指标
+- 附带执行周期任务（仪表盘计数器对账、日志保留清理、告警规则评估等），在独立线程中运行，不阻塞派发与回写；
+  上一次执行尚未结束的任务本轮跳过
+
+运行方式:
+    python manage.py run_collector                 # 独立进程
+    COLLECTOR_AUTOSTART = True                     # 随 ASGI 进程启动（见 agdevops/asgi.py）
+"""
+import heapq
+import ipaddress
+import logging
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections
+
+from . import collector, dashboard, retention, rules, timeseries
+from .models import Host
+
+logger = logging.getLogger(__name__)
+
+
+def subnet_of(ip):
+    try:
+        addr = ipaddress.ip_address(ip)
+    except ValueError:
+        return ip
+    prefix = 24 if addr.version == 4 else 64
+    return str(ipaddress.ip_network(f'{ip}/{prefix}', strict=False))
+
+
+class _HostState:
+    __slots__ = ('host', 'subnet', 'failures', 'next_due', 'running', 'removed')
+
+    def __init__(self, host, failures=0):
+        self.host = host
+        self.subnet = subnet_of(host.ip_address)
+        self.failures = failures
+        self.next_due = 0.0
+        self.running = False
+        self.removed = False
+
+
+class CollectionScheduler:
+    def __init__(self, interval=60, jitter=0.1, max_backoff=1800, concurrency=32, subnet_concurrency=8,
+                 timeout=collector.DEFAULT_TIMEOUT, reload_interval=60, flush_interval=2, tasks=None):
+        self.interval = interval
+        self.jitter = jitter
+        self.max_backoff = max_backoff
+        self.concurrency = concurrency
+        self.subnet_concurrency = subnet_concurrency
+        self.timeout = timeout
+        self.reload_interval = reload_interval
+        self.flush_interval = flush_interval
+        # 附加的周期任务: [(名称, 间隔秒数, 可调用对象)]，在任务线程池中执行
+        self.tasks = list(tasks or [])
+
+        self._states = {}        # host_id -> _HostState
+        self._heap = []          # (next_due, seq, host_id)
+        self._seq = 0
+        self._subnet_running = {}
+        self._running = 0
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._executor = None
+        self._task_executor = None
+        self._task_futures = {}  # 名称 -> 最近一次执行的 Future
+        self._results = []       # 待回写: (host_id, metrics | None, status)
+        self._last_flush = 0.0
+        self._last_reload = 0.0
+        self._task_due = {}
+        self._lags = deque(maxlen=500)
+        self._counters = {'completed': 0, 'failed': 0, 'deferred': 0, 'flushes': 0, 'tasks_skipped': 0}
+        self._started_at = None
+
+    # ------------------------------------------------------------------
+    # 调度
+    # ------------------------------------------------------------------
+
+    def _jittered(self, base):
+        return base * (1 + random.uniform(-self.jitter, self.jitter))
+
+    def _delay_for(self, state):
+        if state.failures <= 0:
+            return self._jittered(self.interval)
+        return self._jittered(min(self.interval * (2 ** state.failures), self.max_backoff))
+
+    def _push(self, state, due):
+        state.next_due = due
+        self._seq += 1
+        heapq.heappush(self._heap, (due, self._seq, state.host.pk))
+
+    def reload_hosts(self):
+        """同步主机列表：新增主机随机分散到一个周期内，删除的主机出队，SSH 配置变化时刷新"""
+        hosts = {h.pk: h for h in Host.objects.only(
+            'id', 'hostname', 'ip_address', 'status', 'ssh_port', 'ssh_user', 'ssh_password',
+        )}
+        now = time.monotonic()
+        with self._lock:
+            for host_id in list(self._states):
+                if host_id not in hosts:
+                    self._states.pop(host_id).removed = True
+            for host_id, host in hosts.items():
+                state = self._states.get(host_id)
+                if state is None:
+                    state = _HostState(host, failures=1 if host.status == 'offline' else 0)
+                    self._states[host_id] = state
+                    # 首轮在一个周期内均匀打散
+                    self._push(state, now + random.uniform(0, self._delay_for(state)))
+                else:
+                    state.host = host
+                    state.subnet = subnet_of(host.ip_address)
+        self._last_reload = now
+        self._wakeup.set()
+
+    def _dispatch_due(self):
+        """派发所有到期且未超出并发限制的主机，返回距离下一次到期的秒数"""
+        now = time.monotonic()
+        deferred = []
+        with self._lock:
+            while self._heap and self._running < self.concurrency:
+                due, seq, host_id = self._heap[0]
+                if due > now:
+                    break
+                heapq.heappop(self._heap)
+                state = self._states.get(host_id)
+                if state is None or state.removed or state.running or state.next_due != due:
+                    continue
+                if self._subnet_running.get(state.subnet, 0) >= self.subnet_concurrency:
+                    deferred.append((due, seq, host_id))
+                    self._counters['deferred'] += 1
+                    continue
+                state.running = True
+                self._running += 1
+                self._subnet_running[state.subnet] = self._subnet_running.get(state.subnet, 0) + 1
+                self._lags.append(now - due)
+                # reload_hosts 可能在采集期间修改 state.subnet，按派发时的网段归还计数
+                self._executor.submit(self._collect, state, state.subnet)
+            for item in deferred:
+                heapq.heappush(self._heap, item)
+            if self._running >= self.concurrency or deferred:
+                return 0.2
+            if not self._heap:
+                return 1.0
+            return max(0.0, min(self._heap[0][0] - now, 1.0))
+
+    def _collect(self, state, subnet):
+        try:
+            metrics = collector.collect_metrics(state.host, timeout=self.timeout)
+            error = None
+        except Exception as e:
+            metrics, error = None, e
+        finally:
+            close_old_connections()
+
+        with self._lock:
+            self._running -= 1
+            self._subnet_running[subnet] -= 1
+            if not self._subnet_running[subnet]:
+                del self._subnet_running[subnet]
+            state.running = False
+            if error is None:
+                state.failures = 0
+                self._counters['completed'] += 1
+                self._results.append((state.host.pk, metrics, 'online'))
+            else:
+                state.failures += 1
+                self._counters['failed'] += 1
+                self._results.append((state.host.pk, None, 'offline'))
+                logger.debug('collect %s failed: %s', state.host.hostname, error)
+            if not state.removed:
+                self._push(state, time.monotonic() + self._delay_for(state))
+        self._wakeup.set()
+
+    def flush(self):
+        """批量回写累积的采集结果"""
+        with self._lock:
+            results, self._results = self._results, []
+        self._last_flush = time.monotonic()
+        if not results:
+            return 0
+        rows = []
+        samples = []
+        for host_id, metrics, host_status in results:
+            if metrics is None:
+                rows.append((host_id, None, None, None, host_status))
+            else:
+                rows.append((host_id, metrics.get('cpu_usage'), metrics.get('memory_usage'),
+                             metrics.get('disk_usage'), host_status))
+                samples.append((host_id, metrics))
+        collector.save_host_metrics(rows)
+        timeseries.record_samples(samples)
+        self._counters['flushes'] += 1
+        return len(results)
+
+    @staticmethod
+    def _run_task(name, func):
+        try:
+            func()
+        except Exception:
+            logger.exception('scheduler task %s failed', name)
+        finally:
+            close_old_connections()
+
+    def _run_tasks(self):
+        """提交到期的周期任务；上一次仍在执行的任务跳过本轮，避免堆积"""
+        now = time.monotonic()
+        for name, interval, func in self.tasks:
+            if now < self._task_due.get(name, 0):
+                continue
+            self._task_due[name] = now + interval
+            future = self._task_futures.get(name)
+            if future is not None and not future.done():
+                self._counters['tasks_skipped'] += 1
+                logger.info('scheduler task %s still running, skipped', name)
+                continue
+            self._task_futures[name] = self._task_executor.submit(self._run_task, name, func)
+
+    # ------------------------------------------------------------------
+    # 生命周期
+    # ------------------------------------------------------------------
+
+    def run_forever(self):
+        self._started_at = time.time()
+        self._executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix='collector')
+        self._task_executor = ThreadPoolExecutor(max_workers=max(len(self.tasks), 1),
+                                                 thread_name_prefix='collector-task')
+        try:
+            self.reload_hosts()
+            while not self._stop.is_set():
+                wait = self._dispatch_due()
+                now = time.monotonic()
+                try:
+                    if now - self._last_flush >= self.flush_interval:
+                        self.flush()
+                    if now - self._last_reload >= self.reload_interval:
+                        self.reload_hosts()
+                    self._run_tasks()
+                except Exception:
+                    logger.exception('collector maintenance failed')
+                finally:
+                    close_old_connections()
+                self._wakeup.wait(wait)
+                self._wakeup.clear()
+        finally:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            # 周期任务可能运行较久（如日志清理），不等待其结束
+            self._task_executor.shutdown(wait=False, cancel_futures=True)
+            self.flush()
+            close_old_connections()
+
+    def start(self):
+        """在后台线程中启动（ASGI 进程内模式）"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self.run_forever, daemon=True, name='collector-scheduler')
+        self._thread.start()
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        self._wakeup.set()
+        if self._thread:
+            self._thread.join(timeout)
+
+    def stats(self):
+        now = time.monotonic()
+        with self._lock:
+            overdue = [now - due for due, _, host_id in self._heap
+                       if due <= now and host_id in self._states and self._states[host_id].next_due == due]
+            backoff = sum(1 for s in self._states.values() if s.failures > 0)
+            lags = sorted(self._lags)
+            data = {
+                'running': self._started_at is not None and not self._stop.is_set(),
+                'started_at': self._started_at,
+                'hosts': len(self._states),
+                'queue_depth': len(overdue),
+                'in_flight': self._running,
+                'backoff_hosts': backoff,
+                'max_lag_seconds': round(max(overdue), 3) if overdue else 0.0,
+                'dispatch_lag_p50': round(lags[len(lags) // 2], 3) if lags else 0.0,
+                'dispatch_lag_p95': round(lags[int(len(lags) * 0.95)], 3) if lags else 0.0,
+                'pending_results': len(self._results),
+                'interval': self.interval,
+                'concurrency': self.concurrency,
+                'subnet_concurrency': self.subnet_concurrency,
+                'tasks_running': sorted(name for name, future in self._task_futures.items() if not future.done()),
+            }
+            data.update(self._counters)
+        return data
+
+
+def build_scheduler(**overrides):
+    options = {
+        'interval': getattr(settings, 'COLLECTOR_INTERVAL', 60),
+        'jitter': getattr(settings, 'COLLECTOR_JITTER', 0.1),
+        'max_backoff': getattr(settings, 'COLLECTOR_MAX_BACKOFF', 1800),
+        'concurrency': getattr(settings, 'COLLECTOR_CONCURRENCY', 32),
+        'subnet_concurrency': getattr(settings, 'COLLECTOR_SUBNET_CONCURRENCY', 8),
+        'timeout': getattr(settings, 'COLLECTOR_TIMEOUT', collector.DEFAULT_TIMEOUT),
+        'flush_interval': getattr(settings, 'COLLECTOR_FLUSH_INTERVAL', 2),
+        'tasks': [
+            ('dashboard_reconcile', getattr(settings, 'DASHBOARD_RECONCILE_INTERVAL', 300), dashboard.reconcile),
+            ('log_retention', getattr(settings, 'LOG_RETENTION_INTERVAL', 3600), retention.prune_logs),
+            ('alert_rules', getattr(settings, 'RULES_EVAL_INTERVAL', 30), rules.evaluate),
+        ],
+    }
+    options.update({k: v for k, v in overrides.items() if v is not None})
+    return CollectionScheduler(**options)
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler():
+    """当前进程内的调度器实例（未启动时为 None）"""
+    return _scheduler
+
+
+def start_in_process(**overrides):
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = build_scheduler(**overrides)
+            _scheduler.start()
+    return _scheduler
@@ -0,0 +1,281 @@
+"""
+全文检索
+为 LogEntry（service / message）与 Alert（title / source / message）建立全文索引，替代 LIKE '%词%' 全表扫描。
+
+检索后端按数据库类型选择:
+    SQLiteFTS5Backend    FTS5 外部内容表 + trigram 分词，由触发器在增删改时增量维护，bm25 排序
+    PostgresSearchBackend to_tsvector + GIN 表达式索引，ts_rank 排序
+    LikeSearchBackend     其它数据库，退回 icontains
+
+查询语法: 空白分隔的多个词须同时出现（AND），每个词按子串匹配（与原 search_fields 语义一致）；
+trigram 分词要求词长至少 3 个字符，更短的词在命中结果上再做 icontains 过滤。
+
+索引建立 / 重建:
+    python manage.py migrate                  # 迁移 0006 创建索引并导入存量数据
+    python manage.py rebuild_search_index     # 手动重建
+"""
+from django.db import connections
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+from .models import Alert, LogEntry
+
+# 模型 -> 参与全文检索的字段
+SEARCH_INDEXES = {
+    LogEntry: ('service', 'message'),
+    Alert: ('title', 'source', 'message'),
+}
+
+MIN_TOKEN_LENGTH = 3
+
+
+def parse_terms(query):
+    """拆分检索词，去重并保持顺序"""
+    seen = []
+    for term in (query or '').split():
+        if term not in seen:
+            seen.append(term)
+    return seen
+
+
+def _icontains(fields, terms):
+    condition = Q()
+    for term in terms:
+        term_q = Q()
+        for field in fields:
+            term_q |= Q(**{f'{field}__icontains': term})
+        condition &= term_q
+    return condition
+
+
+class SearchBackend:
+    vendor = None
+
+    def __init__(self, alias='default'):
+        self.alias = alias
+
+    @property
+    def connection(self):
+        return connections[self.alias]
+
+    def setup(self, model, fields):
+        """建立索引（幂等）"""
+
+    def teardown(self, model, fields):
+        """删除索引"""
+
+    def rebuild(self, model, fields):
+        """根据业务表全量重建索引"""
+
+    def ensure(self, model, fields):
+        """索引或其维护对象缺失时补建，返回是否做了修复"""
+        return False
+
+    def search(self, queryset, fields, terms, rank=True):
+        """返回过滤后的 QuerySet；rank=True 时按相关度排序，并附加 search_rank 字段（越小越相关）"""
+        raise NotImplementedError
+
+
+class LikeSearchBackend(SearchBackend):
+    def search(self, queryset, fields, terms, rank=True):
+        return queryset.filter(_icontains(fields, terms))
+
+
+class SQLiteFTS5Backend(SearchBackend):
+    vendor = 'sqlite'
+    _supported = {}
+
+    @classmethod
+    def is_supported(cls, connection):
+        """trigram 分词需要 SQLite 3.34+ 且编译了 FTS5"""
+        if connection.alias not in cls._supported:
+            import sqlite3
+
+            with connection.cursor() as cursor:
+                cursor.execute('PRAGMA compile_options')
+                options = {row[0] for row in cursor.fetchall()}
+            cls._supported[connection.alias] = (
+                sqlite3.sqlite_version_info >= (3, 34, 0) and 'ENABLE_FTS5' in options
+            )
+        return cls._supported[connection.alias]
+
+    def _names(self, model):
+        table = model._meta.db_table
+        return table, f'{table}_fts'
+
+    def setup(self, model, fields):
+        table, fts = self._names(model)
+        qn = self.connection.ops.quote_name
+        cols = ', '.join(qn(f) for f in fields)
+        new_cols = ', '.join(f'new.{qn(f)}' for f in fields)
+        old_cols = ', '.join(f'old.{qn(f)}' for f in fields)
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {qn(fts)} USING fts5("
+                f"{cols}, content={qn(table)}, content_rowid='id', tokenize='trigram')"
+            )
+            cursor.execute(
+                f'CREATE TRIGGER IF NOT EXISTS {qn(fts + "_ai")} AFTER INSERT ON {qn(table)} BEGIN '
+                f'INSERT INTO {qn(fts)}(rowid, {cols}) VALUES (new.id, {new_cols}); END'
+            )
+            cursor.execute(
+                f'CREATE TRIGGER IF NOT EXISTS {qn(fts + "_ad")} AFTER DELETE ON {qn(table)} BEGIN '
+                f"INSERT INTO {qn(fts)}({qn(fts)}, rowid, {cols}) VALUES ('delete', old.id, {old_cols}); END"
+            )
+            cursor.execute(
+                f'CREATE TRIGGER IF NOT EXISTS {qn(fts + "_au")} AFTER UPDATE OF {cols} ON {qn(table)} BEGIN '
+                f"INSERT INTO {qn(fts)}({qn(fts)}, rowid, {cols}) VALUES ('delete', old.id, {old_cols}); "
+                f'INSERT INTO {qn(fts)}(rowid, {cols}) VALUES (new.id, {new_cols}); END'
+            )
+        self.rebuild(model, fields)
+
+    def ensure(self, model, fields):
+        # SQLite 的 ALTER/AddField 迁移通过重建表实现，旧表上的触发器会随之删除
+        _, fts = self._names(model)
+        expected = {fts, fts + '_ai', fts + '_ad', fts + '_au'}
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT name FROM sqlite_master WHERE type IN ('table', 'trigger') AND name IN (%s, %s, %s, %s)",
+                sorted(expected),
+            )
+            present = {row[0] for row in cursor.fetchall()}
+        if present == expected:
+            return False
+        self.setup(model, fields)
+        return True
+
+    def teardown(self, model, fields):
+        _, fts = self._names(model)
+        qn = self.connection.ops.quote_name
+        with self.connection.cursor() as cursor:
+            for suffix in ('_ai', '_ad', '_au'):
+                cursor.execute(f'DROP TRIGGER IF EXISTS {qn(fts + suffix)}')
+            cursor.execute(f'DROP TABLE IF EXISTS {qn(fts)}')
+
+    def rebuild(self, model, fields):
+        _, fts = self._names(model)
+        qn = self.connection.ops.quote_name
+        with self.connection.cursor() as cursor:
+            cursor.execute(f"INSERT INTO {qn(fts)}({qn(fts)}) VALUES ('rebuild')")
+            cursor.execute(f"INSERT INTO {qn(fts)}({qn(fts)}) VALUES ('optimize')")
+
+    @staticmethod
+    def match_expression(terms):
+        # 每个词作为带引号的字符串，避免用户输入被解析为 FTS 运算符
+        return ' '.join('"{}"'.format(term.replace('"', '""')) for term in terms)
+
+    def search(self, queryset, fields, terms, rank=True):
+        indexed = [t for t in terms if len(t) >= MIN_TOKEN_LENGTH]
+        short = [t for t in terms if len(t) < MIN_TOKEN_LENGTH]
+        if not indexed:
+            return queryset.filter(_icontains(fields, short))
+
+        table, fts = self._names(queryset.model)
+        qn = self.connection.ops.quote_name
+        match = self.match_expression(indexed)
+        if rank:
+            # 由 FTS 索引驱动的连接查询，按 bm25 排序
+            queryset = queryset.extra(
+                tables=[fts],
+                where=[f'{qn(fts)}.rowid = {qn(table)}.{qn("id")}', f'{qn(fts)} MATCH %s'],
+                params=[match],
+                select={'search_rank': f'{qn(fts)}.rank'},
+            ).order_by('search_rank', '-id')
+        else:
+            # 仅过滤，保留调用方的排序（游标分页）
+            queryset = queryset.filter(id__in=RawSQL(
+                f'SELECT rowid FROM {qn(fts)} WHERE {qn(fts)} MATCH %s', [match],
+            ))
+        if short:
+            queryset = queryset.filter(_icontains(fields, short))
+        return queryset
+
+
+class PostgresSearchBackend(SearchBackend):
+    vendor = 'postgresql'
+    config = 'simple'
+
+    def _vector_sql(self, model, fields):
+        qn = self.connection.ops.quote_name
+        columns = " || ' ' || ".join(f"coalesce({qn(f)}, '')" for f in fields)
+        return f"to_tsvector('{self.config}', {columns})"
+
+    def setup(self, model, fields):
+        table = model._meta.db_table
+        qn = self.connection.ops.quote_name
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                f'CREATE INDEX IF NOT EXISTS {qn(table + "_fts_idx")} ON {qn(table)} '
+                f'USING GIN ({self._vector_sql(model, fields)})'
+            )
+
+    def teardown(self, model, fields):
+        qn = self.connection.ops.quote_name
+        with self.connection.cursor() as cursor:
+            cursor.execute(f'DROP INDEX IF EXISTS {qn(model._meta.db_table + "_fts_idx")}')
+
+    def rebuild(self, model, fields):
+        qn = self.connection.ops.quote_name
+        with self.connection.cursor() as cursor:
+            cursor.execute(f'REINDEX INDEX {qn(model._meta.db_table + "_fts_idx")}')
+
+    def search(self, queryset, fields, terms, rank=True):
+        vector = self._vector_sql(queryset.model, fields)
+        tsquery = f"plainto_tsquery('{self.config}', %s)"
+        text = ' '.join(terms)
+        queryset = queryset.extra(where=[f'{vector} @@ {tsquery}'], params=[text])
+        if rank:
+            queryset = queryset.extra(
+                select={'search_rank': f'-ts_rank({vector}, {tsquery})'}, select_params=[text],
+            ).order_by('search_rank', '-id')
+        return queryset
+
+
+BACKENDS = {
+    'sqlite': SQLiteFTS5Backend,
+    'postgresql': PostgresSearchBackend,
+}
+
+
+def get_backend(alias='default'):
+    connection = connections[alias]
+    backend = BACKENDS.get(connection.vendor, LikeSearchBackend)
+    if backend is SQLiteFTS5Backend and not backend.is_supported(connection):
+        backend = LikeSearchBackend
+    return backend(alias)
+
+
+def search(queryset, query, rank=True):
+    """对已注册全文索引的模型执行检索；未注册的模型返回 None"""
+    fields = SEARCH_INDEXES.get(queryset.model)
+    terms = parse_terms(query)
+    if fields is None:
+        return None
+    if not terms:
+        return queryset
+    return get_backend(queryset.db).search(queryset, fields, terms, rank=rank)
+
+
+def setup_all(alias='default', indexes=None):
+    """indexes: {模型: 字段}，迁移中传入历史模型"""
+    backend = get_backend(alias)
+    for model, fields in (indexes or SEARCH_INDEXES).items():
+        backend.setup(model, fields)
+
+
+def teardown_all(alias='default', indexes=None):
+    backend = get_backend(alias)
+    for model, fields in (indexes or SEARCH_INDEXES).items():
+        backend.teardown(model, fields)
+
+
+def rebuild_all(alias='default'):
+    backend = get_backend(alias)
+    for model, fields in SEARCH_INDEXES.items():
+        backend.rebuild(model, fields)
+
+
+def ensure_all(alias='default'):
+    """补建缺失的索引（post_migrate 时调用），返回修复的模型列表"""
+    backend = get_backend(alias)
+    return [model for model, fields in SEARCH_INDEXES.items() if backend.ensure(model, fields)]
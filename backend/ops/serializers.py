@@ -1,5 +1,5 @@
 from rest_framework import serializers
-from .models import Host, Deployment, Alert, LogEntry
+from .models import Host, Deployment, Alert, AlertRule, LogEntry, LogRetentionPolicy
 
 
 class HostSerializer(serializers.ModelSerializer):
@@ -27,6 +27,9 @@ class AlertSerializer(serializers.ModelSerializer):
     class Meta:
         model = Alert
         fields = '__all__'
+        read_only_fields = ['fingerprint', 'count', 'last_seen']
+        # 指纹唯一性由视图在保存时处理（新建合并计数 / 更新冲突返回 400）
+        validators = []
 
 
 class LogEntrySerializer(serializers.ModelSerializer):
@@ -36,3 +39,18 @@ class LogEntrySerializer(serializers.ModelSerializer):
     class Meta:
         model = LogEntry
         fields = '__all__'
+
+
+class LogRetentionPolicySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = LogRetentionPolicy
+        fields = '__all__'
+
+
+class AlertRuleSerializer(serializers.ModelSerializer):
+    metric_display = serializers.CharField(source='get_metric_display', read_only=True)
+    level_display = serializers.CharField(source='get_level_display', read_only=True)
+
+    class Meta:
+        model = AlertRule
+        fields = '__all__'
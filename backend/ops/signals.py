@@ -0,0 +1,77 @@
+"""
+模型信号：增量维护仪表盘计数器（见 ops/dashboard.py）
+更新前读取旧值，保存后把新旧贡献之差以一条 UPDATE 累加到计数器上，与业务写入处于同一事务。
+同时把变更的记录 id 交给实时推送（见 ops/live.py）；另在 post_migrate 时补建全文索引（见 ops/search.py）。
+"""
+from django.db import connections
+from django.db.migrations.recorder import MigrationRecorder
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import dashboard, live, search
+from .models import Alert, Deployment, Host
+
+LIVE_TOPICS = {
+    Host: 'hosts',
+    Deployment: 'deployments',
+    Alert: 'alerts',
+}
+
+TRACKED_FIELDS = {
+    Host: ('status', 'cpu_usage', 'memory_usage', 'disk_usage'),
+    Deployment: ('status',),
+    Alert: ('level', 'is_acknowledged'),
+}
+
+CONTRIBUTIONS = {
+    Host: dashboard.host_contribution,
+    Deployment: dashboard.deployment_contribution,
+    Alert: dashboard.alert_contribution,
+}
+
+
+def _contribution(model, values):
+    return CONTRIBUTIONS[model](*values) if values is not None else None
+
+
+def _current(instance):
+    return tuple(getattr(instance, field) for field in TRACKED_FIELDS[type(instance)])
+
+
+@receiver(pre_save, sender=Host)
+@receiver(pre_save, sender=Deployment)
+@receiver(pre_save, sender=Alert)
+def remember_previous(sender, instance, raw=False, **kwargs):
+    instance._dashboard_previous = None
+    if raw or instance._state.adding or instance.pk is None:
+        return
+    instance._dashboard_previous = sender.objects.filter(pk=instance.pk).values_list(
+        *TRACKED_FIELDS[sender]).first()
+
+
+@receiver(post_save, sender=Host)
+@receiver(post_save, sender=Deployment)
+@receiver(post_save, sender=Alert)
+def apply_saved(sender, instance, created=False, raw=False, **kwargs):
+    if raw:
+        return
+    previous = None if created else getattr(instance, '_dashboard_previous', None)
+    dashboard.apply_deltas(dashboard.diff(_contribution(sender, previous), _contribution(sender, _current(instance))))
+    dashboard.invalidate_recent()
+    live.notify(LIVE_TOPICS[sender], [instance.pk])
+
+
+@receiver(post_delete, sender=Host)
+@receiver(post_delete, sender=Deployment)
+@receiver(post_delete, sender=Alert)
+def apply_deleted(sender, instance, **kwargs):
+    dashboard.apply_deltas(dashboard.diff(_contribution(sender, _current(instance)), None))
+    dashboard.invalidate_recent()
+    live.notify(LIVE_TOPICS[sender], [instance.pk], deleted=True)
+
+
+def ensure_search_index(sender, using='default', **kwargs):
+    """迁移后补建全文索引（SQLite 重建表会连带删除触发器）；回退到建索引之前的迁移时不处理"""
+    applied = MigrationRecorder(connections[using]).applied_migrations()
+    if ('ops', '0006_search_index') in applied:
+        search.ensure_all(using)
@@ -1,13 +1,14 @@
 """
 WebSocket Consumer for SSH Shell (WebShell)
-Uses paramiko to create an interactive SSH session and forwards I/O over WebSocket.
+Opens an interactive shell channel on a pooled SSH transport and forwards I/O over WebSocket.
 """
 import json
 import threading
 import logging
-import paramiko
 from channels.generic.websocket import WebsocketConsumer
 
+from . import ssh_pool
+
 logger = logging.getLogger(__name__)
 
 
@@ -31,15 +32,7 @@ class SSHConsumer(WebsocketConsumer):
 
         # 建立 SSH 连接
         try:
-            self.ssh_client = paramiko.SSHClient()
-            self.ssh_client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
-            self.ssh_client.connect(
-                hostname=host.ip_address,
-                port=host.ssh_port or 22,
-                username=host.ssh_user or 'root',
-                password=host.ssh_password or None,
-                timeout=15,
-            )
+            self.ssh_client = ssh_pool.acquire(host, connect_timeout=15)
             self.ssh_channel = self.ssh_client.invoke_shell(
                 term='xterm-256color',
                 width=120,
@@ -0,0 +1,310 @@
+"""
+进程级 SSH 连接池
+按 (ip, port, user, 密码摘要) 复用已认证的 Transport，每次操作只新开一个 channel，
+避免重复的 TCP 握手 + 密钥交换 + 密码认证。密码参与 key，凭据不同（或已修改）的主机记录不会复用
+其他记录已认证的连接。
+
+    with ssh_pool.acquire(host) as conn:
+        stdin, stdout, stderr = conn.exec_command('uname -a', timeout=5)
+
+- 空闲超过 SSH_POOL_IDLE_TTL 秒的 Transport 会被回收
+- 每个 key 最多 SSH_POOL_MAX_PER_HOST 条 Transport，每条最多承载 SSH_POOL_MAX_CHANNELS 个并发 channel
+- 借出前检查 Transport 存活状态，失效连接自动丢弃并重建
+"""
+import hashlib
+import logging
+import os
+import threading
+import time
+
+import paramiko
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# 密码摘要的进程内随机密钥，key 与 stats 中不出现可离线比对的密码哈希
+_CREDENTIAL_KEY = os.urandom(16)
+
+
+class PoolExhausted(Exception):
+    """等待空闲连接超时"""
+
+
+class _Entry:
+    __slots__ = ('client', 'leases', 'created_at', 'last_used')
+
+    def __init__(self, client):
+        self.client = client
+        self.leases = 0
+        self.created_at = time.monotonic()
+        self.last_used = self.created_at
+
+    @property
+    def transport(self):
+        return self.client.get_transport()
+
+    def is_alive(self):
+        transport = self.transport
+        return transport is not None and transport.is_active() and transport.is_authenticated()
+
+    def close(self):
+        try:
+            self.client.close()
+        except Exception:
+            pass
+
+
+class PooledConnection:
+    """从连接池借出的连接，接口与 paramiko.SSHClient 常用方法保持一致，close() 即归还"""
+
+    def __init__(self, pool, key, entry):
+        self._pool = pool
+        self._key = key
+        self._entry = entry
+        self._closed = False
+
+    @property
+    def transport(self):
+        return self._entry.transport
+
+    def _open_session(self, timeout=None):
+        try:
+            return self.transport.open_session(timeout=timeout)
+        except (paramiko.SSHException, EOFError, OSError, AttributeError):
+            self._pool._mark_dead(self._key, self._entry)
+            raise
+
+    def exec_command(self, command, timeout=None, get_pty=False, environment=None):
+        chan = self._open_session(timeout=timeout)
+        if get_pty:
+            chan.get_pty()
+        chan.settimeout(timeout)
+        if environment:
+            chan.update_environment(environment)
+        chan.exec_command(command)
+        stdin = chan.makefile_stdin('wb', -1)
+        stdout = chan.makefile('r', -1)
+        stderr = chan.makefile_stderr('r', -1)
+        return stdin, stdout, stderr
+
+    def invoke_shell(self, term='vt100', width=80, height=24):
+        chan = self._open_session()
+        chan.get_pty(term=term, width=width, height=height)
+        chan.invoke_shell()
+        return chan
+
+    def open_sftp(self):
+        try:
+            return paramiko.SFTPClient.from_transport(self.transport)
+        except (paramiko.SSHException, EOFError, OSError, AttributeError):
+            self._pool._mark_dead(self._key, self._entry)
+            raise
+
+    def close(self):
+        if not self._closed:
+            self._closed = True
+            self._pool._release(self._key, self._entry)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class SSHPool:
+    def __init__(self, idle_ttl=300, max_per_host=4, max_channels=8, connect_timeout=15,
+                 acquire_timeout=30, keepalive=30):
+        self.idle_ttl = idle_ttl
+        self.max_per_host = max_per_host
+        self.max_channels = max_channels
+        self.connect_timeout = connect_timeout
+        self.acquire_timeout = acquire_timeout
+        self.keepalive = keepalive
+        self._entries = {}   # key -> [_Entry]
+        self._pending = {}   # key -> 正在建立中的连接数
+        self._cond = threading.Condition()
+        self._counters = {'hits': 0, 'misses': 0, 'evictions': 0, 'dead': 0, 'errors': 0}
+
+    @staticmethod
+    def key_for(host):
+        password = getattr(host, 'ssh_password', '') or ''
+        return (
+            host.ip_address,
+            int(getattr(host, 'ssh_port', 22) or 22),
+            getattr(host, 'ssh_user', 'root') or 'root',
+            hashlib.blake2b(password.encode(), key=_CREDENTIAL_KEY, digest_size=8).hexdigest(),
+        )
+
+    def acquire(self, host, timeout=None, connect_timeout=None):
+        """借出一个到 host 的连接；调用方用完后必须 close()（或使用 with 语句）"""
+        key = self.key_for(host)
+        deadline = time.monotonic() + (timeout if timeout is not None else self.acquire_timeout)
+        with self._cond:
+            while True:
+                self._sweep_locked()
+                entry = self._pick_locked(key)
+                if entry is not None:
+                    entry.leases += 1
+                    self._counters['hits'] += 1
+                    return PooledConnection(self, key, entry)
+                total = len(self._entries.get(key, ())) + self._pending.get(key, 0)
+                if total < self.max_per_host:
+                    self._pending[key] = self._pending.get(key, 0) + 1
+                    self._counters['misses'] += 1
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise PoolExhausted(f'SSH 连接池已满: {key[0]}:{key[1]}')
+                self._cond.wait(remaining)
+
+        # 在锁外完成握手，避免阻塞其他主机的借还
+        try:
+            client = self._connect(host, key, connect_timeout or self.connect_timeout)
+        except Exception:
+            with self._cond:
+                self._pending[key] -= 1
+                self._counters['errors'] += 1
+                self._cond.notify_all()
+            raise
+
+        entry = _Entry(client)
+        entry.leases = 1
+        with self._cond:
+            self._pending[key] -= 1
+            self._entries.setdefault(key, []).append(entry)
+        return PooledConnection(self, key, entry)
+
+    def _connect(self, host, key, timeout):
+        client = paramiko.SSHClient()
+        client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+        client.connect(
+            hostname=key[0],
+            port=key[1],
+            username=key[2],
+            password=getattr(host, 'ssh_password', '') or None,
+            timeout=timeout,
+            banner_timeout=timeout,
+            auth_timeout=timeout,
+        )
+        if self.keepalive:
+            client.get_transport().set_keepalive(self.keepalive)
+        return client
+
+    def _pick_locked(self, key):
+        """选出存活且 channel 未满、负载最低的 Transport，顺带剔除失效连接"""
+        entries = self._entries.get(key)
+        if not entries:
+            return None
+        best = None
+        for entry in list(entries):
+            if not entry.is_alive():
+                entries.remove(entry)
+                self._counters['dead'] += 1
+                entry.close()
+                continue
+            if entry.leases < self.max_channels and (best is None or entry.leases < best.leases):
+                best = entry
+        if not entries:
+            self._entries.pop(key, None)
+        return best
+
+    def _sweep_locked(self):
+        now = time.monotonic()
+        for key in list(self._entries):
+            entries = self._entries[key]
+            for entry in list(entries):
+                if entry.leases == 0 and now - entry.last_used > self.idle_ttl:
+                    entries.remove(entry)
+                    self._counters['evictions'] += 1
+                    entry.close()
+            if not entries:
+                del self._entries[key]
+
+    def _release(self, key, entry):
+        with self._cond:
+            entry.leases = max(0, entry.leases - 1)
+            entry.last_used = time.monotonic()
+            detached = entry not in self._entries.get(key, ())
+            close = detached and entry.leases == 0
+            self._cond.notify_all()
+        if close:
+            entry.close()
+
+    def _mark_dead(self, key, entry):
+        with self._cond:
+            entries = self._entries.get(key, [])
+            if entry in entries:
+                entries.remove(entry)
+                self._counters['dead'] += 1
+                if not entries:
+                    self._entries.pop(key, None)
+            self._cond.notify_all()
+        entry.close()
+
+    def invalidate(self, host):
+        """主机 SSH 配置变更/删除后丢弃已有连接（正在使用的 channel 不受影响）"""
+        key = self.key_for(host)
+        with self._cond:
+            entries = self._entries.pop(key, [])
+            self._cond.notify_all()
+        for entry in entries:
+            if entry.leases == 0:
+                entry.close()
+
+    def sweep(self):
+        with self._cond:
+            self._sweep_locked()
+
+    def close_all(self):
+        with self._cond:
+            entries = [e for group in self._entries.values() for e in group]
+            self._entries.clear()
+            self._cond.notify_all()
+        for entry in entries:
+            entry.close()
+
+    def stats(self):
+        with self._cond:
+            hosts = {}
+            for (ip, port, user, _), entries in self._entries.items():
+                # 同一地址可能有多组凭据，按地址合并展示
+                item = hosts.setdefault(f'{ip}:{port}@{user}', {'transports': 0, 'channels': 0})
+                item['transports'] += len(entries)
+                item['channels'] += sum(e.leases for e in entries)
+            data = dict(self._counters)
+            data.update({
+                'transports': sum(v['transports'] for v in hosts.values()),
+                'channels': sum(v['channels'] for v in hosts.values()),
+                'pending': sum(self._pending.values()),
+                'idle_ttl': self.idle_ttl,
+                'max_per_host': self.max_per_host,
+                'max_channels': self.max_channels,
+                'hosts': hosts,
+            })
+        return data
+
+
+pool = SSHPool(
+    idle_ttl=getattr(settings, 'SSH_POOL_IDLE_TTL', 300),
+    max_per_host=getattr(settings, 'SSH_POOL_MAX_PER_HOST', 4),
+    max_channels=getattr(settings, 'SSH_POOL_MAX_CHANNELS', 8),
+    connect_timeout=getattr(settings, 'SSH_POOL_CONNECT_TIMEOUT', 15),
+)
+
+
+def acquire(host, timeout=None, connect_timeout=None):
+    return pool.acquire(host, timeout=timeout, connect_timeout=connect_timeout)
+
+
+def connect(host, timeout=None):
+    """不经连接池新建一条已认证的连接（调用方负责 close()），用于测试当前保存的凭据"""
+    return pool._connect(host, pool.key_for(host), timeout or pool.connect_timeout)
+
+
+def invalidate(host):
+    pool.invalidate(host)
+
+
+def stats():
+    return pool.stats()
@@ -1,3 +1,249 @@
-from django.test import TestCase
+import asyncio
+import json
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+
+from . import collector, dashboard, loki_cache, loki_split, timeseries
+from .loki_tail import Subscriber
+from .ingest import ingest_log_entries
+from .models import DashboardCounter, Host, HostMetricRollup, LogEntry
+
+
+class LogIngestTimestampTests(TestCase):
+    def test_rejects_non_finite_and_huge_timestamps(self):
+        # 未安装 orjson 时 parsers.loads 退回 json 模块，Infinity / 1e400 会解析为 inf
+        entries = json.loads(
+            '[{"service": "api", "message": "inf", "ts": Infinity},'
+            ' {"service": "api", "message": "-inf", "ts": -Infinity},'
+            ' {"service": "api", "message": "nan", "ts": NaN},'
+            ' {"service": "api", "message": "overflow", "ts": 1e400},'
+            ' {"service": "api", "message": "huge", "ts": 1e30},'
+            ' {"service": "api", "message": "negative", "ts": -1e20},'
+            ' {"service": "api", "message": "ok", "ts": 1700000000123}]'
+        )
+        result = ingest_log_entries(entries)
+        self.assertEqual(result['accepted'], 1)
+        self.assertEqual(result['rejected'], 6)
+        self.assertEqual([error['index'] for error in result['errors']], [1, 2, 3, 4, 5, 6])
+        self.assertEqual(list(LogEntry.objects.values_list('message', flat=True)), ['ok'])
+
+
+@mock.patch.object(timeseries, 'maybe_downsample')
+class LateSampleRollupTests(TestCase):
+    def setUp(self):
+        self.host = Host.objects.create(hostname='web-1', ip_address='10.0.0.1')
+        self.now = timeseries.floor_time(timezone.now(), 3600) + timedelta(minutes=30)
+
+    def record(self, minutes_ago, cpu):
+        with self.captureOnCommitCallbacks(execute=True):
+            timeseries.record_samples([(self.host.pk, {
+                'cpu_usage': cpu, 'memory_usage': 50, 'disk_usage': 10,
+                'timestamp': self.now - timedelta(minutes=minutes_ago),
+            })])
+
+    def test_late_sample_is_rolled_up_again(self, _):
+        self.record(10, 20)
+        timeseries.downsample(now=self.now)
+        bucket = timeseries.floor_time(self.now - timedelta(minutes=10), 60)
+        rollup = HostMetricRollup.objects.get(resolution='1m', bucket=bucket)
+        self.assertEqual((rollup.samples, rollup.cpu_max), (1, 20))
+
+        # 同一分钟桶的迟到采样，以及更早、此前没有任何数据的时间桶
+        self.record(10, 80)
+        self.record(20, 40)
+        timeseries.downsample(now=self.now)
+        rollup.refresh_from_db()
+        self.assertEqual((rollup.samples, rollup.cpu_max), (2, 80))
+        self.assertTrue(HostMetricRollup.objects.filter(
+            resolution='1m', bucket=timeseries.floor_time(self.now - timedelta(minutes=20), 60)).exists())
+
+
+class SaveHostMetricsCounterTests(TestCase):
+    def test_applies_deltas_instead_of_reconciling(self):
+        web = Host.objects.create(hostname='web-1', ip_address='10.0.0.1', cpu_usage=10, memory_usage=20)
+        db = Host.objects.create(hostname='db-1', ip_address='10.0.0.2', cpu_usage=30, memory_usage=40)
+        dashboard.reconcile(['hosts'])
+        with mock.patch.object(dashboard, 'reconcile') as reconcile:
+            collector.save_host_metrics([
+                (web.pk, 50, None, 5, 'online'),
+                (db.pk, None, None, None, 'offline'),
+            ])
+        reconcile.assert_not_called()
+        counters = dict(DashboardCounter.objects.filter(key__startswith='hosts.').values_list('key', 'value'))
+        self.assertEqual(counters['hosts.sum_cpu'], 80)
+        self.assertEqual(counters['hosts.sum_memory'], 60)
+        self.assertEqual(counters['hosts.status.offline'], 1)
+        self.assertEqual(dashboard.reconcile(['hosts']), {})
+
+
+class TailSubscriberTests(SimpleTestCase):
+    def test_notices_are_delivered_while_waiting_for_ack(self):
+        async def run():
+            subscriber = Subscriber(buffer_size=100, batch_size=2, batch_interval=0, window=1)
+            received = []
+
+            async def consume():
+                async for message in subscriber.frames():
+                    received.append(message)
+
+            task = asyncio.ensure_future(consume())
+            subscriber.push({'job': 'api'}, [['1', 'a'], ['2', 'b'], ['3', 'c']])
+            await asyncio.sleep(0.01)
+            # 第一帧未确认，窗口已满；错误与关闭仍应送达并结束
+            subscriber.notice({'type': 'error', 'error': 'bad query'})
+            subscriber.close()
+            await asyncio.wait_for(task, 1)
+            return received
+
+        received = asyncio.run(run())
+        self.assertEqual([message['type'] for message in received], ['lines', 'error'])
+        self.assertEqual(received[0]['seq'], 1)
+
+
+NS = 10 ** 9
+
+
+def _stream(labels, *timestamps):
+    return {'stream': labels, 'values': [[str(ts), f'line {ts}'] for ts in timestamps]}
+
+
+class LokiSplitMergeTests(SimpleTestCase):
+    # 两段（较新的段在前），每段两个 stream
+    NEWER = [_stream({'job': 'api'}, 40, 30), _stream({'job': 'web'}, 35)]
+    OLDER = [_stream({'job': 'api'}, 20), _stream({'job': 'web'}, 25, 10)]
+
+    def test_backward_merge_keeps_newest_within_limit(self):
+        streams, truncated = loki_split.merge_streams([self.NEWER, self.OLDER], 'backward', 4)
+        self.assertFalse(truncated)
+        self.assertEqual(streams, [
+            {'stream': {'job': 'api'}, 'values': [['40', 'line 40'], ['30', 'line 30']]},
+            {'stream': {'job': 'web'}, 'values': [['35', 'line 35'], ['25', 'line 25']]},
+        ])
+
+    def test_forward_merge_keeps_oldest_within_limit(self):
+        newer = [{'stream': s['stream'], 'values': s['values'][::-1]} for s in self.NEWER]
+        older = [{'stream': s['stream'], 'values': s['values'][::-1]} for s in self.OLDER]
+        streams, _ = loki_split.merge_streams([older, newer], 'forward', 3)
+        self.assertEqual(streams, [
+            {'stream': {'job': 'api'}, 'values': [['20', 'line 20']]},
+            {'stream': {'job': 'web'}, 'values': [['10', 'line 10'], ['25', 'line 25']]},
+        ])
+
+    def test_merge_truncates_at_max_bytes(self):
+        # 每条约 len("40") + len("line 40") + 8 = 17 字节，40 字节只容得下两条
+        streams, truncated = loki_split.merge_streams([self.NEWER, self.OLDER], 'backward', 100, max_bytes=40)
+        self.assertTrue(truncated)
+        self.assertEqual([value[0] for stream in streams for value in stream['values']], ['40', '35'])
+
+    def test_limit_counter_stops_once_enough_lines(self):
+        enough = loki_split.limit_counter(4)
+        self.assertFalse(enough(self.NEWER))
+        self.assertFalse(enough(None))
+        self.assertTrue(enough(self.OLDER))
+
+    def test_fan_out_stops_early_and_cancels_in_flight_shards(self):
+        fetched, cancelled = [], []
+
+        async def fetch(segment):
+            fetched.append(segment)
+            if segment == 0:
+                await asyncio.sleep(0.01)
+                return [_stream({'job': 'api'}, 3, 2, 1)]
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.append(segment)
+                raise
+            return []
+
+        async def run():
+            return await asyncio.wait_for(
+                loki_split.fan_out(list(range(6)), fetch, 2, loki_split.limit_counter(3)), 1)
+
+        results = asyncio.run(run())
+        self.assertEqual(len(results[0][0]['values']), 3)
+        self.assertEqual(results[1:], [None] * 5)
+        # 第 0 段凑够 limit 后不再调度后面的段，并发中的第 1 段被取消
+        self.assertEqual(fetched, [0, 1])
+        self.assertEqual(cancelled, [1])
+
+    def test_fan_out_propagates_errors(self):
+        async def fetch(segment):
+            if segment == 1:
+                raise ValueError('boom')
+            await asyncio.sleep(10)
+
+        with self.assertRaises(ValueError):
+            asyncio.run(asyncio.wait_for(loki_split.fan_out([0, 1, 2], fetch, 3), 1))
+
+    def test_split_aligns_to_step_and_caps_segments(self):
+        step = 60 * NS
+        segments = loki_split.split(100 * NS, 7300 * NS, 3600 * NS + 7, align=step)
+        self.assertEqual(segments, [(100 * NS, 3600 * NS), (3600 * NS, 7200 * NS), (7200 * NS, 7300 * NS)])
+        year = 365 * 86400 * NS
+        segments = loki_split.split(0, year, 3600 * NS, max_segments=32)
+        self.assertLessEqual(len(segments), 32)
+        self.assertEqual((segments[0][0], segments[-1][1]), (0, year))
+        self.assertTrue(all(a[1] == b[0] for a, b in zip(segments, segments[1:])))
+
+
+@override_settings(LOKI_CACHE_ENABLED=True, LOKI_CACHE_BUCKET=900, LOKI_CACHE_FRESHNESS=600,
+                   LOKI_CACHE_MAX_BUCKETS=32, LOKI_SPLIT_INTERVAL=3600, LOKI_SPLIT_MAX_SEGMENTS=32)
+class LokiCachePlanTests(SimpleTestCase):
+    def boundaries(self, query_plan):
+        return [(start // NS, end // NS, key is not None) for start, end, key in query_plan.segments]
+
+    def test_metric_query_aligns_to_step(self):
+        query_plan = loki_cache.plan({
+            'query': 'sum(rate({job="api"}[1m]))', 'start': '1700000017', 'end': '1700007243', 'step': '60',
+        }, now_ns=1700020000 * NS)
+        # 起止按 step 对齐；开头不足一桶与末尾不足一桶的部分不缓存，中间为 900 秒的整桶
+        self.assertEqual((query_plan.start, query_plan.end), (1699999980 * NS, 1700007240 * NS + 1))
+        self.assertEqual(self.boundaries(query_plan), [(1699999980, 1700000100, False)] + [
+            (start, start + 900, True) for start in range(1700000100, 1700006400, 900)
+        ] + [(1700006400, 1700007240, False)])
+        # 每段的 end 不含边界上的点，最后一段包含对齐后的 end
+        self.assertEqual(query_plan.segment_params(*query_plan.segments[1][:2])['end'], str(1700001000 * NS - 1))
+        self.assertEqual(query_plan.segment_params(*query_plan.segments[-1][:2])['end'], str(1700007240 * NS))
+        self.assertEqual(query_plan.segment_params(*query_plan.segments[-1][:2])['step'], '60')
+
+    def test_step_not_dividing_bucket_widens_bucket(self):
+        query_plan = loki_cache.plan({
+            'query': 'count_over_time({job="api"}[7m])', 'start': '1700000000', 'end': '1700010000', 'step': '420',
+        }, now_ns=1700020000 * NS)
+        cached = [(start, end) for start, end, key in query_plan.segments if key]
+        self.assertTrue(cached)
+        for start, end in cached:
+            self.assertEqual(end - start, 1260 * NS)   # 900 向上取整为 420 的整数倍
+            self.assertEqual(start % (1260 * NS), 0)
+
+    def test_log_query_skips_recent_data(self):
+        query_plan = loki_cache.plan({'query': '{job="api"}', 'start': '1700000017', 'end': '1700007243'},
+                                     now_ns=1700007300 * NS)
+        segments = self.boundaries(query_plan)
+        self.assertEqual(segments[0], (1700000017, 1700000100, False))
+        self.assertEqual(segments[-1], (1700006400, 1700007243, False))
+        self.assertTrue(all(cached for _, _, cached in segments[1:-1]))
+
+    def test_long_ranges_are_bounded(self):
+        year = 365 * 86400
+        query_plan = loki_cache.plan({'query': '{job="api"}', 'start': '1600000000', 'end': str(1600000000 + year)},
+                                     now_ns=(1600000000 + 2 * year) * NS)
+        self.assertLessEqual(len(query_plan.segments), 34)   # 至多 32 个整桶加首尾两段
+
+    def test_equivalent_queries_share_cache_keys(self):
+        params = {'start': '1700000000', 'end': '1700010000', 'step': '60'}
+        a = loki_cache.plan(dict(params, query='sum(rate({job="api",env="prod"}[1m]))'), now_ns=1700020000 * NS)
+        b = loki_cache.plan(dict(params, query='sum( rate( { env = "prod", job="api" } [1m] ) )'),
+                            now_ns=1700020000 * NS)
+        self.assertEqual([key for *_, key in a.segments], [key for *_, key in b.segments])
+
+    def test_invalid_or_short_ranges_are_not_planned(self):
+        now = 1700020000 * NS
+        self.assertIsNone(loki_cache.plan({'query': '{job="api"}', 'start': '1700000000', 'end': '1700000600'}, now))
+        self.assertIsNone(loki_cache.plan({'query': '{job="api"}', 'start': 'nan', 'end': '1700000600'}, now))
+        self.assertIsNone(loki_cache.plan({'query': 'rate({job="api"}[1m])', 'start': '1700000000',
+                                           'end': '1700010000', 'step': '-60'}, now))
@@ -0,0 +1,392 @@
+"""
+主机指标时序存储
+- 原始采样写入 HostMetricSample，按批降采样为 1m / 1h / 1d 三级 HostMetricRollup（min / avg / max / p95）
+- 每一级只保留 METRICS_RETENTION 指定的时长，存储量只与主机数成正比，不随时间增长
+- 降采样以各级最新时间桶为水位线增量推进，已完成的时间桶通过 upsert 写入，可重复执行
+- 写入早于水位线的迟到采样（推送批次落后、网络延迟）时记录最早的时间，下次降采样从该时间桶起逐级重新聚合
+"""
+import logging
+import math
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.models import Avg, Count, Max, Min, Sum
+from django.utils import timezone
+
+from .models import HostMetricRollup, HostMetricSample
+
+logger = logging.getLogger(__name__)
+
+# 分辨率 -> (时间桶秒数, 数据来源, 每批处理的时间桶数)
+# 每批读入的行数约为 主机数 × 每桶下级行数 × 批大小，数千台主机时控制在几十万行以内
+RESOLUTIONS = {
+    '1m': (60, 'raw', 10),
+    '1h': (3600, '1m', 2),
+    '1d': (86400, '1h', 1),
+}
+
+DEFAULT_RETENTION = {
+    'raw': 2 * 3600,
+    '1m': 2 * 86400,
+    '1h': 30 * 86400,
+    '1d': 400 * 86400,
+}
+
+METRICS = ('cpu', 'memory', 'disk')
+ROLLUP_UPDATE_FIELDS = ['samples', 'load1_avg', 'net_rx_bps_avg', 'net_tx_bps_avg'] + [
+    f'{metric}_{stat}' for metric in METRICS for stat in ('min', 'avg', 'max', 'p95')
+]
+
+# 时间桶在结束后再等待一段时间才降采样，给迟到的采样留出余量
+SETTLE_SECONDS = 30
+MAX_QUERY_POINTS = 1500
+PRUNE_CHUNK = 5000
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+
+
+def retention(level):
+    configured = getattr(settings, 'METRICS_RETENTION', {})
+    return configured.get(level, DEFAULT_RETENTION[level])
+
+
+def floor_time(value, step):
+    seconds = int((value - _EPOCH).total_seconds())
+    return _EPOCH + timedelta(seconds=seconds - seconds % step)
+
+
+def percentile(values, pct=95):
+    """最近秩法百分位（values 需已排序）"""
+    if not values:
+        return 0
+    rank = max(1, math.ceil(pct / 100.0 * len(values)))
+    return values[rank - 1]
+
+
+def weighted_percentile(pairs, pct=95):
+    """[(value, weight), ...] 的加权百分位，用于由下级聚合推算上级 p95（近似值）"""
+    pairs = sorted(pairs)
+    total = sum(w for _, w in pairs)
+    if not total:
+        return 0
+    threshold = total * pct / 100.0
+    acc = 0
+    for value, weight in pairs:
+        acc += weight
+        if acc >= threshold:
+            return value
+    return pairs[-1][0]
+
+
+def _mean(values):
+    values = [v for v in values if v is not None]
+    return sum(values) / len(values) if values else None
+
+
+# ---------------------------------------------------------------------------
+# 写入
+# ---------------------------------------------------------------------------
+
+def record_samples(samples, timestamp=None):
+    """
+    批量写入原始采样
+    samples: [(host_id, metrics_dict), ...]，metrics_dict 为 collector.parse_probe() 的结果，
+             可带 'timestamp'（datetime）覆盖默认的写入时间
+    """
+    timestamp = timestamp or timezone.now()
+    objs = []
+    for host_id, metrics in samples:
+        if metrics.get('cpu_usage') is None and metrics.get('memory_usage') is None:
+            continue
+        load = metrics.get('load') or [None]
+        objs.append(HostMetricSample(
+            host_id=host_id,
+            timestamp=metrics.get('timestamp') or timestamp,
+            cpu_usage=metrics.get('cpu_usage') or 0,
+            memory_usage=metrics.get('memory_usage') or 0,
+            disk_usage=metrics.get('disk_usage') or 0,
+            load1=load[0],
+            net_rx_bps=metrics.get('net_rx_bps'),
+            net_tx_bps=metrics.get('net_tx_bps'),
+        ))
+    if objs:
+        HostMetricSample.objects.bulk_create(objs, batch_size=1000)
+        earliest = min(obj.timestamp for obj in objs)
+        if earliest < timezone.now() - timedelta(seconds=SETTLE_SECONDS):
+            # 所在时间桶可能已降采样，提交后标记为需重新聚合
+            transaction.on_commit(lambda: mark_late(earliest))
+        maybe_downsample()
+    return len(objs)
+
+
+# ---------------------------------------------------------------------------
+# 降采样
+# ---------------------------------------------------------------------------
+
+def _rollup_from_raw(window_start, window_end, step):
+    groups = defaultdict(lambda: {'cpu': [], 'memory': [], 'disk': [], 'load1': [], 'rx': [], 'tx': []})
+    rows = (
+        HostMetricSample.objects
+        .filter(timestamp__gte=window_start, timestamp__lt=window_end)
+        .order_by()
+        .values_list('host_id', 'timestamp', 'cpu_usage', 'memory_usage', 'disk_usage',
+                     'load1', 'net_rx_bps', 'net_tx_bps')
+    )
+    for host_id, ts, cpu, mem, disk, load1, rx, tx in rows.iterator(chunk_size=5000):
+        g = groups[(host_id, floor_time(ts, step))]
+        g['cpu'].append(cpu)
+        g['memory'].append(mem)
+        g['disk'].append(disk)
+        g['load1'].append(load1)
+        g['rx'].append(rx)
+        g['tx'].append(tx)
+
+    rollups = []
+    for (host_id, bucket), g in groups.items():
+        obj = HostMetricRollup(host_id=host_id, resolution='1m', bucket=bucket, samples=len(g['cpu']))
+        for metric in METRICS:
+            values = sorted(g[metric])
+            setattr(obj, f'{metric}_min', values[0])
+            setattr(obj, f'{metric}_max', values[-1])
+            setattr(obj, f'{metric}_avg', round(sum(values) / len(values), 2))
+            setattr(obj, f'{metric}_p95', percentile(values))
+        obj.load1_avg = _mean(g['load1'])
+        rx, tx = _mean(g['rx']), _mean(g['tx'])
+        obj.net_rx_bps_avg = int(rx) if rx is not None else None
+        obj.net_tx_bps_avg = int(tx) if tx is not None else None
+        rollups.append(obj)
+    return rollups
+
+
+def _rollup_from_rollups(source, resolution, window_start, window_end, step):
+    groups = defaultdict(list)
+    rows = (
+        HostMetricRollup.objects
+        .filter(resolution=source, bucket__gte=window_start, bucket__lt=window_end)
+        .order_by()
+        .values_list('host_id', 'bucket', *ROLLUP_UPDATE_FIELDS)
+    )
+    for row in rows.iterator(chunk_size=5000):
+        groups[(row[0], floor_time(row[1], step))].append(dict(zip(ROLLUP_UPDATE_FIELDS, row[2:])))
+
+    rollups = []
+    for (host_id, bucket), children in groups.items():
+        total = sum(c['samples'] for c in children) or len(children)
+        obj = HostMetricRollup(host_id=host_id, resolution=resolution, bucket=bucket, samples=total)
+        for metric in METRICS:
+            setattr(obj, f'{metric}_min', min(c[f'{metric}_min'] for c in children))
+            setattr(obj, f'{metric}_max', max(c[f'{metric}_max'] for c in children))
+            setattr(obj, f'{metric}_avg', round(
+                sum(c[f'{metric}_avg'] * (c['samples'] or 1) for c in children) / total, 2))
+            setattr(obj, f'{metric}_p95', weighted_percentile(
+                [(c[f'{metric}_p95'], c['samples'] or 1) for c in children]))
+        obj.load1_avg = _mean([c['load1_avg'] for c in children])
+        rx = _mean([c['net_rx_bps_avg'] for c in children])
+        tx = _mean([c['net_tx_bps_avg'] for c in children])
+        obj.net_rx_bps_avg = int(rx) if rx is not None else None
+        obj.net_tx_bps_avg = int(tx) if tx is not None else None
+        rollups.append(obj)
+    return rollups
+
+
+_late_lock = threading.Lock()
+_late_since = None
+
+
+def mark_late(timestamp):
+    """记录迟到采样的最早时间，下次降采样时重新聚合其后的时间桶"""
+    global _late_since
+    with _late_lock:
+        if _late_since is None or timestamp < _late_since:
+            _late_since = timestamp
+
+
+def _take_late():
+    global _late_since
+    with _late_lock:
+        late, _late_since = _late_since, None
+    return late
+
+
+def _next_pending(resolution, source, step):
+    """返回该分辨率下一个待聚合时间桶的起点（跳过没有数据的空档）"""
+    last = HostMetricRollup.objects.filter(resolution=resolution).aggregate(v=Max('bucket'))['v']
+    since = last + timedelta(seconds=step) if last else None
+    if source == 'raw':
+        qs = HostMetricSample.objects.all()
+        if since:
+            qs = qs.filter(timestamp__gte=since)
+        first = qs.aggregate(v=Min('timestamp'))['v']
+    else:
+        qs = HostMetricRollup.objects.filter(resolution=source)
+        if since:
+            qs = qs.filter(bucket__gte=since)
+        first = qs.aggregate(v=Min('bucket'))['v']
+    return floor_time(first, step) if first else None
+
+
+def downsample(now=None):
+    """将已完成的时间桶逐级分批聚合（raw -> 1m -> 1h -> 1d），返回各分辨率写入的行数"""
+    now = now or timezone.now()
+    late = _take_late()
+    try:
+        return _downsample(now, late)
+    except Exception:
+        if late is not None:
+            mark_late(late)
+        raise
+
+
+def _downsample(now, late):
+    written = {}
+    if late is not None:
+        # 原始采样保留期之前的时间桶已不完整，不再重新聚合
+        cutoff = now - timedelta(seconds=retention('raw'))
+        late = max(late, floor_time(cutoff, RESOLUTIONS['1m'][0]) + timedelta(seconds=RESOLUTIONS['1m'][0]))
+    # 上级的截止点不能超过下级已完成的范围，否则会漏掉尚未聚合的下级时间桶
+    source_end = now - timedelta(seconds=SETTLE_SECONDS)
+    for resolution, (step, source, batch) in RESOLUTIONS.items():
+        written[resolution] = 0
+        end = source_end = floor_time(source_end, step)
+        start = _next_pending(resolution, source, step)
+        if late is not None:
+            # 迟到采样所在的时间桶及其上级时间桶已聚合过，从这里重新聚合（upsert 覆盖）
+            start = min(start, floor_time(late, step)) if start else floor_time(late, step)
+        if start is None:
+            continue
+        window = timedelta(seconds=step * batch)
+        while start < end:
+            window_end = min(start + window, end)
+            if source == 'raw':
+                rollups = _rollup_from_raw(start, window_end, step)
+            else:
+                rollups = _rollup_from_rollups(source, resolution, start, window_end, step)
+            if rollups:
+                HostMetricRollup.objects.bulk_create(
+                    rollups, batch_size=1000, update_conflicts=True,
+                    unique_fields=['host', 'resolution', 'bucket'],
+                    update_fields=ROLLUP_UPDATE_FIELDS,
+                )
+                written[resolution] += len(rollups)
+            start = window_end
+    return written
+
+
+def _delete_before(queryset, field, cutoff):
+    """按索引分块删除，避免长时间持有写锁"""
+    deleted = 0
+    while True:
+        ids = list(
+            queryset.filter(**{f'{field}__lt': cutoff})
+            .order_by(field).values_list('id', flat=True)[:PRUNE_CHUNK]
+        )
+        if not ids:
+            return deleted
+        deleted += queryset.model.objects.filter(id__in=ids).delete()[0]
+
+
+def prune(now=None):
+    """清理超出保留期的原始采样与聚合数据"""
+    now = now or timezone.now()
+    result = {'raw': _delete_before(
+        HostMetricSample.objects.all(), 'timestamp', now - timedelta(seconds=retention('raw')),
+    )}
+    for resolution in RESOLUTIONS:
+        result[resolution] = _delete_before(
+            HostMetricRollup.objects.filter(resolution=resolution), 'bucket',
+            now - timedelta(seconds=retention(resolution)),
+        )
+    return result
+
+
+def run_maintenance(now=None):
+    written = downsample(now=now)
+    pruned = prune(now=now)
+    return written, pruned
+
+
+_maintenance_lock = threading.Lock()
+_last_maintenance = 0.0
+
+
+def maybe_downsample():
+    """写入采样后按 METRICS_DOWNSAMPLE_INTERVAL 节流，在后台线程执行降采样与清理"""
+    global _last_maintenance
+    interval = getattr(settings, 'METRICS_DOWNSAMPLE_INTERVAL', 60)
+    if time.monotonic() - _last_maintenance < interval or not _maintenance_lock.acquire(blocking=False):
+        return False
+    _last_maintenance = time.monotonic()
+
+    def _run():
+        try:
+            run_maintenance()
+        except Exception:
+            logger.exception('metrics maintenance failed')
+        finally:
+            # 每次维护都在新线程中执行，关闭该线程的数据库连接，避免泄漏
+            connections.close_all()
+            _maintenance_lock.release()
+
+    threading.Thread(target=_run, daemon=True, name='metrics-maintenance').start()
+    return True
+
+
+# ---------------------------------------------------------------------------
+# 查询
+# ---------------------------------------------------------------------------
+
+def pick_resolution(start, end):
+    """选择在保留期内、且点数不超过 MAX_QUERY_POINTS 的最细分辨率"""
+    span = (end - start).total_seconds()
+    age = (timezone.now() - start).total_seconds()
+    if age <= retention('raw') and span / 30 <= MAX_QUERY_POINTS:
+        return 'raw'
+    for resolution, (step, _, _) in RESOLUTIONS.items():
+        if age <= retention(resolution) and span / step <= MAX_QUERY_POINTS:
+            return resolution
+    return '1d'
+
+
+def query_range(start, end, host_id=None, resolution='auto'):
+    """
+    区间查询
+    host_id 为空时返回全体主机按时间桶聚合的结果（avg 取均值，max / p95 取最大值）
+    返回 (resolution, points)
+    """
+    if resolution == 'auto':
+        resolution = pick_resolution(start, end)
+        if host_id is None and resolution == 'raw':
+            resolution = '1m'
+
+    if resolution == 'raw':
+        qs = HostMetricSample.objects.filter(host_id=host_id, timestamp__gte=start, timestamp__lte=end)
+        points = list(
+            qs.order_by('timestamp').values(
+                'timestamp', 'cpu_usage', 'memory_usage', 'disk_usage', 'load1', 'net_rx_bps', 'net_tx_bps',
+            )[:MAX_QUERY_POINTS * 2]
+        )
+        return resolution, points
+
+    qs = HostMetricRollup.objects.filter(resolution=resolution, bucket__gte=start, bucket__lte=end)
+    if host_id is not None:
+        fields = ['bucket', 'samples', 'load1_avg', 'net_rx_bps_avg', 'net_tx_bps_avg'] + [
+            f'{metric}_{stat}' for metric in METRICS for stat in ('min', 'avg', 'max', 'p95')
+        ]
+        points = list(qs.filter(host_id=host_id).order_by('bucket').values(*fields))
+        return resolution, points
+
+    aggregates = {'hosts': Count('host_id'), 'samples': Sum('samples')}
+    for metric in METRICS:
+        aggregates[f'{metric}_min'] = Min(f'{metric}_min')
+        aggregates[f'{metric}_avg'] = Avg(f'{metric}_avg')
+        aggregates[f'{metric}_max'] = Max(f'{metric}_max')
+        aggregates[f'{metric}_p95'] = Max(f'{metric}_p95')
+    points = list(qs.order_by('bucket').values('bucket').annotate(**aggregates))
+    for point in points:
+        for metric in METRICS:
+            point[f'{metric}_avg'] = round(point[f'{metric}_avg'] or 0, 2)
+    return resolution, points
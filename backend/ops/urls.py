@@ -7,14 +7,21 @@ router = DefaultRouter()
 router.register(r'hosts', views.HostViewSet)
 router.register(r'deployments', views.DeploymentViewSet)
 router.register(r'alerts', views.AlertViewSet)
+router.register(r'alert-rules', views.AlertRuleViewSet)
 router.register(r'logs', views.LogEntryViewSet)
+router.register(r'log-retention-policies', views.LogRetentionPolicyViewSet)
 
 urlpatterns = [
     path('dashboard/stats/', views.dashboard_stats, name='dashboard-stats'),
+    path('ssh/pool/stats/', views.ssh_pool_stats, name='ssh-pool-stats'),
+    path('collector/stats/', views.collector_stats, name='collector-stats'),
+    path('metrics/range/', views.metrics_range, name='metrics-range'),
+    path('metrics/ingest/', views.metrics_ingest, name='metrics-ingest'),
     # Loki 代理
     path('loki/labels/', loki_views.loki_labels, name='loki-labels'),
     path('loki/label/<str:label_name>/values/', loki_views.loki_label_values, name='loki-label-values'),
     path('loki/query_range/', loki_views.loki_query_range, name='loki-query-range'),
     path('loki/series/', loki_views.loki_series, name='loki-series'),
+    path('loki/stats/', loki_views.loki_stats, name='loki-stats'),
     path('', include(router.urls)),
 ]
@@ -1,39 +1,124 @@
-from rest_framework import viewsets, status
-from rest_framework.decorators import api_view, action
+from rest_framework import serializers, viewsets, status
+from rest_framework.decorators import api_view, action, parser_classes
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
-from django.db.models import Count, Avg
-from .models import Host, Deployment, Alert, LogEntry
+from datetime import datetime, timedelta, timezone as dt_timezone
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from .models import Host, Deployment, Alert, AlertRule, LogEntry, LogRetentionPolicy
 from .serializers import (
     HostSerializer, DeploymentSerializer,
-    AlertSerializer, LogEntrySerializer,
+    AlertSerializer, AlertRuleSerializer, LogEntrySerializer, LogRetentionPolicySerializer,
 )
-import paramiko
+from . import alerting, collector, dashboard, export, fast_serializers, ingest, retention, rules, scheduler, ssh_pool, timeseries
+from .fieldsets import SparseFieldsetMixin
+from .filters import FullTextSearchFilter
+from .pagination import KeysetPagination
+from .parsers import NDJSONParser, GzipJSONParser
 
+MAX_OLDER_THAN_DAYS = 36500
+MAX_PK = 2 ** 63 - 1
+TIME_MIN = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+TIME_MAX = datetime(9000, 1, 1, tzinfo=dt_timezone.utc)
+_BOOLEAN = serializers.BooleanField()
 
-class HostViewSet(viewsets.ModelViewSet):
+
+def _parse_bool(data, field):
+    """按 DRF BooleanField 解析 true / false / 1 / 0 / "false" 等输入；未传时返回 None"""
+    if data.get(field) in (None, ''):
+        return None
+    try:
+        return _BOOLEAN.to_internal_value(data[field])
+    except ValidationError as e:
+        raise ValidationError({field: e.detail})
+
+
+class FastListMixin(SparseFieldsetMixin):
+    """
+    list 动作改用 values() + ValuesSerializer 生成与原序列化器相同的 JSON（见 ops/fast_serializers.py），
+    ?fields= / ?exclude= 选择的字段直接决定 values() 读取的列
+    FAST_LIST_SERIALIZATION = False 或序列化器含无法推导的字段时退回 ModelSerializer
+    """
+
+    def list(self, request, *args, **kwargs):
+        reader = None
+        if getattr(settings, 'FAST_LIST_SERIALIZATION', True):
+            reader = fast_serializers.get_values_serializer(self.get_serializer_class())
+        if reader is None:
+            return super().list(request, *args, **kwargs)
+
+        names = self.sparse_fields()
+        ordering = [name.lstrip('-') for name in getattr(self, 'cursor_ordering', None) or ()]
+        self.count_queryset = self.filter_queryset(self.get_queryset())
+        queryset = reader.values(self.count_queryset, names, ordering)
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(reader.to_representation(page, names))
+        return Response(reader.to_representation(queryset, names))
+
+
+class ExportMixin:
+    """
+    export 动作：按列表接口的过滤条件流式导出（见 ops/export.py）
+    export_columns: [(列名, 字段路径), ...]；export_time_field: start / end 过滤的时间字段
+    """
+    export_columns = ()
+    export_time_field = None
+    export_filename = 'export'
+
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        queryset = self.filter_queryset(self.get_queryset())
+        try:
+            start = _parse_time(request.GET.get('start'), None)
+            end = _parse_time(request.GET.get('end'), None)
+        except ValueError:
+            return Response({'detail': 'start / end 参数无效'}, status=status.HTTP_400_BAD_REQUEST)
+        if start:
+            queryset = queryset.filter(**{f'{self.export_time_field}__gte': start})
+        if end:
+            queryset = queryset.filter(**{f'{self.export_time_field}__lt': end})
+        return export.export_response(
+            request, queryset.order_by(*self.cursor_ordering), self.export_columns, self.export_filename,
+        )
+
+
+class HostViewSet(FastListMixin, viewsets.ModelViewSet):
     """主机管理"""
     queryset = Host.objects.all()
     serializer_class = HostSerializer
     search_fields = ['hostname', 'ip_address']
+    filter_backends = [FullTextSearchFilter]
+
+    def perform_create(self, serializer):
+        serializer.save()
+        ingest.host_lookup.clear()
+
+    def perform_update(self, serializer):
+        # SSH 地址/账号/密码可能已变更，丢弃旧连接
+        ssh_pool.invalidate(serializer.instance)
+        serializer.save()
+        ingest.host_lookup.clear()
+
+    def perform_destroy(self, instance):
+        ssh_pool.invalidate(instance)
+        instance.delete()
+        ingest.host_lookup.clear()
 
     @action(detail=True, methods=['post'])
     def test_connection(self, request, pk=None):
-        """测试 SSH 连接"""
+        """测试 SSH 连接（不经连接池：池中已认证的连接在远端改密码后仍可用，不能反映当前保存的凭据）"""
         host = self.get_object()
         try:
-            client = paramiko.SSHClient()
-            client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
-            client.connect(
-                hostname=host.ip_address,
-                port=host.ssh_port or 22,
-                username=host.ssh_user or 'root',
-                password=host.ssh_password or None,
-                timeout=10,
-            )
-            # 获取系统信息
-            stdin, stdout, stderr = client.exec_command('uname -a', timeout=5)
-            uname = stdout.read().decode('utf-8', errors='replace').strip()
-            client.close()
+            client = ssh_pool.connect(host, timeout=10)
+            try:
+                # 获取系统信息
+                stdin, stdout, stderr = client.exec_command('uname -a', timeout=5)
+                uname = stdout.read().decode('utf-8', errors='replace').strip()
+            finally:
+                client.close()
             return Response({'success': True, 'message': f'连接成功: {uname}'})
         except Exception as e:
             return Response({'success': False, 'message': f'连接失败: {str(e)}'})
@@ -43,126 +128,349 @@ class HostViewSet(viewsets.ModelViewSet):
         """SSH 连接主机并刷新 CPU/内存/磁盘信息"""
         host = self.get_object()
         try:
-            client = paramiko.SSHClient()
-            client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
-            client.connect(
-                hostname=host.ip_address,
-                port=host.ssh_port or 22,
-                username=host.ssh_user or 'root',
-                password=host.ssh_password or None,
-                timeout=10,
-            )
-
-            def _exec(cmd):
-                stdin, stdout, stderr = client.exec_command(cmd, timeout=5)
-                return stdout.read().decode('utf-8', errors='replace').strip()
-
-            # CPU 使用率
-            cpu_line = _exec("top -bn1 | grep 'Cpu(s)' | awk '{print $2}'")
-            try:
-                host.cpu_usage = round(float(cpu_line), 1)
-            except (ValueError, TypeError):
-                pass
-
-            # 内存使用率
-            mem_line = _exec("free | grep Mem | awk '{printf(\"%.1f\", $3/$2*100)}'")
-            try:
-                host.memory_usage = round(float(mem_line), 1)
-            except (ValueError, TypeError):
-                pass
-
-            # 磁盘使用率
-            disk_line = _exec("df / | tail -1 | awk '{print $5}' | tr -d '%'")
-            try:
-                host.disk_usage = round(float(disk_line), 1)
-            except (ValueError, TypeError):
-                pass
-
-            host.status = 'online'
-            host.save(update_fields=['cpu_usage', 'memory_usage', 'disk_usage', 'status'])
-            client.close()
-
+            metrics = collector.collect_metrics(host)
+            collector.apply_metrics(host, metrics)
+            host.save(update_fields=collector.METRIC_FIELDS)
+            timeseries.record_samples([(host.pk, metrics)])
             return Response(HostSerializer(host).data)
         except Exception as e:
             host.status = 'offline'
             host.save(update_fields=['status'])
             return Response({'detail': f'获取信息失败: {str(e)}'}, status=400)
 
+    @action(detail=False, methods=['post'])
+    def bulk_refresh(self, request):
+        """
+        并发刷新多台主机信息
+        请求体: {"ids": [1, 2, ...], "concurrency": 32, "timeout": 15}，ids 为空时刷新全部主机
+        """
+        ids = request.data.get('ids') or []
+        if not isinstance(ids, list) or not all(
+                isinstance(pk, int) and not isinstance(pk, bool) and 0 < pk <= MAX_PK for pk in ids):
+            return Response({'detail': 'ids 必须是主机 id（整数）列表'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            concurrency = int(request.data.get('concurrency') or collector.DEFAULT_CONCURRENCY)
+            timeout = float(request.data.get('timeout') or collector.DEFAULT_TIMEOUT)
+        except (TypeError, ValueError, OverflowError):
+            return Response({'detail': 'concurrency / timeout 参数无效'}, status=status.HTTP_400_BAD_REQUEST)
+        max_concurrency = getattr(settings, 'HOST_REFRESH_MAX_CONCURRENCY', 128)
+        concurrency = max(1, min(concurrency, max_concurrency))
+        timeout = max(1.0, min(timeout, 60.0))
+
+        hosts = Host.objects.all()
+        if ids:
+            hosts = hosts.filter(pk__in=ids)
+        results, summary = collector.refresh_hosts(hosts, concurrency=concurrency, timeout=timeout)
+        return Response({'summary': summary, 'results': results})
 
-class DeploymentViewSet(viewsets.ModelViewSet):
+
+class DeploymentViewSet(FastListMixin, ExportMixin, viewsets.ModelViewSet):
     """部署管理"""
     queryset = Deployment.objects.select_related('host').all()
     serializer_class = DeploymentSerializer
     search_fields = ['app_name', 'version', 'deployer']
+    filter_backends = [FullTextSearchFilter]
+    pagination_class = KeysetPagination
+    cursor_ordering = ('-deployed_at', '-id')
+    export_columns = [
+        ('id', 'id'), ('deployed_at', 'deployed_at'), ('app_name', 'app_name'), ('version', 'version'),
+        ('environment', 'environment'), ('status', 'status'), ('deployer', 'deployer'),
+        ('host', 'host__hostname'), ('description', 'description'),
+    ]
+    export_time_field = 'deployed_at'
+    export_filename = 'deployments'
 
 
-class AlertViewSet(viewsets.ModelViewSet):
+class AlertViewSet(FastListMixin, ExportMixin, viewsets.ModelViewSet):
     """告警管理"""
     queryset = Alert.objects.select_related('host').all()
     serializer_class = AlertSerializer
     search_fields = ['title', 'source', 'message']
+    filter_backends = [FullTextSearchFilter]
+    pagination_class = KeysetPagination
+    cursor_ordering = ('-created_at', '-id')
+    export_columns = [
+        ('id', 'id'), ('created_at', 'created_at'), ('last_seen', 'last_seen'), ('level', 'level'),
+        ('source', 'source'), ('title', 'title'), ('message', 'message'), ('host', 'host__hostname'),
+        ('count', 'count'), ('is_acknowledged', 'is_acknowledged'), ('fingerprint', 'fingerprint'),
+    ]
+    export_time_field = 'created_at'
+    export_filename = 'alerts'
+
+    def perform_create(self, serializer):
+        # 相同指纹已有未确认告警时合并计数，而不是新建一行；
+        # 直接创建为已确认的告警不参与去重（部分唯一索引只约束未确认告警）
+        data = serializer.validated_data
+        if data.get('is_acknowledged'):
+            serializer.save()
+            return
+        alert, _ = alerting.fire_alert(
+            title=data['title'], level=data.get('level', 'info'), source=data['source'],
+            message=data['message'], host=data.get('host'),
+        )
+        serializer.instance = alert
+
+    def perform_update(self, serializer):
+        try:
+            with transaction.atomic():
+                serializer.save()
+        except IntegrityError:
+            raise ValidationError({'detail': '已存在相同来源、主机、标题与级别的未确认告警'})
+
+    def _bulk_queryset(self, data):
+        """
+        按请求体中的条件筛选告警，至少需要一个条件（或显式传 "all": true）
+        条件: ids、level、source、host、start / end（创建时间范围）、older_than_days、is_acknowledged
+        """
+        queryset = Alert.objects.all()
+        applied = False
+        if data.get('ids'):
+            queryset = queryset.filter(pk__in=data['ids'])
+            applied = True
+        for field in ('level', 'source', 'host'):
+            if data.get(field) not in (None, ''):
+                queryset = queryset.filter(**{field: data[field]})
+                applied = True
+        acknowledged = _parse_bool(data, 'is_acknowledged')
+        if acknowledged is not None:
+            queryset = queryset.filter(is_acknowledged=acknowledged)
+        now = timezone.now()
+        if data.get('start'):
+            queryset = queryset.filter(created_at__gte=_parse_time(str(data['start']), now))
+            applied = True
+        if data.get('end'):
+            queryset = queryset.filter(created_at__lt=_parse_time(str(data['end']), now))
+            applied = True
+        if data.get('older_than_days') not in (None, ''):
+            days = float(data['older_than_days'])
+            if not 0 <= days <= MAX_OLDER_THAN_DAYS:
+                raise ValidationError({'older_than_days': f'必须在 0~{MAX_OLDER_THAN_DAYS} 之间'})
+            queryset = queryset.filter(created_at__lt=now - timedelta(days=days))
+            applied = True
+        if not applied and not _parse_bool(data, 'all'):
+            raise ValidationError({'detail': '请至少指定一个筛选条件（或传 "all": true）'})
+        return queryset
+
+    def _bulk_filter(self, request):
+        try:
+            return self._bulk_queryset(request.data)
+        except (TypeError, ValueError, OverflowError):
+            raise ValidationError({'detail': '筛选条件格式无效'})
+
+    @action(detail=False, methods=['post'])
+    def bulk_acknowledge(self, request):
+        """
+        批量确认告警（单条 UPDATE）
+        请求体: {"level": "critical", "source": "...", "host": 1, "start": ..., "end": ..., "ids": [...]}
+        """
+        return Response({'acknowledged': alerting.acknowledge(self._bulk_filter(request))})
+
+    @action(detail=False, methods=['post'])
+    def bulk_delete(self, request):
+        """
+        批量删除告警（单条 DELETE），常用于清理: {"older_than_days": 30, "is_acknowledged": true}
+        条件同 bulk_acknowledge
+        """
+        return Response(alerting.delete(self._bulk_filter(request)))
+
 
+class AlertRuleViewSet(SparseFieldsetMixin, viewsets.ModelViewSet):
+    """阈值告警规则"""
+    queryset = AlertRule.objects.all()
+    serializer_class = AlertRuleSerializer
 
-class LogEntryViewSet(viewsets.ModelViewSet):
+    @action(detail=False, methods=['post'])
+    def evaluate(self, request):
+        """立即对全部主机评估一次规则（调度器运行时每 RULES_EVAL_INTERVAL 秒自动执行）"""
+        return Response(rules.evaluate())
+
+    @action(detail=False, methods=['get'])
+    def stats(self, request):
+        """当前进程内规则引擎的评估统计"""
+        return Response(rules.engine.stats())
+
+
+class LogEntryViewSet(FastListMixin, ExportMixin, viewsets.ModelViewSet):
     """日志管理"""
     queryset = LogEntry.objects.select_related('host').all()
     serializer_class = LogEntrySerializer
     search_fields = ['service', 'message']
+    filter_backends = [FullTextSearchFilter]
+    pagination_class = KeysetPagination
+    cursor_ordering = ('-timestamp', '-id')
+    export_columns = [
+        ('id', 'id'), ('timestamp', 'timestamp'), ('level', 'level'), ('service', 'service'),
+        ('host', 'host__hostname'), ('message', 'message'),
+    ]
+    export_time_field = 'timestamp'
+    export_filename = 'logs'
+
+    @action(detail=False, methods=['post'], parser_classes=[NDJSONParser, GzipJSONParser])
+    def ingest(self, request):
+        """
+        批量接入日志
+        请求体: NDJSON（application/x-ndjson）或 JSON 数组 / {"entries": [...]}，支持 Content-Encoding: gzip
+        配置 LOGS_INGEST_TOKEN 后需携带 Authorization: Bearer <token>
+        """
+        if not _ingest_authorized(request, 'LOGS_INGEST_TOKEN'):
+            return Response({'detail': '无效的上报凭证'}, status=status.HTTP_401_UNAUTHORIZED)
+
+        data = request.data
+        parse_errors = getattr(data, 'errors', ())
+        if isinstance(data, dict):
+            data = data.get('entries', [data])
+        if not isinstance(data, list):
+            return Response({'detail': '请求体必须是日志数组'}, status=status.HTTP_400_BAD_REQUEST)
+
+        result = ingest.ingest_log_entries(data, parse_errors=parse_errors)
+        code = status.HTTP_202_ACCEPTED if result['accepted'] or not result['rejected'] else status.HTTP_400_BAD_REQUEST
+        return Response(result, status=code)
+
+    @action(detail=False, methods=['get'])
+    def archive(self, request):
+        """
+        查询已归档（已从数据库清理）的日志
+        参数: start / end（Unix 秒或 ISO 8601，默认最近 1 天）、service、level、hostname、search、limit（默认 500）
+        """
+        now = timezone.now()
+        try:
+            end = _parse_time(request.GET.get('end'), now)
+            start = _parse_time(request.GET.get('start'), end - timedelta(days=1))
+            limit = max(1, min(int(request.GET.get('limit') or 500), 5000))
+        except ValueError:
+            return Response({'detail': 'start / end / limit 参数无效'}, status=status.HTTP_400_BAD_REQUEST)
+        if start >= end:
+            return Response({'detail': 'start 必须早于 end'}, status=status.HTTP_400_BAD_REQUEST)
+        max_hours = getattr(settings, 'LOG_ARCHIVE_MAX_QUERY_HOURS', 24 * 31)
+        if end - start > timedelta(hours=max_hours):
+            return Response({'detail': f'查询范围不能超过 {max_hours} 小时'}, status=status.HTTP_400_BAD_REQUEST)
+
+        result = retention.read_archive(
+            start, end,
+            service=request.GET.get('service') or None,
+            level=request.GET.get('level') or None,
+            hostname=request.GET.get('hostname') or None,
+            search=request.GET.get('search') or None,
+            limit=limit,
+        )
+        return Response(result)
+
+
+class LogRetentionPolicyViewSet(SparseFieldsetMixin, viewsets.ModelViewSet):
+    """日志保留策略"""
+    queryset = LogRetentionPolicy.objects.all()
+    serializer_class = LogRetentionPolicySerializer
+
+    @action(detail=False, methods=['get'])
+    def preview(self, request):
+        """按当前策略预览各规则将清理的日志条数（不执行删除），附带归档目录概况"""
+        result = retention.prune_logs(dry_run=True)
+        result['archive'] = retention.archive_stats()
+        return Response(result)
+
+
+def _ingest_authorized(request, setting):
+    token = getattr(settings, setting, '')
+    return not token or request.META.get('HTTP_AUTHORIZATION', '') == f'Bearer {token}'
+
+
+def _parse_time(value, default):
+    """解析 Unix 时间戳（秒）或 ISO 8601 时间"""
+    if not value:
+        return default
+    try:
+        parsed = datetime.fromtimestamp(float(value), tz=dt_timezone.utc)
+    except (OverflowError, OSError) as e:   # inf / 1e20 等超出 datetime 范围
+        raise ValueError(value) from e
+    except ValueError:
+        parsed = parse_datetime(value)
+        if parsed is None:
+            raise ValueError(value)
+        if timezone.is_naive(parsed):
+            parsed = timezone.make_aware(parsed)
+    # 接近 datetime 上下限的时间在时区转换 / 加减时会溢出
+    if not TIME_MIN <= parsed <= TIME_MAX:
+        raise ValueError(value)
+    return parsed
 
 
 @api_view(['GET'])
-def dashboard_stats(request):
-    """仪表盘统计数据"""
-    host_total = Host.objects.count()
-    host_status = dict(Host.objects.values_list('status').annotate(count=Count('id')).values_list('status', 'count'))
-    host_avg = Host.objects.aggregate(
-        avg_cpu=Avg('cpu_usage'),
-        avg_memory=Avg('memory_usage'),
-        avg_disk=Avg('disk_usage'),
-    )
-
-    deploy_total = Deployment.objects.count()
-    deploy_status = dict(
-        Deployment.objects.values_list('status').annotate(count=Count('id')).values_list('status', 'count')
-    )
-
-    alert_total = Alert.objects.count()
-    alert_unacked = Alert.objects.filter(is_acknowledged=False).count()
-    alert_levels = dict(
-        Alert.objects.values_list('level').annotate(count=Count('id')).values_list('level', 'count')
-    )
-
-    recent_deploys = DeploymentSerializer(
-        Deployment.objects.select_related('host').all()[:10], many=True
-    ).data
-
-    recent_alerts = AlertSerializer(
-        Alert.objects.select_related('host').filter(is_acknowledged=False)[:10], many=True
-    ).data
+def metrics_range(request):
+    """
+    主机指标区间查询
+    参数: host（为空时返回全体主机聚合）、start / end（Unix 秒或 ISO 8601，默认最近 1 小时）、
+          resolution（auto / raw / 1m / 1h / 1d）
+    """
+    now = timezone.now()
+    try:
+        end = _parse_time(request.GET.get('end'), now)
+        start = _parse_time(request.GET.get('start'), end - timedelta(hours=1))
+    except (ValueError, OverflowError):
+        return Response({'detail': 'start / end 格式无效'}, status=status.HTTP_400_BAD_REQUEST)
+    if start >= end:
+        return Response({'detail': 'start 必须早于 end'}, status=status.HTTP_400_BAD_REQUEST)
 
+    resolution = request.GET.get('resolution', 'auto')
+    host_id = request.GET.get('host') or None
+    if host_id is not None:
+        try:
+            host_id = int(host_id)
+        except ValueError:
+            return Response({'detail': 'host 必须是主机 id'}, status=status.HTTP_400_BAD_REQUEST)
+    if resolution not in ('auto', 'raw', *timeseries.RESOLUTIONS):
+        return Response({'detail': f'不支持的分辨率: {resolution}'}, status=status.HTTP_400_BAD_REQUEST)
+    if resolution == 'raw' and host_id is None:
+        return Response({'detail': '原始采样查询需要指定 host'}, status=status.HTTP_400_BAD_REQUEST)
+
+    resolution, points = timeseries.query_range(start, end, host_id=host_id, resolution=resolution)
     return Response({
-        'hosts': {
-            'total': host_total,
-            'online': host_status.get('online', 0),
-            'offline': host_status.get('offline', 0),
-            'warning': host_status.get('warning', 0),
-            'avg_cpu': round(host_avg['avg_cpu'] or 0, 1),
-            'avg_memory': round(host_avg['avg_memory'] or 0, 1),
-            'avg_disk': round(host_avg['avg_disk'] or 0, 1),
-        },
-        'deployments': {
-            'total': deploy_total,
-            'success': deploy_status.get('success', 0),
-            'failed': deploy_status.get('failed', 0),
-            'running': deploy_status.get('running', 0),
-        },
-        'alerts': {
-            'total': alert_total,
-            'unacknowledged': alert_unacked,
-            'critical': alert_levels.get('critical', 0),
-            'warning': alert_levels.get('warning', 0),
-            'info': alert_levels.get('info', 0),
-        },
-        'recent_deploys': recent_deploys,
-        'recent_alerts': recent_alerts,
+        'host': host_id,
+        'resolution': resolution,
+        'start': start,
+        'end': end,
+        'points': points,
     })
+
+
+@api_view(['POST'])
+@parser_classes([NDJSONParser, GzipJSONParser])
+def metrics_ingest(request):
+    """
+    Agent 批量推送主机指标
+    请求体: NDJSON（application/x-ndjson）或 JSON 数组 / {"reports": [...]}，支持 Content-Encoding: gzip
+    配置 METRICS_INGEST_TOKEN 后需携带 Authorization: Bearer <token>
+    """
+    if not _ingest_authorized(request, 'METRICS_INGEST_TOKEN'):
+        return Response({'detail': '无效的上报凭证'}, status=status.HTTP_401_UNAUTHORIZED)
+
+    data = request.data
+    parse_errors = getattr(data, 'errors', ())
+    if isinstance(data, dict):
+        data = data.get('reports', [data])
+    if not isinstance(data, list):
+        return Response({'detail': '请求体必须是报告数组'}, status=status.HTTP_400_BAD_REQUEST)
+
+    result = ingest.ingest_metric_reports(data, parse_errors=parse_errors)
+    code = status.HTTP_202_ACCEPTED if result['accepted'] or not result['rejected'] else status.HTTP_400_BAD_REQUEST
+    return Response(result, status=code)
+
+
+@api_view(['GET'])
+def ssh_pool_stats(request):
+    """SSH 连接池状态（命中/未命中/回收计数）"""
+    return Response(ssh_pool.stats())
+
+
+@api_view(['GET'])
+def collector_stats(request):
+    """周期采集调度器状态（队列深度、调度延迟等，仅当调度器运行在当前进程内时可用）"""
+    sched = scheduler.get_scheduler()
+    if sched is None:
+        return Response({'running': False})
+    return Response(sched.stats())
+
+
+@api_view(['GET'])
+def dashboard_stats(request):
+    """仪表盘统计数据（读取增量维护的计数器快照，见 ops/dashboard.py）"""
+    return Response(dashboard.build_stats())
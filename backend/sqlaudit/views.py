@@ -3,6 +3,8 @@ from rest_framework.decorators import api_view, action
 from rest_framework.response import Response
 from django.utils import timezone
 
+from ops.fieldsets import SparseFieldsetMixin
+
 from .models import DataSource, SqlOrder, QueryOrder, SqlCheckResult
 from .serializers import (
     DataSourceSerializer, SqlOrderSerializer,
@@ -12,7 +14,7 @@ from . import sql_checker
 from . import db_executor
 
 
-class DataSourceViewSet(viewsets.ModelViewSet):
+class DataSourceViewSet(SparseFieldsetMixin, viewsets.ModelViewSet):
     """数据源管理"""
     queryset = DataSource.objects.all()
     serializer_class = DataSourceSerializer
@@ -36,7 +38,7 @@ class DataSourceViewSet(viewsets.ModelViewSet):
         return Response({'databases': databases})
 
 
-class SqlOrderViewSet(viewsets.ModelViewSet):
+class SqlOrderViewSet(SparseFieldsetMixin, viewsets.ModelViewSet):
     """SQL 工单管理"""
     queryset = SqlOrder.objects.select_related('datasource').prefetch_related('check_results').all()
     serializer_class = SqlOrderSerializer
@@ -114,7 +116,7 @@ class SqlOrderViewSet(viewsets.ModelViewSet):
         return Response(SqlOrderSerializer(order).data)
 
 
-class QueryOrderViewSet(viewsets.ModelViewSet):
+class QueryOrderViewSet(SparseFieldsetMixin, viewsets.ModelViewSet):
     """查询工单"""
     queryset = QueryOrder.objects.select_related('datasource').all()
     serializer_class = QueryOrderSerializer
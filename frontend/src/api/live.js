@@ -0,0 +1,75 @@
+// 实时推送订阅（后端 ws/live/，见 backend/ops/live.py）
+// 返回取消订阅函数；连接断开后按指数退避自动重连
+export function subscribeLive(topics, onMessage) {
+    let ws = null
+    let closed = false
+    let retry = 0
+    let timer = null
+
+    const connect = () => {
+        const protocol = window.location.protocol === 'https:' ? 'wss:' : 'ws:'
+        ws = new WebSocket(`${protocol}//${window.location.host}/ws/live/?topics=${topics.join(',')}`)
+        ws.onopen = () => {
+            retry = 0
+        }
+        ws.onmessage = (event) => {
+            try {
+                onMessage(JSON.parse(event.data))
+            } catch (e) {
+                console.error('实时消息处理失败', e)
+            }
+        }
+        ws.onclose = () => {
+            if (closed) return
+            timer = setTimeout(connect, Math.min(30000, 1000 * 2 ** retry++))
+        }
+    }
+
+    connect()
+    return () => {
+        closed = true
+        clearTimeout(timer)
+        ws?.close()
+    }
+}
+
+// Loki 实时日志（后端 ws/loki/tail/，见 backend/ops/loki_tail.py）
+// onMessage 收到 lines / status / error 消息；lines 处理完后自动确认，未确认的帧过多时后端暂停推送
+// 返回取消订阅函数；查询有误（关闭码 4400）时不重连
+export function tailLokiLogs(query, onMessage) {
+    let ws = null
+    let closed = false
+    let retry = 0
+    let timer = null
+
+    const connect = () => {
+        const protocol = window.location.protocol === 'https:' ? 'wss:' : 'ws:'
+        ws = new WebSocket(`${protocol}//${window.location.host}/ws/loki/tail/?query=${encodeURIComponent(query)}`)
+        ws.onopen = () => {
+            retry = 0
+        }
+        ws.onmessage = (event) => {
+            let msg
+            try {
+                msg = JSON.parse(event.data)
+                onMessage(msg)
+            } catch (e) {
+                console.error('实时日志处理失败', e)
+            }
+            if (msg?.type === 'lines' && ws.readyState === WebSocket.OPEN) {
+                ws.send(JSON.stringify({ action: 'ack', seq: msg.seq }))
+            }
+        }
+        ws.onclose = (event) => {
+            if (closed || event.code === 4400) return
+            timer = setTimeout(connect, Math.min(30000, 1000 * 2 ** retry++))
+        }
+    }
+
+    connect()
+    return () => {
+        closed = true
+        clearTimeout(timer)
+        ws?.close()
+    }
+}
@@ -8,6 +8,7 @@ export const updateHost = (id, data) => request.put(`/hosts/${id}/`, data)
 export const deleteHost = (id) => request.delete(`/hosts/${id}/`)
 export const testHostConnection = (id) => request.post(`/hosts/${id}/test_connection/`)
 export const refreshHostInfo = (id) => request.post(`/hosts/${id}/refresh_info/`)
+export const bulkRefreshHosts = (data) => request.post('/hosts/bulk_refresh/', data, { timeout: 300000 })
 
 export const getDeployments = (params) => request.get('/deployments/', { params })
 export const createDeployment = (data) => request.post('/deployments/', data)
@@ -17,9 +18,19 @@ export const deleteDeployment = (id) => request.delete(`/deployments/${id}/`)
 export const getAlerts = (params) => request.get('/alerts/', { params })
 export const updateAlert = (id, data) => request.patch(`/alerts/${id}/`, data)
 export const deleteAlert = (id) => request.delete(`/alerts/${id}/`)
+export const bulkAcknowledgeAlerts = (data) => request.post('/alerts/bulk_acknowledge/', data)
+export const bulkDeleteAlerts = (data) => request.post('/alerts/bulk_delete/', data)
 
 export const getLogs = (params) => request.get('/logs/', { params })
 
+// 流式导出：返回下载地址，由浏览器直接下载（resource: logs / alerts / deployments）
+export const getExportUrl = (resource, params = {}) => {
+  const query = new URLSearchParams(Object.entries(params).filter(([, v]) => v !== undefined && v !== null && v !== ''))
+  return `/api/${resource}/export/?${query}`
+}
+
+export const getMetricsRange = (params) => request.get('/metrics/range/', { params })
+
 export const getUsers = (params) => request.get('/users/', { params })
 
 // Loki API